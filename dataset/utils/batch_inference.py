@@ -0,0 +1,72 @@
+import time
+
+
+# tamanhos de lote testados no modo automatico
+DEFAULT_BATCH_CANDIDATES = (1, 2, 4, 8)
+
+
+class BatchSizeTuner:
+    """
+    escolhe o tamanho de lote pela vazao medida nos primeiros lotes reais
+    fixed_size > 0 desliga a busca e usa sempre esse tamanho
+    """
+
+    def __init__(self, fixed_size=0, candidates=DEFAULT_BATCH_CANDIDATES, rounds=2):
+        self.fixed_size = int(fixed_size)
+        self.candidates = list(candidates)
+        self.rounds = rounds
+        self.timings = {}  # tamanho -> [segundos por frame]
+        self.best_size = self.fixed_size if self.fixed_size > 0 else None
+        self._skip_first = True  # primeiro lote inclui custo de aquecimento
+
+    @property
+    def batch_size(self):
+        if self.best_size:
+            return self.best_size
+
+        for size in self.candidates:
+            if len(self.timings.get(size, [])) < self.rounds:
+                return size
+
+        return self.candidates[-1]
+
+    def record(self, n_frames, elapsed, partial=False):
+        """
+        registra quanto tempo um lote de n_frames levou
+        partial: lote enviado antes de encher (ex: limite de frames guardados); o custo
+        por frame conta para o tamanho em teste, senao ele nunca fecharia a rodada
+        """
+        if self.best_size or n_frames == 0:
+            return
+
+        if self._skip_first:
+            self._skip_first = False
+            return
+
+        # lote incompleto (fim do video) nao representa o tamanho testado
+        size = self.batch_size
+        if n_frames != size and not partial:
+            return
+
+        self.timings.setdefault(size, []).append(elapsed / n_frames)
+
+        if all(len(self.timings.get(size, [])) >= self.rounds for size in self.candidates):
+            averages = {size: sum(t) / len(t) for size, t in self.timings.items()}
+            self.best_size = min(averages, key=averages.get)
+            print("ajuste de lote (ms por frame): " + ", ".join(
+                f"{size}={avg * 1000:.1f}" for size, avg in sorted(averages.items())
+            ))
+            print(f"tamanho de lote escolhido: {self.best_size}")
+
+
+def run_batch(model, frames, tuner=None, partial=False, **predict_kwargs):
+    """roda o modelo em uma lista de frames e devolve os resultados na mesma ordem"""
+    if not frames:
+        return []
+
+    start = time.perf_counter()
+    results = model(list(frames), **predict_kwargs)
+    if tuner is not None:
+        tuner.record(len(frames), time.perf_counter() - start, partial=partial)
+
+    return results
@@ -0,0 +1,172 @@
+import sys
+import time
+
+import cv2
+import numpy as np
+from ultralytics.utils.plotting import Annotator, colors
+
+from detection_batch import DetectionBatch
+
+
+# rotulos prontos guardados (classe x confianca em %); passando disso o cache recomeca
+MAX_CACHED_GLYPHS = 4096
+# contorno sem antialiasing: bem mais barato e, na espessura usada, quase igual ao do plot()
+BOX_LINE_TYPE = cv2.LINE_8
+
+_text_color_annotator = None
+
+
+def _text_color(color):
+    """cor do texto do rotulo, a mesma que o Annotator escolhe para o fundo da classe"""
+    global _text_color_annotator
+    if _text_color_annotator is None:
+        _text_color_annotator = Annotator(np.zeros((2, 2, 3), dtype=np.uint8))
+    return _text_color_annotator.get_txt_color(color)
+
+
+class BoxRenderer:
+    """
+    desenho barato de caixas e rotulos, no lugar de results[0].plot() nos loops de exibicao
+
+    - draw() desenha direto no frame recebido (sem copia): use quando o frame
+      original nao e mais necessario depois
+    - render() copia o frame para um buffer reaproveitado e desenha nele; o
+      buffer e sobrescrito no proximo render(), quem guarda o resultado copia
+    - cores por classe e rotulos ja rasterizados (fundo + texto) ficam em cache;
+      cada caixa custa um cv2.rectangle e uma copia do rotulo pronto
+    - caixas chegam como DetectionBatch ou array (N, 6+): x1, y1, x2, y2, conf, cls
+
+    espessura e fonte seguem a mesma regra do Annotator do ultralytics
+    """
+
+    def __init__(self, names, line_width=None, show_conf=True):
+        self.names = names
+        self.line_width = line_width
+        self.show_conf = show_conf
+
+        self._colors = {}
+        self._glyphs = {}
+        self._buffer = None
+        self._style_shape = None
+        self.lw = self.tf = self.sf = None
+
+    def _style(self, shape):
+        """espessura e fonte dependem do tamanho do frame: recalcula (e limpa os rotulos) se mudar"""
+        if shape == self._style_shape:
+            return
+        self._style_shape = shape
+        self.lw = self.line_width or max(round(sum(shape) / 2 * 0.003), 2)
+        self.tf = max(self.lw - 1, 1)
+        self.sf = self.lw / 3
+        self._glyphs.clear()
+
+    def color(self, cls):
+        color = self._colors.get(cls)
+        if color is None:
+            color = colors(cls, True)
+            self._colors[cls] = color
+        return color
+
+    def glyph(self, cls, conf_pct):
+        """rotulo "classe 0.87" rasterizado sobre a cor da classe"""
+        key = (cls, conf_pct)
+        glyph = self._glyphs.get(key)
+        if glyph is not None:
+            return glyph
+
+        label = str(self.names[cls])
+        if self.show_conf:
+            label += f" {conf_pct / 100:.2f}"
+        (w, h), _ = cv2.getTextSize(label, 0, fontScale=self.sf, thickness=self.tf)
+        h += 3
+        color = self.color(cls)
+
+        glyph = np.empty((h + 1, w + 1, 3), dtype=np.uint8)
+        glyph[:] = color
+        cv2.putText(glyph, label, (0, h - 2), 0, self.sf, _text_color(color), thickness=self.tf, lineType=cv2.LINE_AA)
+
+        if len(self._glyphs) >= MAX_CACHED_GLYPHS:
+            self._glyphs.clear()
+        self._glyphs[key] = glyph
+        return glyph
+
+    def draw(self, frame, data):
+        """desenha as caixas no proprio frame e devolve o frame"""
+        detections = data if isinstance(data, DetectionBatch) else DetectionBatch.from_data(data)
+        self._style(frame.shape)
+        if not detections:
+            return frame
+
+        height, width = frame.shape[:2]
+        corners = detections.xyxy.round()
+        np.clip(corners[:, 0::2], 0, width - 1, out=corners[:, 0::2])
+        np.clip(corners[:, 1::2], 0, height - 1, out=corners[:, 1::2])
+        corners = corners.astype(np.int32)
+        classes = detections.cls
+        conf_pct = (detections.conf * 100).round().astype(np.int32)
+        keep = (corners[:, 2] > corners[:, 0]) & (corners[:, 3] > corners[:, 1])
+
+        lw = self.lw
+        for (x1, y1, x2, y2), cls, pct in zip(corners[keep].tolist(), classes[keep].tolist(), conf_pct[keep].tolist()):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), self.color(cls), thickness=lw, lineType=BOX_LINE_TYPE)
+
+            glyph = self.glyph(cls, pct)
+            gh, gw = glyph.shape[:2]
+            # rotulo acima da caixa quando cabe; senao dentro, encostado no topo
+            top = y1 - gh + 1 if y1 >= gh - 1 else y1
+            left = min(x1, width - gw) if gw <= width else 0
+            bottom, right = min(top + gh, height), min(left + gw, width)
+            frame[top:bottom, left:right] = glyph[:bottom - top, :right - left]
+
+        return frame
+
+    def render(self, frame, data):
+        """copia o frame para o buffer reaproveitado e desenha nele (o frame original fica intacto)"""
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = np.empty_like(frame)
+        np.copyto(self._buffer, frame)
+        return self.draw(self._buffer, data)
+
+
+def benchmark(boxes_per_frame=8, repeats=30, sizes=((1920, 1080), (3840, 2160))):
+    """compara results[0].plot() com render() (copia para buffer) e draw() (no lugar) em 1080p e 4K"""
+    import torch
+    from ultralytics.engine.results import Results
+
+    names = {i: f"classe_{i}" for i in range(10)}
+    rng = np.random.default_rng(0)
+
+    for width, height in sizes:
+        frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        x1 = rng.uniform(0, width * 0.8, boxes_per_frame)
+        y1 = rng.uniform(0, height * 0.8, boxes_per_frame)
+        data = np.stack([
+            x1, y1,
+            x1 + rng.uniform(40, width * 0.2, boxes_per_frame),
+            y1 + rng.uniform(40, height * 0.2, boxes_per_frame),
+            rng.uniform(0.3, 1.0, boxes_per_frame),
+            rng.integers(0, len(names), boxes_per_frame),
+        ], axis=1).astype(np.float32)
+        result = Results(frame, path="", names=names, boxes=torch.from_numpy(data))
+        renderer = BoxRenderer(names)
+        scratch = frame.copy()
+
+        timings = {}
+        for label, fn in (
+            ("plot()", lambda: result.plot()),
+            ("render()", lambda: renderer.render(frame, data)),
+            ("draw()", lambda: renderer.draw(scratch, data)),
+        ):
+            fn()  # aquece (fontes, buffer, rotulos)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                fn()
+            timings[label] = (time.perf_counter() - start) / repeats * 1000
+
+        line = " | ".join(f"{label} {ms:.2f} ms" for label, ms in timings.items())
+        print(f"{width}x{height}, {boxes_per_frame} caixas: {line} | ganho {timings['plot()'] / timings['draw()']:.0f}x sem copia")
+
+
+if __name__ == "__main__":
+    # uso: python box_renderer.py [caixas por frame]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -0,0 +1,125 @@
+import numpy as np
+
+
+# iou minimo entre a caixa prevista e a detectada para serem o mesmo animal
+# (baixo porque entre duas amostras o animal anda bastante)
+DEFAULT_TRACK_IOU = 0.1
+# amostras seguidas sem deteccao antes de descartar o rastro
+DEFAULT_MAX_MISSES = 1
+
+
+def box_iou_matrix(a, b):
+    """iou entre todas as caixas xyxy de a (N, 4) e b (M, 4)"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _xyxy_to_state(box):
+    x1, y1, x2, y2 = box[:4]
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+
+class KalmanBoxTrack:
+    """
+    filtro de kalman de velocidade constante para uma caixa
+    estado: centro, largura, altura e as velocidades de cada um (em pixels por frame)
+    """
+
+    def __init__(self, box, conf, cls, track_id):
+        self.x = np.zeros(8)
+        self.x[:4] = _xyxy_to_state(box)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e3, 1e3, 1e3, 1e3])
+
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)
+        self.H = np.eye(4, 8)
+        self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.01, 0.01])
+        self.R = np.diag([4.0, 4.0, 16.0, 16.0])
+
+        self.conf = conf
+        self.cls = cls
+        self.id = track_id
+        self.misses = 0
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.x[2:4] = np.maximum(self.x[2:4], 1.0)
+        self.P = self.F @ self.P @ self.F.T + self.Q
+
+    def update(self, box, conf):
+        y = _xyxy_to_state(box) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(8) - K @ self.H) @ self.P
+        self.conf = conf
+        self.misses = 0
+
+    def xyxy(self):
+        cx, cy, w, h = self.x[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class BoxTracker:
+    """
+    rastreador iou + kalman para levar as caixas dos frames amostrados aos frames pulados
+
+    - update(data) no frame amostrado com as deteccoes (N, 6): associa por classe e iou
+    - predict() em cada frame seguinte: avanca os rastros um frame e devolve as caixas (N, 7)
+      x1, y1, x2, y2, conf, cls, id
+    """
+
+    def __init__(self, iou_threshold=DEFAULT_TRACK_IOU, max_misses=DEFAULT_MAX_MISSES):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, data):
+        data = np.asarray(data, dtype=np.float64).reshape(-1, 6)
+        unmatched = set(range(len(data)))
+        matched_tracks = set()
+
+        if self.tracks and len(data):
+            predicted = np.array([t.xyxy() for t in self.tracks])
+            iou = box_iou_matrix(predicted, data[:, :4])
+            # classes diferentes nunca se associam
+            iou[np.array([t.cls for t in self.tracks])[:, None] != data[None, :, 5]] = 0
+
+            # associacao gulosa pelo maior iou
+            for flat in np.argsort(-iou, axis=None):
+                ti, di = np.unravel_index(flat, iou.shape)
+                if iou[ti, di] < self.iou_threshold:
+                    break
+                if ti in matched_tracks or di not in unmatched:
+                    continue
+                self.tracks[ti].update(data[di, :4], data[di, 4])
+                matched_tracks.add(ti)
+                unmatched.discard(di)
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for di in sorted(unmatched):
+            self.tracks.append(KalmanBoxTrack(data[di, :4], data[di, 4], data[di, 5], self._next_id))
+            self._next_id += 1
+
+    def predict(self):
+        """avanca um frame e devolve os rastros confirmados na ultima amostra"""
+        for track in self.tracks:
+            track.predict()
+        return self.boxes()
+
+    def boxes(self):
+        active = [t for t in self.tracks if t.misses == 0]
+        if not active:
+            return np.zeros((0, 7))
+        return np.array([[*t.xyxy(), t.conf, t.cls, t.id] for t in active])
+
@@ -0,0 +1,286 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from frame_ring import FrameRing, DEFAULT_RING_BYTES
+
+
+# frames copiados esperando o codificador (e buffers alocados no total: sao reaproveitados)
+DEFAULT_MAX_PENDING_FRAMES = 64
+CLIP_FOURCC = "mp4v"
+CLIP_POLICIES = ["block", "drop_newest"]
+DEFAULT_PRE_ROLL_S = 5.0
+DEFAULT_POST_ROLL_S = 5.0
+# clipe muito longo (animal parado na frente da camera) e fechado e outro comeca em seguida
+DEFAULT_MAX_CLIP_S = 120.0
+
+
+class ClipWriter:
+    """
+    codificador de clipes em uma thread de fundo (cv2.VideoWriter)
+
+    write() copia o frame para um buffer do pool e volta; o pool cresce ate
+    max_pending buffers e depois so reaproveita os que o codificador devolve.
+    buffers do tamanho antigo ainda na fila (a regiao mudou) contam no limite
+    ate o codificador larga-los.
+    pool vazio: "block" espera um buffer, "drop_newest" descarta o frame.
+    um clipe por vez: open(), write()..., finish()
+    """
+
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING_FRAMES, policy="block", fourcc=CLIP_FOURCC):
+        if policy not in CLIP_POLICIES:
+            raise ValueError(f"politica invalida: {policy} (use {', '.join(CLIP_POLICIES)})")
+
+        self.max_pending = max_pending
+        self.policy = policy
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._free = []
+        self._allocated = 0
+        self._shape = None
+        self._generation = 0  # muda com o tamanho do frame
+        self._stale = 0       # buffers de tamanhos antigos ainda na fila
+        self._stale_bytes = 0
+        self._closed = False
+        self._new_failures = []
+
+        self.clips_written = 0
+        self.frames_written = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._thread = threading.Thread(target=self._worker, name="clip-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        with self._cond:
+            return sum(1 for item in self._queue if item[0] == "frame")
+
+    def buffer_bytes(self):
+        """memoria do pool de buffers (alocados uma vez, reaproveitados)"""
+        with self._cond:
+            current = self._allocated * int(np.prod(self._shape)) if self._shape else 0
+            return current + self._stale_bytes
+
+    def open(self, path, fps, size):
+        """comeca um clipe novo; size = (largura, altura)"""
+        return self._put(("open", Path(path), fps, size))
+
+    def finish(self):
+        """fecha o clipe atual depois dos frames ja enviados"""
+        return self._put(("finish",))
+
+    def _put(self, item):
+        with self._cond:
+            if self._closed:
+                return False
+            self._queue.append(item)
+            self._cond.notify_all()
+            return True
+
+    def write(self, frame):
+        """copia o frame para um buffer do pool e enfileira; devolve False se descartado"""
+        with self._cond:
+            if self._closed:
+                return False
+
+            if frame.shape != self._shape:
+                # tamanho novo: os buffers livres sao soltos, os que estao na fila contam ate sair
+                if self._shape is not None:
+                    queued = self._allocated - len(self._free)
+                    self._stale += queued
+                    self._stale_bytes += queued * int(np.prod(self._shape))
+                self._shape = frame.shape
+                self._generation += 1
+                self._free.clear()
+                self._allocated = 0
+
+            while not self._free and self._allocated + self._stale >= self.max_pending:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                self._cond.wait()
+
+            if self._free:
+                buffer = self._free.pop()
+            else:
+                buffer = np.empty_like(frame)
+                self._allocated += 1
+            generation = self._generation
+
+        np.copyto(buffer, frame)
+        return self._put(("frame", buffer, generation))
+
+    def _worker(self):
+        writer = None
+        path = None
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                item = self._queue.popleft()
+
+            kind = item[0]
+            if kind == "open":
+                if writer is not None:
+                    writer.release()
+                _, path, fps, size = item
+                writer = cv2.VideoWriter(str(path), self.fourcc, fps, size)
+                if not writer.isOpened():
+                    writer = None
+                    self._fail(path, "cv2.VideoWriter nao abriu")
+            elif kind == "frame":
+                _, buffer, generation = item
+                if writer is not None:
+                    try:
+                        writer.write(buffer)
+                        self.frames_written += 1
+                    except Exception as e:
+                        self._fail(path, str(e))
+                with self._cond:
+                    if generation == self._generation:
+                        self._free.append(buffer)
+                    else:
+                        self._stale -= 1
+                        self._stale_bytes -= buffer.nbytes
+                    self._cond.notify_all()
+            elif kind == "finish" and writer is not None:
+                writer.release()
+                writer = None
+                self.clips_written += 1
+
+        if writer is not None:
+            writer.release()
+            self.clips_written += 1
+
+    def _fail(self, path, error):
+        with self._cond:
+            self.failed += 1
+            self._new_failures.append((str(path), error))
+
+    def take_failures(self):
+        """falhas (caminho, motivo) desde a ultima chamada"""
+        with self._cond:
+            failures, self._new_failures = self._new_failures, []
+        return failures
+
+    def stats(self):
+        return (
+            f"clipes: {self.clips_written} | frames: {self.frames_written} | pendentes: {self.pending} | "
+            f"descartados: {self.dropped} | falhas: {self.failed} | buffers: {self._allocated + self._stale}"
+        )
+
+    def close(self, timeout=None):
+        """espera a fila esvaziar (fechando o clipe aberto) e encerra a thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+
+class EventClipRecorder:
+    """
+    um clipe por evento: pre-roll do anel + frames enquanto ha deteccao + post-roll
+
+    update() recebe todo frame capturado. sem evento, o frame so entra no anel
+    (FrameRing, slots fixos). com deteccao, abre o clipe, despeja o anel (os
+    segundos antes do animal aparecer) e passa a mandar cada frame ao
+    ClipWriter; post_roll_s sem deteccao (ou max_clip_s de clipe) encerra.
+    o fps do clipe e o da captura (1 / intervalo)
+    """
+
+    def __init__(
+        self,
+        writer,
+        folder,
+        interval_s,
+        pre_roll_s=DEFAULT_PRE_ROLL_S,
+        post_roll_s=DEFAULT_POST_ROLL_S,
+        max_clip_s=DEFAULT_MAX_CLIP_S,
+        ring_bytes=DEFAULT_RING_BYTES,
+    ):
+        self.writer = writer
+        self.folder = Path(folder)
+        self.fps = 1 / interval_s
+        self.pre_roll_s = pre_roll_s
+        self.post_roll_s = post_roll_s
+        self.max_clip_s = max_clip_s
+        self.ring = FrameRing(pre_roll_s, interval_s, max_bytes=ring_bytes)
+
+        self.current = None  # registro do clipe aberto
+        self._last_active = None
+
+    @property
+    def current_name(self):
+        return self.current["clip"] if self.current else None
+
+    def update(self, frame, timestamp, label=None):
+        """
+        label: classe detectada no frame (None sem deteccao)
+        devolve (nome do clipe aberto agora ou None, registro do clipe encerrado ou None)
+        """
+        started = None
+        finished = None
+
+        if self.current is None:
+            if label is None:
+                self.ring.push(frame, timestamp)
+                return started, finished
+            started = self._start(frame, timestamp, label)
+        else:
+            self._write(frame, timestamp)
+
+        if label is not None:
+            self._last_active = timestamp
+        idle = (timestamp - self._last_active).total_seconds()
+        length = (timestamp - self.current["ts"]).total_seconds()
+        if idle >= self.post_roll_s or length >= self.max_clip_s:
+            finished = self.finish()
+        return started, finished
+
+    def _start(self, frame, timestamp, label):
+        # com ciclos pulados o anel cobre mais tempo que o pedido: corta no pre_roll_s
+        pre_roll = self.ring.frames(since=timestamp - timedelta(seconds=self.pre_roll_s))
+        start = pre_roll[0][0] if pre_roll else timestamp
+        name = f"{label.replace(' ', '-')}_{timestamp.strftime('%d-%m-%Y_%H-%M-%S')}_clipe.mp4"
+        height, width = frame.shape[:2]
+        self.writer.open(self.folder / name, self.fps, (width, height))
+
+        self.current = {
+            "ts": start,
+            "clip": name,
+            "class": label,
+            "detected_at": timestamp.isoformat(timespec="milliseconds"),
+            "pre_roll_frames": len(pre_roll),
+            "frames": 0,
+        }
+        for frame_time, ring_frame in pre_roll:
+            self._write(ring_frame, frame_time)
+        self._write(frame, timestamp)
+        # frames do anel ja estao no clipe; durante o clipe o anel nao e alimentado
+        self.ring.clear()
+        return name
+
+    def _write(self, frame, timestamp):
+        self.writer.write(frame)
+        self.current["frames"] += 1
+        self.current["end"] = timestamp
+
+    def finish(self):
+        """encerra o clipe aberto (se houver) e devolve o registro"""
+        if self.current is None:
+            return None
+        self.writer.finish()
+        record, self.current = self.current, None
+        record["end"] = record["end"].isoformat(timespec="milliseconds")
+        record["duration_s"] = round((datetime.fromisoformat(record["end"]) - record["ts"]).total_seconds(), 2)
+        return record
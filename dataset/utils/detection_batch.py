@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class DetectionBatch:
+    """
+    caixas de um frame em arrays contiguos, convertidas uma vez do resultado do YOLO
+
+    - xyxy: (N, 4) float32, conf: (N,) float32, cls: (N,) int32
+    - filtros vetorizados (above, of_classes, min_area) devolvem um novo lote
+    - data() volta ao formato (N, 6) x1, y1, x2, y2, conf, cls usado pelo
+      registro, cache e rastreador
+
+    substitui o "for box in results[0].boxes: int(box.cls[0]) ..." que faz um
+    indice de tensor e uma copia para a CPU por valor
+    """
+
+    __slots__ = ("xyxy", "conf", "cls", "names")
+
+    def __init__(self, xyxy, conf, cls, names=None):
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.ascontiguousarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.ascontiguousarray(cls, dtype=np.int32).reshape(-1)
+        self.names = names
+
+    @classmethod
+    def from_data(cls, data, names=None):
+        """a partir de um array (N, 6+) (Boxes.data, numpy ou tensor)"""
+        if hasattr(data, "cpu"):
+            data = data.cpu().numpy()
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim != 2 or data.shape[0] == 0:
+            data = np.zeros((0, 6), dtype=np.float32)
+        return cls(data[:, :4], data[:, 4], data[:, 5], names)
+
+    @classmethod
+    def from_result(cls, result):
+        """a partir de um Results do ultralytics: uma unica copia para a CPU"""
+        if result.boxes is None:
+            return cls.empty(result.names)
+        return cls.from_data(result.boxes.data, result.names)
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), names)
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __bool__(self):
+        return len(self.conf) > 0
+
+    def __repr__(self):
+        return f"DetectionBatch({len(self)} caixas)"
+
+    def data(self):
+        """(N, 6) float32: x1, y1, x2, y2, conf, cls"""
+        return np.concatenate([self.xyxy, self.conf[:, None], self.cls[:, None].astype(np.float32)], axis=1)
+
+    def select(self, mask):
+        """novo lote so com as caixas marcadas (mascara booleana ou indices)"""
+        return DetectionBatch(self.xyxy[mask], self.conf[mask], self.cls[mask], self.names)
+
+    def above(self, threshold):
+        return self.select(self.conf >= threshold)
+
+    def of_classes(self, classes):
+        """so as classes pedidas (ids ou nomes)"""
+        ids = [self.class_id(c) if isinstance(c, str) else int(c) for c in classes]
+        return self.select(np.isin(self.cls, ids))
+
+    @property
+    def area(self):
+        return (self.xyxy[:, 2] - self.xyxy[:, 0]).clip(0) * (self.xyxy[:, 3] - self.xyxy[:, 1]).clip(0)
+
+    def min_area(self, area):
+        return self.select(self.area >= area)
+
+    def class_id(self, name):
+        names = self.names.items() if isinstance(self.names, dict) else enumerate(self.names)
+        for class_id, class_name in names:
+            if class_name == name:
+                return int(class_id)
+        raise KeyError(f"classe desconhecida: {name}")
+
+    def class_names(self):
+        return [self.names[c] for c in self.cls.tolist()]
+
+    def rows(self):
+        """(nome da classe, confianca) de cada caixa, ja como tipos python"""
+        return list(zip(self.class_names(), self.conf.tolist()))
+
+    def labels(self, digits=1):
+        """["classe (xx.x%)", ...] para os logs"""
+        return [f"{name} ({conf * 100:.{digits}f}%)" for name, conf in self.rows()]
+
+    def counts(self):
+        """{classe: quantidade} no frame"""
+        ids, counts = np.unique(self.cls, return_counts=True)
+        return {self.names[i]: n for i, n in zip(ids.tolist(), counts.tolist())}
+
+    def best(self):
+        """(nome, confianca) da caixa mais confiante, ou None"""
+        if not len(self):
+            return None
+        i = int(self.conf.argmax())
+        return self.names[int(self.cls[i])], float(self.conf[i])
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "fauna-detector" / "detections"
+DEFAULT_MAX_CACHE_MB = 1024
+# deteccoes sao guardadas a partir desta confianca; o limiar da interface filtra na leitura,
+# entao mudar so o limiar reaproveita o cache
+CACHE_CONF_FLOOR = 0.05
+# bytes lidos do inicio, meio e fim do video para a impressao digital
+FINGERPRINT_CHUNK = 1024 * 1024
+
+_fingerprints = {}  # (caminho, tamanho, mtime) -> hash, evita reler o arquivo
+
+
+def file_fingerprint(path, chunk=FINGERPRINT_CHUNK, full=False):
+    """
+    hash do conteudo (tamanho + inicio/meio/fim, ou o arquivo inteiro com full=True)
+    nao depende do nome, entao renomear o video nao invalida o cache
+    """
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime, full)
+    if memo_key in _fingerprints:
+        return _fingerprints[memo_key]
+
+    digest = hashlib.sha1(str(stat.st_size).encode())
+    with open(path, "rb") as f:
+        if full or stat.st_size <= 3 * chunk:
+            for block in iter(lambda: f.read(chunk), b""):
+                digest.update(block)
+        else:
+            for offset in (0, stat.st_size // 2, stat.st_size - chunk):
+                f.seek(offset)
+                digest.update(f.read(chunk))
+
+    _fingerprints[memo_key] = digest.hexdigest()[:16]
+    return _fingerprints[memo_key]
+
+
+def results_from_data(frame, data, names, threshold=None):
+    """monta um Results do ultralytics a partir das caixas (N, 6) guardadas"""
+    if threshold is not None and len(data):
+        data = data[data[:, 4] >= threshold]
+    return Results(orig_img=frame, path="", names=names, boxes=torch.from_numpy(np.ascontiguousarray(data, dtype=np.float32)))
+
+
+class VideoDetections:
+    """
+    deteccoes de um video para um modelo e um conjunto de parametros
+    em disco e um .npz colunar: indice do frame, numero de caixas, caixas, confianca e classe
+    """
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        self.frames = {}  # indice do frame -> array (N, 6)
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        if path.exists():
+            try:
+                self._load()
+                os.utime(path)  # lru por data de acesso
+            except Exception as e:
+                print(f"cache de deteccoes ilegivel, ignorando: {path.name} ({e})")
+                self.frames = {}
+
+    def _load(self):
+        with np.load(self.path) as data:
+            frame_index = data["frame"]
+            counts = data["count"]
+            boxes = np.concatenate([data["xyxy"], data["conf"][:, None], data["cls"][:, None].astype(np.float32)], axis=1)
+
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        for i, index in enumerate(frame_index):
+            self.frames[int(index)] = boxes[offsets[i]:offsets[i + 1]]
+
+    def get(self, frame_index):
+        """caixas (N, 6) do frame ou None se ainda nao foi inferido"""
+        data = self.frames.get(frame_index)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, frame_index, data):
+        data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+        self.frames[frame_index] = data[data[:, 4] >= CACHE_CONF_FLOOR]
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+
+        order = sorted(self.frames)
+        parts = [self.frames[i] for i in order]
+        boxes = np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        # escreve em arquivo temporario e troca: outro processo nunca le um arquivo pela metade
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                frame=np.array(order, dtype=np.int32),
+                count=np.array([len(p) for p in parts], dtype=np.int32),
+                xyxy=boxes[:, :4].astype(np.float32),
+                conf=boxes[:, 4].astype(np.float32),
+                cls=boxes[:, 5].astype(np.uint16),
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        self.cache.evict(keep=self.path)
+
+    def summary(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return "cache de deteccoes: nenhum frame consultado"
+        return f"cache de deteccoes: {self.hits}/{total} frames reaproveitados ({self.hits / total * 100:.0f}%)"
+
+
+class DetectionCache:
+    """
+    cache em disco das deteccoes brutas
+    chave: conteudo do video + pesos do modelo + parametros de inferencia; dentro dela, o indice do frame
+    limitado em max_size_mb, removendo os arquivos usados ha mais tempo
+    em memoria ficam so os videos abertos: close() grava e solta as caixas
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_CACHE_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_mb = max_size_mb
+        self._entries = {}
+
+    def open(self, video_path, weights_path, **params):
+        """VideoDetections do video para o modelo e os parametros (imgsz, backend, ...)"""
+        key = json.dumps({
+            "video": file_fingerprint(video_path),
+            "model": file_fingerprint(weights_path, full=True),
+            "conf_floor": CACHE_CONF_FLOOR,
+            **{name: value for name, value in sorted(params.items())},
+        }, sort_keys=True, default=str)
+
+        if key not in self._entries:
+            name = hashlib.sha1(key.encode()).hexdigest()[:24]
+            self._entries[key] = VideoDetections(self, self.cache_dir / f"{name}.npz")
+        return self._entries[key]
+
+    def save(self):
+        for entry in self._entries.values():
+            entry.save()
+
+    def close(self, entry=None):
+        """grava e tira da memoria as deteccoes de um video (sem entry, de todos)"""
+        entries = list(self._entries.values()) if entry is None else [entry]
+        for item in entries:
+            item.save()
+        self._entries = {k: e for k, e in self._entries.items() if e not in entries}
+
+    def size_mb(self):
+        return sum(p.stat().st_size for p in self.cache_dir.glob("*.npz")) / (1024 * 1024)
+
+    def evict(self, keep=None):
+        """apaga os arquivos menos usados ate o cache caber em max_size_mb"""
+        if not self.cache_dir.exists():
+            return
+
+        files = sorted(self.cache_dir.glob("*.npz"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        limit = self.max_size_mb * 1024 * 1024
+
+        for path in files:
+            if total <= limit:
+                break
+            if keep is not None and path == keep:
+                continue
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            self._entries = {k: e for k, e in self._entries.items() if e.path != path}
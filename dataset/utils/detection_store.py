@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+
+STORE_FORMATS = ["jsonl", "parquet"]
+DEFAULT_STORE_DIR = "detections_store"
+# registros acumulados antes de gravar (no parquet cada gravacao vira um row group)
+DEFAULT_FLUSH_ROWS = 500
+DEFAULT_FLUSH_INTERVAL_S = 5.0
+
+
+def _parquet_schema():
+    import pyarrow as pa
+    box = pa.struct([
+        ("cls", pa.int16()),
+        ("name", pa.string()),
+        ("conf", pa.float32()),
+        ("x1", pa.float32()),
+        ("y1", pa.float32()),
+        ("x2", pa.float32()),
+        ("y2", pa.float32()),
+    ])
+    return pa.schema([
+        ("ts", pa.timestamp("ms")),
+        ("frame", pa.int64()),
+        ("source", pa.string()),
+        ("model", pa.string()),
+        ("n", pa.int16()),
+        ("boxes", pa.list_(box)),
+    ])
+
+
+def make_record(frame, data, names, source, model, timestamp=None):
+    """registro tipado de um frame; data: caixas (N, 6) x1, y1, x2, y2, conf, cls"""
+    data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+    return {
+        "ts": timestamp or datetime.now(),
+        "frame": int(frame),
+        "source": str(source),
+        "model": str(model),
+        "n": len(data),
+        "boxes": [
+            {
+                "cls": int(cls),
+                "name": names[int(cls)],
+                "conf": round(float(conf), 4),
+                "x1": round(float(x1), 1),
+                "y1": round(float(y1), 1),
+                "x2": round(float(x2), 1),
+                "y2": round(float(y2), 1),
+            }
+            for x1, y1, x2, y2, conf, cls in data
+        ],
+    }
+
+
+class DetectionStore:
+    """
+    registros por frame em disco, so acrescentando, particionados por dia:
+    <pasta>/date=YYYY-MM-DD/part-<inicio da sessao>-<pid>-<id>.jsonl (ou .parquet)
+
+    cada instancia escreve seus proprios arquivos (o id aleatorio separa duas abertas
+    no mesmo segundo pelo mesmo processo), entao varias ferramentas
+    podem gravar na mesma pasta ao mesmo tempo. o parquet precisa do pyarrow
+    e so fica legivel depois de close()
+    on_open(caminho) e chamado a cada arquivo novo que a instancia abre
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, fmt="jsonl", flush_rows=DEFAULT_FLUSH_ROWS,
+                 flush_interval_s=DEFAULT_FLUSH_INTERVAL_S, on_open=None):
+        if fmt not in STORE_FORMATS:
+            raise ValueError(f"formato invalido: {fmt} (use {', '.join(STORE_FORMATS)})")
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("formato parquet precisa do pyarrow: pip install pyarrow")
+
+        self.root = Path(root)
+        self.fmt = fmt
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.on_open = on_open
+        self.session = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        self._rows = []
+        self._last_flush = time.monotonic()
+        self._day = None
+        self._file = None  # jsonl: arquivo aberto; parquet: ParquetWriter
+        self.records_written = 0
+
+    def partition_path(self, day):
+        return self.root / f"date={day}" / f"part-{self.session}.{self.fmt}"
+
+    def append(self, record):
+        with self._lock:
+            self._rows.append(record)
+            if len(self._rows) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval_s:
+                self._flush_locked()
+
+    def add_frame(self, frame, data, names, source, model, timestamp=None):
+        self.append(make_record(frame, data, names, source, model, timestamp))
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        rows, self._rows = self._rows, []
+
+        # um arquivo por dia: a virada da meia-noite fecha o atual e abre a nova particao
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i]["ts"].date() != rows[start]["ts"].date():
+                self._write_rows(rows[start:i])
+                start = i
+
+    def _write_rows(self, rows):
+        if not rows:
+            return
+
+        day = rows[0]["ts"].strftime("%Y-%m-%d")
+        if day != self._day:
+            self._close_file()
+            self._day = day
+
+        if self._file is None:
+            path = self.partition_path(day)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if self.on_open is not None:
+                self.on_open(path)
+            if self.fmt == "jsonl":
+                self._file = open(path, "a", encoding="utf-8")
+            else:
+                import pyarrow.parquet as pq
+                self._file = pq.ParquetWriter(str(path), _parquet_schema(), compression="zstd")
+
+        if self.fmt == "jsonl":
+            lines = []
+            for row in rows:
+                row = dict(row, ts=row["ts"].isoformat(timespec="milliseconds"))
+                lines.append(json.dumps(row, ensure_ascii=False))
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+        else:
+            import pyarrow as pa
+            self._file.write_table(pa.Table.from_pylist(rows, schema=_parquet_schema()))
+
+        self.records_written += len(rows)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._close_file()
+
+
+def read_records(root=DEFAULT_STORE_DIR, start=None, end=None, source=None):
+    """
+    le os registros (dicts) entre start e end (datetime), opcionalmente de uma fonte
+    so abre as particoes dos dias pedidos
+    """
+    root = Path(root)
+    for partition in sorted(root.glob("date=*")):
+        day = datetime.strptime(partition.name[5:], "%Y-%m-%d").date()
+        if (start and day < start.date()) or (end and day > end.date()):
+            continue
+
+        for path in sorted(partition.iterdir()):
+            if path.suffix == ".jsonl":
+                with open(path, encoding="utf-8") as f:
+                    rows = (json.loads(line) for line in f if line.strip())
+                    for row in rows:
+                        row["ts"] = datetime.fromisoformat(row["ts"])
+                        if _keep(row, start, end, source):
+                            yield row
+            elif path.suffix == ".parquet":
+                import pyarrow.parquet as pq
+                try:
+                    parquet = pq.ParquetFile(str(path))
+                except Exception:
+                    continue  # segmento ainda aberto por uma sessao em andamento
+                for group in range(parquet.num_row_groups):
+                    for row in parquet.read_row_group(group).to_pylist():
+                        if _keep(row, start, end, source):
+                            yield row
+
+
+def _keep(row, start, end, source):
+    if start and row["ts"] < start:
+        return False
+    if end and row["ts"] > end:
+        return False
+    if source and row["source"] != source:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    # uso: python detection_store.py [pasta] -> contagem por classe de todos os registros
+    root = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STORE_DIR
+    frames = 0
+    counts = {}
+    for record in read_records(root):
+        frames += 1
+        for box in record["boxes"]:
+            counts[box["name"]] = counts.get(box["name"], 0) + 1
+
+    print(f"frames registrados: {frames}")
+    for name, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {name}: {count}")
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+
+
+# memoria maxima do anel de frames recentes (pre-roll dos clipes)
+DEFAULT_RING_BYTES = 256 * 1024 * 1024
+
+
+class FrameRing:
+    """
+    anel dos ultimos frames capturados, em slots alocados uma vez
+
+    push() copia o frame para o slot mais antigo (np.copyto, sem alocar); o
+    numero de slots e o necessario para max_seconds no intervalo de captura,
+    limitado pelo orcamento em bytes. frames de tamanho diferente (regiao
+    mudou) descartam o anel e realocam.
+    frames() devolve visoes dos slots, do mais antigo ao mais novo: validas
+    ate o proximo push()
+    """
+
+    def __init__(self, max_seconds, interval_s, max_bytes=DEFAULT_RING_BYTES):
+        self.max_seconds = max_seconds
+        self.interval_s = interval_s
+        self.max_bytes = max_bytes
+
+        self._slots = None
+        self._times = []
+        self._next = 0
+        self._count = 0
+
+    @property
+    def capacity(self):
+        return len(self._slots) if self._slots is not None else 0
+
+    @property
+    def nbytes(self):
+        return self._slots.nbytes if self._slots is not None else 0
+
+    def __len__(self):
+        return self._count
+
+    def _allocate(self, frame):
+        wanted = math.ceil(self.max_seconds / self.interval_s) if self.interval_s > 0 else 1
+        fits = self.max_bytes // frame.nbytes
+        slots = max(0, min(wanted, fits))
+        self._slots = np.empty((slots,) + frame.shape, dtype=frame.dtype)
+        self._times = [None] * slots
+        self._next = 0
+        self._count = 0
+
+    def push(self, frame, timestamp):
+        if self._slots is None or self._slots.shape[1:] != frame.shape or self._slots.dtype != frame.dtype:
+            self._allocate(frame)
+        if not len(self._slots):
+            return  # orcamento menor que um frame: sem pre-roll
+
+        np.copyto(self._slots[self._next], frame)
+        self._times[self._next] = timestamp
+        self._next = (self._next + 1) % len(self._slots)
+        self._count = min(self._count + 1, len(self._slots))
+
+    def frames(self, since=None):
+        """[(timestamp, frame)] do mais antigo ao mais novo; since corta os anteriores a esse instante"""
+        start = (self._next - self._count) % len(self._slots) if self._count else 0
+        items = []
+        for i in range(self._count):
+            index = (start + i) % len(self._slots)
+            if since is None or self._times[index] >= since:
+                items.append((self._times[index], self._slots[index]))
+        return items
+
+    def clear(self):
+        self._count = 0
+        self._next = 0
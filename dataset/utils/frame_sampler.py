@@ -0,0 +1,142 @@
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+
+# a partir de quantos frames pulados compensa buscar (seek) em vez de grab()
+# um seek decodifica a partir do keyframe anterior, entao so vale para amostragem esparsa
+SEEK_MIN_SKIP = 300
+
+
+class FrameSampler:
+    """
+    percorre um cv2.VideoCapture entregando so os frames amostrados
+    (indice % frame_skip == 0, indice absoluto no video)
+
+    frames descartados avancam com grab() (sem converter para BGR) e so os
+    frames mantidos passam por retrieve(). com seek=True (ou seek="auto" e
+    frame_skip >= SEEK_MIN_SKIP) pula direto ate o proximo frame amostrado
+    com CAP_PROP_POS_FRAMES, o que o decodificador resolve a partir do keyframe
+    """
+
+    def __init__(self, cap, frame_skip, start_frame=0, seek="auto"):
+        self.cap = cap
+        self.frame_skip = max(1, int(frame_skip))
+        self.position = start_frame  # proximo frame a ser lido
+        if seek == "auto":
+            seek = self.frame_skip >= SEEK_MIN_SKIP
+        self.seek = bool(seek)
+        self.grabbed = 0
+        self.retrieved = 0
+
+    def __iter__(self):
+        if self.seek:
+            return self._iter_seek()
+        return self._iter_grab()
+
+    def _iter_grab(self):
+        while True:
+            if not self.cap.grab():
+                return
+            frame_index = self.position
+            self.position += 1
+            self.grabbed += 1
+
+            if frame_index % self.frame_skip != 0:
+                continue
+
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                return
+            self.retrieved += 1
+            yield frame_index, frame
+
+    def _iter_seek(self):
+        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        while True:
+            # proximo multiplo de frame_skip a partir da posicao atual
+            target = -(-self.position // self.frame_skip) * self.frame_skip
+            if total_frames > 0 and target >= total_frames:
+                self.position = total_frames
+                return
+
+            if target != self.position:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+
+            ret, frame = self.cap.read()
+            if not ret:
+                return
+
+            self.position = target + 1
+            self.retrieved += 1
+            yield target, frame
+
+
+def _read_loop(cap, frame_skip):
+    """loop antigo: read() em todos os frames e descarta os nao amostrados"""
+    frame_count = 0
+    kept = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_count % frame_skip == 0:
+            kept += 1
+        frame_count += 1
+    return kept
+
+
+def benchmark(video_path, sample_fps_values=(1, 2)):
+    """compara o loop com read() contra grab()/retrieve() e seek para cada taxa de amostragem"""
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        print(f"nao foi possivel abrir: {video_path}")
+        return []
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    print(f"\n{'='*60}")
+    print(f"video: {Path(video_path).name}")
+    print(f"fps: {fps:.2f} | frames: {total_frames} | duracao: {total_frames / fps / 60:.1f} min")
+    print(f"{'='*60}")
+
+    rows = []
+    for sample_fps in sample_fps_values:
+        frame_skip = max(1, int(fps / sample_fps))
+
+        for method in ("read", "grab", "seek"):
+            cap = cv2.VideoCapture(str(video_path))
+            start = time.perf_counter()
+
+            if method == "read":
+                kept = _read_loop(cap, frame_skip)
+            else:
+                sampler = FrameSampler(cap, frame_skip, seek=(method == "seek"))
+                kept = sum(1 for _ in sampler)
+
+            elapsed = time.perf_counter() - start
+            cap.release()
+
+            rows.append((sample_fps, method, kept, elapsed))
+            print(f"  {sample_fps} fps | {method:5s} | {kept:6d} frames | {elapsed:8.2f}s")
+
+        base = next(r[3] for r in rows if r[0] == sample_fps and r[1] == "read")
+        for r in rows:
+            if r[0] == sample_fps and r[1] != "read" and r[3] > 0:
+                print(f"  {sample_fps} fps | {r[1]:5s} e {base / r[3]:.1f}x mais rapido que read()")
+
+    return rows
+
+
+if __name__ == "__main__":
+    # uso: python frame_sampler.py video1.mp4 [video2.mp4 ...]
+    if len(sys.argv) < 2:
+        print("uso: python frame_sampler.py <video> [<video> ...]")
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        benchmark(path)
@@ -0,0 +1,111 @@
+import threading
+from collections import deque
+
+import cv2
+
+
+DEFAULT_WRITER_THREADS = 2
+# imagens esperando gravacao antes de aplicar a politica de fila cheia
+DEFAULT_MAX_PENDING = 32
+WRITER_POLICIES = ["block", "drop_oldest"]
+
+
+class AsyncImageWriter:
+    """
+    grava imagens em disco em threads de fundo (cv2.imwrite libera o GIL durante o jpeg)
+
+    submit() nao copia a imagem: quem envia nao pode mais alterar o array depois.
+    fila cheia: "block" espera uma vaga, "drop_oldest" descarta a gravacao mais antiga
+    """
+
+    def __init__(self, threads=DEFAULT_WRITER_THREADS, max_pending=DEFAULT_MAX_PENDING, policy="block"):
+        if policy not in WRITER_POLICIES:
+            raise ValueError(f"politica invalida: {policy} (use {', '.join(WRITER_POLICIES)})")
+
+        self.max_pending = max_pending
+        self.policy = policy
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._in_progress = 0
+        self._closed = False
+        self._new_failures = []
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"image-writer-{i}", daemon=True)
+            for i in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def pending(self):
+        """gravacoes na fila + em andamento"""
+        with self._cond:
+            return len(self._queue) + self._in_progress
+
+    def submit(self, path, image, params=None):
+        """enfileira a gravacao; devolve False se o escritor ja foi fechado"""
+        with self._cond:
+            if self._closed:
+                return False
+
+            while len(self._queue) >= self.max_pending:
+                if self.policy == "drop_oldest":
+                    dropped_path, _, _ = self._queue.popleft()
+                    self.dropped += 1
+                    self._new_failures.append((str(dropped_path), "descartada (fila cheia)"))
+                else:
+                    self._cond.wait()
+
+            self._queue.append((path, image, params))
+            self._cond.notify_all()
+            return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                path, image, params = self._queue.popleft()
+                self._in_progress += 1
+                self._cond.notify_all()
+
+            error = None
+            try:
+                if not cv2.imwrite(str(path), image, params or []):
+                    error = "cv2.imwrite falhou"
+            except Exception as e:
+                error = str(e)
+
+            with self._cond:
+                self._in_progress -= 1
+                if error:
+                    self.failed += 1
+                    self._new_failures.append((str(path), error))
+                else:
+                    self.written += 1
+                self._cond.notify_all()
+
+    def take_failures(self):
+        """falhas (caminho, motivo) desde a ultima chamada"""
+        with self._cond:
+            failures, self._new_failures = self._new_failures, []
+        return failures
+
+    def stats(self):
+        return f"gravadas: {self.written} | pendentes: {self.pending} | descartadas: {self.dropped} | falhas: {self.failed}"
+
+    def close(self, timeout=None):
+        """espera a fila esvaziar e encerra as threads"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
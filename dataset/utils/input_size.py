@@ -0,0 +1,107 @@
+import math
+
+
+# maior imgsz usado ate hoje nas ferramentas (tudo era imgsz=1920 fixo)
+MAX_IMGSZ = 1920
+STRIDE = 32
+DEFAULT_TRAIN_SIZE = 640
+
+
+def round_to_stride(value, stride=STRIDE):
+    return int(math.ceil(value / stride) * stride)
+
+
+def model_train_size(model):
+    """imgsz usado no treino do modelo (fica salvo nos args do checkpoint)"""
+    for args in (getattr(model, "overrides", None), getattr(getattr(model, "model", None), "args", None)):
+        try:
+            imgsz = args.get("imgsz") if isinstance(args, dict) else getattr(args, "imgsz", None)
+        except Exception:
+            imgsz = None
+        if imgsz:
+            return int(max(imgsz) if isinstance(imgsz, (list, tuple)) else imgsz)
+    return DEFAULT_TRAIN_SIZE
+
+
+def letterbox_shape(width, height, imgsz, stride=STRIDE):
+    """(altura, largura) do tensor que o YOLO monta para imgsz com letterbox retangular"""
+    if isinstance(imgsz, (list, tuple)):
+        target_h, target_w = imgsz
+    else:
+        target_h = target_w = imgsz
+    scale = min(target_h / height, target_w / width)
+    return round_to_stride(height * scale, stride), round_to_stride(width * scale, stride)
+
+
+class InputSizePolicy:
+    """
+    escolhe o imgsz a partir da resolucao da fonte, do tamanho de treino do modelo
+    e de um orcamento de latencia por ferramenta (opcional)
+
+    - nao amplia a fonte alem da propria resolucao (so ate o tamanho de treino)
+    - nunca passa de MAX_IMGSZ
+    - devolve [altura, largura] multiplos de 32 na proporcao da fonte, assim
+      fontes 16:9 nao pagam pelo padding de um quadrado
+    - com orcamento, reduz o lado maior ate a latencia estimada caber nele
+    """
+
+    def __init__(self, model, latency_budget_ms=None, max_imgsz=MAX_IMGSZ, rect=True):
+        self.train_size = model_train_size(model)
+        self.latency_budget_ms = latency_budget_ms
+        self.max_imgsz = max_imgsz or MAX_IMGSZ
+        self.rect = rect
+        self.ms_per_mpix = None  # media movel medida nas inferencias
+        self.last_choice = None
+        self.last_source = None
+
+    def choose(self, width, height):
+        long_side = max(width, height)
+        target = min(max(round_to_stride(long_side), self.train_size), self.max_imgsz)
+
+        if self.latency_budget_ms and self.ms_per_mpix:
+            # reduz o lado maior ate a latencia estimada caber no orcamento (minimo: tamanho de treino)
+            while target > self.train_size and self._estimate_ms(width, height, target) > self.latency_budget_ms:
+                target -= STRIDE
+
+        if self.rect:
+            imgsz = list(letterbox_shape(width, height, target))
+        else:
+            imgsz = target
+
+        self.last_choice = imgsz
+        self.last_source = (width, height)
+        return imgsz
+
+    def _estimate_ms(self, width, height, imgsz):
+        h, w = letterbox_shape(width, height, imgsz)
+        return self.ms_per_mpix * h * w / 1e6
+
+    def record(self, elapsed_s, imgsz=None, width=None, height=None):
+        """registra o tempo de uma inferencia para calibrar a estimativa de latencia"""
+        imgsz = imgsz if imgsz is not None else self.last_choice
+        width, height = (width, height) if width else self.last_source
+        if imgsz is None or width is None:
+            return
+        h, w = letterbox_shape(width, height, imgsz)
+        sample = elapsed_s * 1000 / (h * w / 1e6)
+        self.ms_per_mpix = sample if self.ms_per_mpix is None else 0.9 * self.ms_per_mpix + 0.1 * sample
+
+    def report(self):
+        """texto com a resolucao escolhida e a economia estimada em relacao ao imgsz=1920 fixo"""
+        if self.last_choice is None:
+            return "imgsz ainda nao escolhido"
+
+        width, height = self.last_source
+        chosen_h, chosen_w = letterbox_shape(width, height, self.last_choice)
+        legacy_h, legacy_w = letterbox_shape(width, height, MAX_IMGSZ)
+        ratio = (chosen_h * chosen_w) / (legacy_h * legacy_w)
+
+        text = (
+            f"imgsz {chosen_w}x{chosen_h} (fonte {width}x{height}, treino {self.train_size}) | "
+            f"{ratio * 100:.0f}% dos pixels de imgsz={MAX_IMGSZ}"
+        )
+        if self.ms_per_mpix:
+            chosen_ms = self.ms_per_mpix * chosen_h * chosen_w / 1e6
+            legacy_ms = self.ms_per_mpix * legacy_h * legacy_w / 1e6
+            text += f" | ~{chosen_ms:.0f}ms por frame, ~{legacy_ms - chosen_ms:.0f}ms economizados"
+        return text
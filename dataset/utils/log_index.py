@@ -0,0 +1,374 @@
+import gzip
+import hashlib
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from log_compaction import LINE_RE, EMPTY_RE, RUN_RE, parse_timestamp
+
+
+DEFAULT_INDEX_PATH = "log_index.sqlite"
+# arquivos de log procurados quando uma pasta e informada
+LOG_PATTERNS = ["*.txt", "*.txt.gz"]
+# bytes do inicio do arquivo que identificam um segmento (sobrevive a rotacao e ao gzip)
+HEAD_BYTES = 4096
+# linhas gravadas por transacao durante a indexacao
+INSERT_BATCH = 5000
+
+DETECTION_RE = re.compile(r"^Frame (?P<frame>\d+): (?P<count>\d+) detecção\(ões\) - (?P<items>.*)$")
+# com varias regioes o item vem com o feed na frente: "[feed_a] capivara (87.0%)"
+ITEM_RE = re.compile(r"(?:, )?(?:\[(?P<region>[^\]]+)\] )?(?P<name>.+?) \((?P<conf>\d+(?:\.\d+)?)%\)")
+# agrupando passagens a interface grava uma linha por passagem no lugar das linhas por frame
+PASSAGE_RE = re.compile(
+    r"^Passagem (?P<id>\d+): (?P<name>.+?) de (?P<start>\d{2}:\d{2}:\d{2}) a (?P<end>\d{2}:\d{2}:\d{2}) "
+    r"\(.*?\) - pico (?P<conf>\d+(?:\.\d+)?)% no frame (?P<frame>\d+)"
+    r"(?:.*? \| região: (?P<region>[^|]+?)(?: \||$))?"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    head TEXT,
+    head_len INTEGER,
+    offset INTEGER,
+    size INTEGER,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS detections (
+    ts INTEGER,
+    frame INTEGER,
+    species TEXT,
+    conf REAL,
+    segment INTEGER,
+    line_offset INTEGER,
+    region TEXT
+);
+CREATE TABLE IF NOT EXISTS empty_runs (
+    ts_start INTEGER,
+    ts_end INTEGER,
+    first_frame INTEGER,
+    last_frame INTEGER,
+    segment INTEGER,
+    line_offset INTEGER
+);
+CREATE INDEX IF NOT EXISTS detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS detections_species_ts ON detections (species, ts);
+CREATE INDEX IF NOT EXISTS empty_runs_ts ON empty_runs (ts_start);
+"""
+
+
+def _ms(when):
+    return int(when.timestamp() * 1000)
+
+
+def _from_ms(value):
+    return datetime.fromtimestamp(value / 1000)
+
+
+def _open_log(path):
+    path = Path(path)
+    return gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+
+
+def _read_head(path, length=HEAD_BYTES):
+    with _open_log(path) as f:
+        return f.read(length)
+
+
+def parse_log_lines(f, offset=0):
+    """
+    le um log em streaming a partir de offset (bytes)
+    gera (offset apos a linha, offset da linha, tipo, dados) para cada linha completa
+    tipo: "detection" (um por especie, com a regiao ou None), "run" (frame vazio ou sequencia compactada) ou None
+    uma passagem vira uma deteccao da classe principal, no inicio da passagem e no melhor frame
+    para na ultima linha completa: uma linha sendo escrita fica para a proxima indexacao
+    """
+    f.seek(offset)
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            return
+        line_offset = offset
+        offset += len(raw)
+
+        match = LINE_RE.match(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        if not match:
+            yield offset, line_offset, None, None
+            continue
+        message = match["message"]
+
+        detection = DETECTION_RE.match(message)
+        if detection:
+            when = parse_timestamp(match["ts"])
+            items = detection["items"].split(" | ")[0]
+            for item in ITEM_RE.finditer(items):
+                yield offset, line_offset, "detection", (
+                    when, int(detection["frame"]), item["name"].lstrip(", ").strip(), float(item["conf"]) / 100,
+                    item["region"]
+                )
+            continue
+
+        passage = PASSAGE_RE.match(message)
+        if passage:
+            # a linha e gravada no fim da passagem: o inicio vem so com a hora
+            logged = parse_timestamp(match["ts"])
+            start = datetime.strptime(passage["start"], "%H:%M:%S").time()
+            when = datetime.combine(logged.date(), start)
+            if when > logged:
+                when -= timedelta(days=1)  # passagem atravessou a meia-noite
+            yield offset, line_offset, "detection", (
+                when, int(passage["frame"]), passage["name"].strip(), float(passage["conf"]) / 100, passage["region"]
+            )
+            continue
+
+        empty = EMPTY_RE.match(message)
+        if empty:
+            when = parse_timestamp(match["ts"])
+            yield offset, line_offset, "run", (when, when, int(empty["frame"]), int(empty["frame"]))
+            continue
+
+        run = RUN_RE.match(message)
+        if run:
+            start = parse_timestamp(match["ts"])
+            yield offset, line_offset, "run", (start, parse_timestamp(run["end"]), int(run["first"]), int(run["last"]))
+            continue
+
+        yield offset, line_offset, None, None
+
+
+class LogIndex:
+    """
+    indice sqlite persistente dos logs de deteccao (texto, rotacionados, .gz e compactados)
+    por horario e por especie; a indexacao e incremental: cada arquivo continua de onde parou
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = str(db_path)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # indices criados antes das varias regioes: a coluna entra vazia
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(detections)")]
+        if "region" not in columns:
+            self.conn.execute("ALTER TABLE detections ADD COLUMN region TEXT")
+
+    def close(self):
+        self.conn.close()
+
+    def _segment_for(self, path, stat):
+        """
+        (id, offset) de onde continuar a leitura do arquivo
+        - mesmo caminho e mesmo comeco: continua do offset salvo
+        - caminho novo com o comeco de um segmento conhecido: o log foi rotacionado (ou comprimido)
+        - mesmo caminho com outro conteudo: o segmento antigo fica guardado com outro nome e
+          este arquivo e indexado do zero
+        """
+        cur = self.conn.cursor()
+        row = cur.execute("SELECT id, head, head_len, offset, size, mtime FROM segments WHERE path = ?", (str(path),)).fetchone()
+
+        if row:
+            segment_id, head, head_len, offset, size, mtime = row
+            if size == stat.st_size and mtime == stat.st_mtime:
+                return segment_id, None  # nada novo
+            if hashlib.sha1(_read_head(path, head_len)).hexdigest() == head:
+                return segment_id, offset
+            cur.execute("UPDATE segments SET path = ? WHERE id = ?", (f"{path} (substituido {segment_id})", segment_id))
+
+        for segment_id, head, head_len, offset, old_path in cur.execute(
+            "SELECT id, head, head_len, offset, path FROM segments WHERE head_len > 0"
+        ).fetchall():
+            # o arquivo antigo ainda existe com o mesmo conteudo: e outro segmento
+            if Path(old_path).exists() and hashlib.sha1(_read_head(old_path, head_len)).hexdigest() == head:
+                continue
+            if hashlib.sha1(_read_head(path, head_len)).hexdigest() == head:
+                cur.execute("UPDATE segments SET path = ? WHERE id = ?", (str(path), segment_id))
+                return segment_id, offset
+
+        cur.execute("INSERT INTO segments (path, head, head_len, offset) VALUES (?, ?, 0, 0)", (str(path), hashlib.sha1(b"").hexdigest()))
+        return cur.lastrowid, 0
+
+    def index_file(self, path):
+        """indexa o que ainda nao foi lido do arquivo; devolve quantos registros novos entraram"""
+        path = Path(path)
+        stat = path.stat()
+        segment_id, offset = self._segment_for(path, stat)
+        if offset is None:
+            return 0
+
+        detections = []
+        runs = []
+        end_offset = offset
+        added = 0
+
+        def flush():
+            self.conn.executemany("INSERT INTO detections (ts, frame, species, conf, segment, line_offset, region) VALUES (?, ?, ?, ?, ?, ?, ?)", detections)
+            self.conn.executemany("INSERT INTO empty_runs VALUES (?, ?, ?, ?, ?, ?)", runs)
+            detections.clear()
+            runs.clear()
+
+        with _open_log(path) as f:
+            for end_offset, line_offset, kind, data in parse_log_lines(f, offset):
+                if kind is None:
+                    continue
+                if kind == "detection":
+                    when, frame, species, conf, region = data
+                    detections.append((_ms(when), frame, species, conf, segment_id, line_offset, region))
+                else:
+                    start, end, first, last = data
+                    runs.append((_ms(start), _ms(end), first, last, segment_id, line_offset))
+                added += 1
+                if len(detections) + len(runs) >= INSERT_BATCH:
+                    flush()
+        flush()
+
+        head = _read_head(path)
+        self.conn.execute(
+            "UPDATE segments SET head = ?, head_len = ?, offset = ?, size = ?, mtime = ? WHERE id = ?",
+            (hashlib.sha1(head).hexdigest(), len(head), max(end_offset, offset), stat.st_size, stat.st_mtime, segment_id)
+        )
+        self.conn.commit()
+        return added
+
+    def index_paths(self, paths):
+        """indexa arquivos e pastas (procura *.txt e *.txt.gz); devolve {arquivo: registros novos}"""
+        files = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                for pattern in LOG_PATTERNS:
+                    files.extend(sorted(path.glob(pattern)))
+            elif path.exists():
+                files.append(path)
+
+        # segmentos rotacionados primeiro: assim o log ativo reaproveita o que ja foi indexado deles
+        files.sort(key=lambda p: (p.stat().st_mtime, str(p)))
+        return {str(f): self.index_file(f) for f in files}
+
+    def query(self, start=None, end=None, species=None, limit=50):
+        """
+        contagens no intervalo (por especie) e as ultimas referencias de frame
+        cada referencia: horario, frame, especie, confianca, regiao, arquivo e offset da linha
+        """
+        where = ["1 = 1"]
+        params = []
+        if start:
+            where.append("d.ts >= ?")
+            params.append(_ms(start))
+        if end:
+            where.append("d.ts <= ?")
+            params.append(_ms(end))
+        if species:
+            where.append("d.species = ?")
+            params.append(species)
+        clause = " AND ".join(where)
+
+        counts = dict(self.conn.execute(
+            f"SELECT d.species, COUNT(*) FROM detections d WHERE {clause} GROUP BY d.species ORDER BY COUNT(*) DESC",
+            params
+        ).fetchall())
+        frames = self.conn.execute(
+            f"SELECT COUNT(DISTINCT d.segment || ':' || d.line_offset) FROM detections d WHERE {clause}", params
+        ).fetchone()[0]
+        references = [
+            {
+                "ts": _from_ms(ts), "frame": frame, "species": name, "conf": conf, "region": region,
+                "file": segment_path, "offset": line_offset,
+            }
+            for ts, frame, name, conf, region, segment_path, line_offset in self.conn.execute(
+                f"SELECT d.ts, d.frame, d.species, d.conf, d.region, s.path, d.line_offset "
+                f"FROM detections d JOIN segments s ON s.id = d.segment WHERE {clause} "
+                f"ORDER BY d.ts DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        ]
+        return {"frames": frames, "detections": sum(counts.values()), "by_species": counts, "references": references}
+
+    def last_seen(self, species):
+        row = self.conn.execute("SELECT MAX(ts) FROM detections WHERE species = ?", (species,)).fetchone()
+        return _from_ms(row[0]) if row and row[0] is not None else None
+
+    def empty_frames(self, start=None, end=None):
+        """quantos frames sem deteccao foram registrados no intervalo (sequencias inteiras)"""
+        where, params = ["1 = 1"], []
+        if start:
+            where.append("ts_end >= ?")
+            params.append(_ms(start))
+        if end:
+            where.append("ts_start <= ?")
+            params.append(_ms(end))
+        row = self.conn.execute(
+            f"SELECT SUM(last_frame - first_frame + 1) FROM empty_runs WHERE {' AND '.join(where)}", params
+        ).fetchone()
+        return row[0] or 0
+
+    def species(self):
+        return [name for (name,) in self.conn.execute("SELECT DISTINCT species FROM detections ORDER BY species")]
+
+
+def read_line(path, offset):
+    """linha original de uma referencia (arquivo + offset)"""
+    with _open_log(path) as f:
+        f.seek(offset)
+        return f.readline().decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def _parse_date(text):
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"data invalida: {text} (use AAAA-MM-DD [HH:MM[:SS]])")
+
+
+if __name__ == "__main__":
+    # uso: python log_index.py indexar <arquivos ou pastas...> [--db log_index.sqlite]
+    #      python log_index.py consultar [--especie Capivara] [--de 2025-12-18] [--ate "2025-12-25 18:00"] [--db ...]
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        if name in args:
+            i = args.index(name)
+            value = args[i + 1]
+            del args[i:i + 2]
+            return value
+        return default
+
+    db = option("--db", DEFAULT_INDEX_PATH)
+    species = option("--especie")
+    start = option("--de")
+    end = option("--ate")
+
+    if not args or args[0] not in ("indexar", "consultar"):
+        print("uso: python log_index.py indexar <arquivos ou pastas...> [--db log_index.sqlite]")
+        print("     python log_index.py consultar [--especie NOME] [--de AAAA-MM-DD] [--ate AAAA-MM-DD] [--db ...]")
+        sys.exit(1)
+
+    index = LogIndex(db)
+    started = time.perf_counter()
+
+    if args[0] == "indexar":
+        added = index.index_paths(args[1:] or ["."])
+        for path, count in added.items():
+            print(f"  {Path(path).name}: {count} registros novos")
+        print(f"indexado em {time.perf_counter() - started:.2f}s -> {db}")
+    else:
+        start = _parse_date(start) if start else None
+        end = _parse_date(end) if end else None
+        result = index.query(start, end, species, limit=10)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        print(f"frames com deteccao: {result['frames']} | deteccoes: {result['detections']} | frames vazios: {index.empty_frames(start, end)}")
+        for name, count in result["by_species"].items():
+            print(f"  {name}: {count} (ultima vez: {index.last_seen(name):%Y-%m-%d %H:%M:%S})")
+        if result["references"]:
+            print("ultimas ocorrencias:")
+            for ref in result["references"]:
+                region = f" [{ref['region']}]" if ref["region"] else ""
+                print(f"  {ref['ts']:%Y-%m-%d %H:%M:%S} frame {ref['frame']}{region} {ref['species']} "
+                      f"({ref['conf'] * 100:.1f}%) -> {Path(ref['file']).name}@{ref['offset']}")
+        print(f"consulta em {elapsed_ms:.1f}ms")
+
+    index.close()
@@ -0,0 +1,174 @@
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+
+DEFAULT_MAX_LOG_MB = 10
+# o buffer vai para o disco quando passa deste tamanho ou deste tempo
+DEFAULT_FLUSH_BYTES = 64 * 1024
+DEFAULT_FLUSH_INTERVAL_S = 1.0
+
+_STOP = object()
+
+
+def rotated_log_name(log_path, when=None):
+    """mesmo nome que a rotacao antiga usava: log.txt -> log_YYYYmmdd_HHMMSS.txt"""
+    when = when or datetime.now()
+    stamp = when.strftime("%Y%m%d_%H%M%S")
+    root, ext = os.path.splitext(log_path)
+    return f"{root}_{stamp}{ext or '.txt'}"
+
+
+class BufferedLogWriter:
+    """
+    escritor de log em uma thread propria
+
+    - um unico arquivo aberto durante toda a sessao (sem exists/getsize/open por linha)
+    - as linhas ficam em memoria e vao para o disco a cada flush_interval_s ou flush_bytes
+    - rotaciona ao passar de max_mb, contando os bytes escritos; compress=True gera .gz
+      do segmento rotacionado
+    """
+
+    def __init__(
+        self,
+        path,
+        max_mb=DEFAULT_MAX_LOG_MB,
+        flush_interval_s=DEFAULT_FLUSH_INTERVAL_S,
+        flush_bytes=DEFAULT_FLUSH_BYTES,
+        compress=False,
+        on_rotate=None,
+    ):
+        self.path = str(path)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.flush_interval_s = flush_interval_s
+        self.flush_bytes = flush_bytes
+        self.compress = compress
+        self.on_rotate = on_rotate
+
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._size = 0
+        self._closed = False
+
+        self.lines_written = 0
+        self.flushes = 0
+        self.rotations = 0
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message, timestamp=None):
+        """enfileira uma linha; o horario e o do momento da chamada (ou o datetime informado)"""
+        if self._closed:
+            return
+        timestamp = (timestamp or datetime.now()).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        self._queue.put(f"[{timestamp}] {message}\n")
+
+    def flush(self, timeout=5.0):
+        """grava o que estiver no buffer e espera terminar"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        backup_name = rotated_log_name(self.path)
+        # duas rotacoes no mesmo segundo nao podem sobrescrever o segmento anterior
+        root, ext = os.path.splitext(backup_name)
+        suffix = 1
+        while os.path.exists(backup_name) or os.path.exists(backup_name + ".gz"):
+            backup_name = f"{root}_{suffix}{ext}"
+            suffix += 1
+        os.rename(self.path, backup_name)
+
+        if self.compress:
+            with open(backup_name, "rb") as src, gzip.open(backup_name + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(backup_name)
+            backup_name += ".gz"
+
+        self.rotations += 1
+        self._open()
+        if self.on_rotate:
+            try:
+                self.on_rotate(backup_name)
+            except Exception as e:
+                print(f"Erro no aviso de rotação do log: {e}")
+
+    def _write_buffer(self, buffer):
+        if not buffer:
+            return
+        data = "".join(buffer)
+        buffer.clear()
+
+        try:
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data.encode("utf-8"))
+            self.flushes += 1
+            if self._size > self.max_bytes:
+                self._rotate()
+        except Exception as e:
+            print(f"Erro ao salvar log: {e}")
+            # fecha o arquivo com erro antes de soltar: a proxima escrita reabre
+            try:
+                if self._file is not None:
+                    self._file.close()
+            except Exception:
+                pass
+            finally:
+                self._file = None
+
+    def _run(self):
+        buffer = []
+        buffered_bytes = 0
+        last_flush = time.monotonic()
+
+        while True:
+            timeout = max(0.0, self.flush_interval_s - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout if buffer else None)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, str):
+                buffer.append(item)
+                buffered_bytes += len(item)
+                self.lines_written += 1
+
+            if (
+                item is _STOP
+                or isinstance(item, threading.Event)
+                or buffered_bytes >= self.flush_bytes
+                or time.monotonic() - last_flush >= self.flush_interval_s
+            ):
+                self._write_buffer(buffer)
+                buffered_bytes = 0
+                last_flush = time.monotonic()
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
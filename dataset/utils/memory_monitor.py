@@ -0,0 +1,205 @@
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+
+# intervalo entre amostras (com tracemalloc uma amostra pode levar centenas de ms: agrupar as alocacoes e caro)
+DEFAULT_SAMPLE_INTERVAL_S = 60.0
+# sitios de alocacao que mais cresceram, listados em cada amostra
+DEFAULT_TOP_GROWTH = 10
+# profundidade da pilha guardada por alocacao: 1 ja aponta a linha e mantem o custo baixo
+TRACEMALLOC_FRAMES = 1
+
+# alocacoes do proprio tracemalloc e do import de modulos nao interessam
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def process_rss_bytes():
+    """memoria residente do processo (psutil se disponivel; senao /proc ou a api do Windows)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+
+    # sem fonte melhor: pico de memoria (ru_maxrss em KB no linux, bytes no mac)
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryMonitor:
+    """
+    amostras periodicas de memoria de uma sessao longa
+
+    - rss do processo e variacao desde o inicio
+    - contadores de bytes por componente: register(nome, funcao) e a funcao
+      devolve quantos bytes o componente segura agora
+    - com tracemalloc ligado, os sitios de alocacao que mais cresceram desde a
+      amostra anterior e desde o inicio (um vazamento aparece sempre na lista)
+    - coletas do gc por geracao, para ver se o coletor automatico esta trabalhando
+
+    maybe_sample() e barato fora do intervalo e pode ficar no loop de deteccao
+    """
+
+    def __init__(self, interval_s=DEFAULT_SAMPLE_INTERVAL_S, trace_allocations=False, top=DEFAULT_TOP_GROWTH):
+        self.interval_s = interval_s
+        self.trace_allocations = trace_allocations
+        self.top = top
+        self._components = {}
+        self._last_sample = None
+        self._first_sites = None  # {(arquivo, linha): (bytes, alocacoes)} da primeira amostra
+        self._last_sites = None
+        self._started_tracemalloc = False
+
+        self.samples = 0
+        self.start_rss = process_rss_bytes()
+        self.last_rss = self.start_rss
+        self.peak_rss = self.start_rss
+
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+
+    def register(self, name, size_fn):
+        self._components[name] = size_fn
+
+    def maybe_sample(self):
+        """devolve uma amostra quando o intervalo venceu; senao None"""
+        now = time.monotonic()
+        if self._last_sample is not None and now - self._last_sample < self.interval_s:
+            return None
+        self._last_sample = now
+        return self.sample()
+
+    def sample(self):
+        rss = process_rss_bytes()
+        self.peak_rss = max(self.peak_rss, rss)
+        record = {
+            "ts": datetime.now(),
+            "sample": self.samples,
+            "rss_mb": round(rss / 1024 / 1024, 1),
+            "rss_delta_mb": round((rss - self.last_rss) / 1024 / 1024, 1),
+            "rss_growth_mb": round((rss - self.start_rss) / 1024 / 1024, 1),
+            "components": {name: self._component_bytes(size_fn) for name, size_fn in self._components.items()},
+            "gc_collections": [generation["collections"] for generation in gc.get_stats()],
+            "gc_objects": len(gc.get_objects()),
+        }
+        self.last_rss = rss
+
+        if self.trace_allocations and tracemalloc.is_tracing():
+            sites = self._allocation_sites()
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            record["traced_mb"] = round(traced / 1024 / 1024, 1)
+            record["traced_peak_mb"] = round(traced_peak / 1024 / 1024, 1)
+            if self._first_sites is None:
+                self._first_sites = sites
+            else:
+                record["top_growth"] = self._growth(sites, self._last_sites)
+                record["top_growth_total"] = self._growth(sites, self._first_sites)
+            self._last_sites = sites
+
+        self.samples += 1
+        return record
+
+    @staticmethod
+    def _allocation_sites():
+        """
+        bytes e alocacoes vivas por linha de codigo
+        so o agrupamento fica guardado (o snapshot inteiro ocuparia memoria na propria medicao),
+        e os arquivos ignorados saem depois de agrupar: filter_traces e bem mais lento
+        """
+        sites = {}
+        for stat in tracemalloc.take_snapshot().statistics("lineno"):
+            frame = stat.traceback[0]
+            if frame.filename not in _IGNORED_FILES:
+                sites[(frame.filename, frame.lineno)] = (stat.size, stat.count)
+        return sites
+
+    def _growth(self, sites, reference):
+        growth = []
+        for (filename, lineno), (size, count) in sites.items():
+            old_size, old_count = reference.get((filename, lineno), (0, 0))
+            if size > old_size:
+                growth.append({
+                    "where": f"{filename}:{lineno}",
+                    "size_diff_kb": round((size - old_size) / 1024, 1),
+                    "count_diff": count - old_count,
+                    "size_kb": round(size / 1024, 1),
+                })
+        growth.sort(key=lambda item: -item["size_diff_kb"])
+        return growth[:self.top]
+
+    @staticmethod
+    def _component_bytes(size_fn):
+        try:
+            return int(size_fn() or 0)
+        except Exception:
+            return None  # componente ainda nao criado ou ja fechado
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._first_sites = self._last_sites = None
+
+
+def format_sample(record):
+    """linha curta para o log em texto; o registro completo vai para o armazenamento estruturado"""
+    text = f"Memória: RSS {record['rss_mb']:.1f} MB ({record['rss_delta_mb']:+.1f}, sessão {record['rss_growth_mb']:+.1f})"
+    components = ", ".join(
+        f"{name} {size / 1024:.0f} KB" for name, size in record["components"].items() if size is not None
+    )
+    if components:
+        text += f" | {components}"
+    if "traced_mb" in record:
+        text += f" | python {record['traced_mb']:.1f} MB"
+    if record.get("top_growth"):
+        top = record["top_growth"][0]
+        text += f" | maior crescimento: {top['where']} (+{top['size_diff_kb']:.0f} KB)"
+    return text
+
+
+def results_bytes(results):
+    """bytes que um resultado do ultralytics segura (imagem original + tensores das caixas)"""
+    if not results:
+        return 0
+    total = 0
+    for result in results:
+        if getattr(result, "orig_img", None) is not None:
+            total += result.orig_img.nbytes
+        if result.boxes is not None:
+            data = result.boxes.data
+            total += data.numel() * data.element_size() if hasattr(data, "numel") else data.nbytes
+    return total
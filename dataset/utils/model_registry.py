@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from ultralytics import YOLO
+
+from onnx_backend import load_onnx_model, onnx_path_for
+
+
+# limites padrao do cache de modelos
+DEFAULT_MAX_MODELS = 4
+DEFAULT_MAX_MEMORY_MB = 2048
+# conf padrao do ultralytics, para quem nao tem limiar proprio passar explicito
+DEFAULT_CONF = 0.25
+
+
+def estimate_model_bytes(model, weights_path=None):
+    """estima quantos bytes os pesos do modelo ocupam em memoria"""
+    if weights_path is not None:
+        # modelos exportados (onnx) nao expoem tensores: usa o tamanho do arquivo
+        return os.path.getsize(weights_path)
+    try:
+        total = 0
+        for tensor in list(model.model.parameters()) + list(model.model.buffers()):
+            total += tensor.numel() * tensor.element_size()
+        return total
+    except Exception:
+        # fallback: tamanho do arquivo de pesos
+        try:
+            return os.path.getsize(model.ckpt_path)
+        except Exception:
+            return 0
+
+
+class ModelRegistry:
+    """
+    cache de modelos YOLO compartilhado pelo processo
+    chave: (caminho absoluto dos pesos, mtime do arquivo, device, backend, threads do onnxruntime)
+    guarda modelos ja fundidos e aquecidos, com despejo LRU e teto de memoria
+
+    todos os chamadores do processo recebem a mesma instancia YOLO, com o mesmo
+    predictor: o que fica montado nele (device, half, ...) vale para o proximo
+    chamador, e versoes do ultralytics que mesclam os args uma vez so herdam
+    tambem conf, imgsz e classes. toda chamada passa conf e imgsz explicitos
+    (DEFAULT_CONF quando nao ha limiar). o predictor nao e recriado aqui: no onnx
+    ele guarda a sessao ajustada por tune_session
+    """
+
+    def __init__(self, max_models=DEFAULT_MAX_MODELS, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+        self.max_models = max_models
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._models = OrderedDict()  # chave -> (modelo, bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, weights_path, device=None, backend="torch", intra_op_threads=None):
+        path = Path(weights_path).resolve()
+        if path.exists():
+            location, mtime = str(path), os.path.getmtime(path)
+        else:
+            # nome que o ultralytics baixa sozinho (ex: yolov8n.pt): o YOLO recebe o nome como veio
+            location, mtime = str(weights_path), 0
+        # o limite de threads so existe na sessao do onnxruntime
+        threads = intra_op_threads if backend == "onnx" else None
+        return (location, mtime, str(device) if device is not None else "auto", backend, threads)
+
+    def get(self, weights_path, device=None, warmup=True, backend="torch", intra_op_threads=None):
+        """
+        retorna o modelo do cache ou carrega, funde e aquece um novo
+        intra_op_threads: threads da sessao onnx (None = uma por nucleo fisico)
+        """
+        key = self.make_key(weights_path, device, backend, intra_op_threads)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key][0]
+
+            self.misses += 1
+
+            # remove versoes antigas do mesmo arquivo (mtime mudou = pesos novos)
+            for old_key in [k for k in self._models if k[0] == key[0] and k[2:] == key[2:]]:
+                del self._models[old_key]
+
+            if backend == "onnx":
+                model = load_onnx_model(key[0], intra_op_threads=intra_op_threads)
+                model_bytes = estimate_model_bytes(model, onnx_path_for(key[0]))
+            else:
+                model = self._load(key[0], device, warmup)
+                model_bytes = estimate_model_bytes(model)
+            self._models[key] = (model, model_bytes)
+            self._evict()
+
+            return model
+
+    def _load(self, weights_path, device, warmup):
+        print(f"carregando modelo: {Path(weights_path).name} (device: {device or 'auto'})")
+        model = YOLO(weights_path)
+
+        try:
+            model.fuse()
+        except Exception as e:
+            print(f"aviso: nao foi possivel fundir o modelo: {e}")
+
+        if warmup:
+            # primeira inferencia monta o predictor (AutoBackend, device, etc)
+            # sem imgsz para nao deixar um tamanho fixo gravado nos args do predictor
+            dummy = np.zeros((64, 64, 3), dtype=np.uint8)
+            model(dummy, verbose=False, device=device)
+
+        return model
+
+    def _evict(self):
+        """despeja os modelos menos usados ate respeitar os limites"""
+        while len(self._models) > 1:
+            total_bytes = sum(b for _, b in self._models.values())
+            if len(self._models) <= self.max_models and total_bytes <= self.max_memory_bytes:
+                break
+            old_key, _ = self._models.popitem(last=False)
+            print(f"modelo removido do cache: {Path(old_key[0]).name} ({old_key[3]})")
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def info(self):
+        with self._lock:
+            return {
+                "models": [f"{Path(k[0]).name} ({k[3]})" for k in self._models],
+                "memory_mb": sum(b for _, b in self._models.values()) / (1024 * 1024),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# registro unico do processo
+_registry = ModelRegistry()
+
+
+def get_model(weights_path, device=None, warmup=True, backend="torch", intra_op_threads=None):
+    """atalho para pegar um modelo do registro compartilhado (backend: torch ou onnx)"""
+    return _registry.get(weights_path, device=device, warmup=warmup, backend=backend,
+                         intra_op_threads=intra_op_threads)
+
+
+def get_registry():
+    return _registry
@@ -0,0 +1,106 @@
+import time
+
+import cv2
+
+
+# fracao minima de pixels alterados para considerar que a cena mudou
+DEFAULT_MOTION_THRESHOLD = 0.005
+# diferenca de intensidade (0-255) para um pixel contar como alterado
+DEFAULT_PIXEL_DELTA = 25
+# inferencia forcada mesmo sem movimento (rede de seguranca)
+DEFAULT_FORCE_EVERY_S = 10.0
+# largura do frame reduzido usado na comparacao
+DEFAULT_GATE_WIDTH = 160
+
+
+class MotionGate:
+    """
+    pre-filtro barato antes do YOLO para cameras paradas
+
+    compara uma versao reduzida e em cinza do frame com o ultimo frame que passou
+    pela inferencia (method="diff") ou usa um modelo de fundo MOG2 (method="mog2").
+    se a cena nao mudou alem do limiar, a inferencia e pulada; a cada
+    force_every_s segundos uma inferencia e forcada mesmo assim
+    """
+
+    def __init__(
+        self,
+        threshold=DEFAULT_MOTION_THRESHOLD,
+        force_every_s=DEFAULT_FORCE_EVERY_S,
+        width=DEFAULT_GATE_WIDTH,
+        method="diff",
+        pixel_delta=DEFAULT_PIXEL_DELTA,
+    ):
+        self.threshold = threshold
+        self.force_every_s = force_every_s
+        self.width = width
+        self.method = method
+        self.pixel_delta = pixel_delta
+
+        self._reference = None
+        self._last_inference_time = None
+        self._background = None
+        if method == "mog2":
+            self._background = cv2.createBackgroundSubtractorMOG2(history=200, detectShadows=True)
+
+        self.checked = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.forced = 0
+        self.last_change = 0.0
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        small_height = max(1, int(height * self.width / width))
+        small = cv2.resize(frame, (self.width, small_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _changed_fraction(self, gray):
+        if self._background is not None:
+            mask = self._background.apply(gray)
+            # 255 = primeiro plano, 127 = sombra (ignorada)
+            return cv2.countNonZero(cv2.inRange(mask, 255, 255)) / mask.size
+
+        if self._reference is None or self._reference.shape != gray.shape:
+            return 1.0
+
+        diff = cv2.absdiff(gray, self._reference)
+        return cv2.countNonZero(cv2.inRange(diff, self.pixel_delta, 255)) / diff.size
+
+    def should_infer(self, frame, timestamp=None):
+        """
+        True se o frame deve passar pelo modelo
+        timestamp em segundos (tempo do video ou time.monotonic()); padrao: relogio monotonic
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        self.checked += 1
+
+        gray = self._prepare(frame)
+        self.last_change = self._changed_fraction(gray)
+
+        forced = (
+            self._last_inference_time is not None
+            and now - self._last_inference_time >= self.force_every_s
+        )
+        infer = self._last_inference_time is None or self.last_change >= self.threshold or forced
+
+        if not infer:
+            self.skipped += 1
+            return False
+
+        if forced and self.last_change < self.threshold:
+            self.forced += 1
+
+        self.inferred += 1
+        self._reference = gray
+        self._last_inference_time = now
+        return True
+
+    def summary(self):
+        if self.checked == 0:
+            return "filtro de movimento: nenhum frame verificado"
+        return (
+            f"filtro de movimento: {self.skipped}/{self.checked} inferências evitadas "
+            f"({self.skipped / self.checked * 100:.0f}%), {self.forced} forçadas"
+        )
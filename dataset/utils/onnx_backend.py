@@ -0,0 +1,198 @@
+import os
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+
+# backends aceitos pelas ferramentas
+BACKENDS = ["torch", "onnx"]
+
+# threads entre operadores: o grafo do YOLO e sequencial, paralelizar entre nos nao ajuda
+DEFAULT_INTER_OP_THREADS = 1
+
+
+def default_intra_op_threads():
+    """uma thread por nucleo fisico (hyperthreading costuma atrapalhar o onnxruntime)"""
+    try:
+        import psutil
+        physical = psutil.cpu_count(logical=False)
+        if physical:
+            return physical
+    except ImportError:
+        pass
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def onnx_path_for(weights_path):
+    """o .onnx exportado fica ao lado do .pt, com o mesmo nome"""
+    return Path(weights_path).with_suffix(".onnx")
+
+
+def export_onnx(weights_path, force=False):
+    """exporta o .pt para onnx uma unica vez; reexporta se o .pt for mais novo"""
+    weights_path = Path(weights_path)
+    onnx_path = onnx_path_for(weights_path)
+
+    if (
+        not force
+        and onnx_path.exists()
+        and os.path.getmtime(onnx_path) >= os.path.getmtime(weights_path)
+    ):
+        return onnx_path
+
+    print(f"exportando {weights_path.name} para onnx (uma vez, fica em cache)...")
+    # dynamic=True para aceitar qualquer imgsz e lotes de tamanho variavel
+    exported = YOLO(str(weights_path)).export(format="onnx", dynamic=True, verbose=False)
+    exported = Path(exported)
+
+    if exported.resolve() != onnx_path.resolve():
+        exported.replace(onnx_path)
+
+    print(f"onnx salvo em: {onnx_path}")
+    return onnx_path
+
+
+def _session_holder(model):
+    """objeto do predictor que guarda a InferenceSession (muda entre versoes do ultralytics)"""
+    backend = model.predictor.model
+    for holder in (getattr(backend, "backend", None), backend):
+        if holder is not None and hasattr(holder, "session"):
+            return holder
+    return None
+
+
+def tune_session(model, onnx_path, intra_op_threads=None, inter_op_threads=DEFAULT_INTER_OP_THREADS):
+    """recria a sessao do onnxruntime com threads e otimizacoes ajustadas"""
+    import onnxruntime as ort
+
+    holder = _session_holder(model)
+    if holder is None:
+        print("aviso: sessao onnxruntime nao encontrada, mantendo configuracao padrao")
+        return
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads or default_intra_op_threads()
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    holder.session = ort.InferenceSession(
+        str(onnx_path), options, providers=holder.session.get_providers()
+    )
+    print(
+        f"onnxruntime: {options.intra_op_num_threads} threads intra-op, "
+        f"{options.inter_op_num_threads} inter-op"
+    )
+
+
+def load_onnx_model(weights_path, intra_op_threads=None, inter_op_threads=DEFAULT_INTER_OP_THREADS):
+    """
+    carrega o modelo via onnxruntime
+    devolve um YOLO normal: model(frame, ...) continua retornando os mesmos Results
+    """
+    onnx_path = export_onnx(weights_path)
+    model = YOLO(str(onnx_path), task="detect")
+
+    # primeira inferencia monta o predictor, depois troca a sessao pela ajustada
+    dummy = np.zeros((64, 64, 3), dtype=np.uint8)
+    model(dummy, verbose=False)
+    tune_session(model, onnx_path, intra_op_threads, inter_op_threads)
+
+    return model
+
+
+def box_iou(a, b):
+    """iou entre dois arrays de caixas xyxy (N,4) x (M,4)"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def compare_boxes(result_a, result_b, iou_threshold=0.9):
+    """casa as caixas de dois Results por classe e iou; devolve (casadas, so_a, so_b, maior diff de conf)"""
+    boxes_a = result_a.boxes.data.cpu().numpy()
+    boxes_b = result_b.boxes.data.cpu().numpy()
+
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return 0, len(boxes_a), len(boxes_b), 0.0
+
+    iou = box_iou(boxes_a[:, :4], boxes_b[:, :4])
+    iou[boxes_a[:, 5][:, None] != boxes_b[:, 5][None, :]] = 0
+
+    matched = 0
+    max_conf_diff = 0.0
+    used_b = set()
+    for i in np.argsort(-boxes_a[:, 4]):
+        j = int(np.argmax(iou[i]))
+        if iou[i, j] >= iou_threshold and j not in used_b:
+            used_b.add(j)
+            matched += 1
+            max_conf_diff = max(max_conf_diff, abs(float(boxes_a[i, 4] - boxes_b[j, 4])))
+
+    return matched, len(boxes_a) - matched, len(boxes_b) - matched, max_conf_diff
+
+
+def check_parity(weights_path, image_paths, imgsz=1920, conf=0.25, iou_threshold=0.9):
+    """roda torch e onnx nas mesmas imagens e compara as caixas"""
+    torch_model = YOLO(str(weights_path))
+    onnx_model = load_onnx_model(weights_path)
+
+    total_matched = total_only_torch = total_only_onnx = 0
+    worst_conf_diff = 0.0
+
+    for image_path in image_paths:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            print(f"  ignorado (nao abriu): {image_path}")
+            continue
+
+        r_torch = torch_model(image, imgsz=imgsz, conf=conf, verbose=False)[0]
+        r_onnx = onnx_model(image, imgsz=imgsz, conf=conf, verbose=False)[0]
+
+        matched, only_torch, only_onnx, conf_diff = compare_boxes(r_torch, r_onnx, iou_threshold)
+        total_matched += matched
+        total_only_torch += only_torch
+        total_only_onnx += only_onnx
+        worst_conf_diff = max(worst_conf_diff, conf_diff)
+
+        status = "ok" if only_torch == 0 and only_onnx == 0 else "DIFERENTE"
+        print(f"  {Path(image_path).name}: {matched} iguais, {only_torch} so torch, {only_onnx} so onnx [{status}]")
+
+    print(f"\n{'='*60}")
+    print(f"caixas iguais: {total_matched}")
+    print(f"so no torch: {total_only_torch} | so no onnx: {total_only_onnx}")
+    print(f"maior diferenca de confianca: {worst_conf_diff:.4f}")
+    print(f"{'='*60}\n")
+
+    return total_only_torch == 0 and total_only_onnx == 0
+
+
+if __name__ == "__main__":
+    # uso: python onnx_backend.py modelo.pt pasta_ou_imagens... [--imgsz 1920]
+    args = sys.argv[1:]
+    imgsz = 1920
+    if "--imgsz" in args:
+        i = args.index("--imgsz")
+        imgsz = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) < 2:
+        print("uso: python onnx_backend.py <modelo.pt> <imagens ou pasta> [--imgsz 1920]")
+        sys.exit(1)
+
+    images = []
+    for arg in args[1:]:
+        path = Path(arg)
+        if path.is_dir():
+            images.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png")))
+        else:
+            images.append(path)
+
+    ok = check_parity(args[0], images, imgsz=imgsz)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,171 @@
+import itertools
+
+import numpy as np
+
+from box_tracker import box_iou_matrix
+
+
+# segundos sem ver o animal antes de encerrar a passagem (oclusao, mato, deteccao falhando)
+DEFAULT_GAP_S = 3.0
+# sobreposicao minima entre a caixa nova e a ultima caixa da passagem (animal anda entre capturas)
+DEFAULT_PASSAGE_IOU = 0.05
+# com sobreposicao alta a caixa entra na passagem mesmo com outra classe (o modelo hesitando entre especies)
+CLASS_FLIP_IOU = 0.5
+
+
+class Passage:
+    """uma passagem de animal aberta: caixas de frames proximos, mesma regiao e mesma classe"""
+
+    def __init__(self, passage_id, frame_number, timestamp):
+        self.id = passage_id
+        self.start = timestamp
+        self.end = timestamp
+        self.first_frame = frame_number
+        self.last_frame = frame_number
+        self.frames = 0
+        self.max_boxes = 0  # maior numero de animais da passagem num mesmo frame
+        self.class_frames = {}  # classe -> frames em que apareceu
+        self.last_box = None
+        self.last_cls = None
+
+        self.peak_conf = 0.0
+        self.best_frame = None
+        self.best_time = None
+        self.best_image = None  # copia do frame de maior confianca
+        self.best_detections = None  # caixas desse frame, para desenhar depois
+        self.clip = None  # clipe do evento em que a passagem comecou (gravacao de clipes ligada)
+
+    @property
+    def main_class(self):
+        return max(self.class_frames.items(), key=lambda item: item[1])[0]
+
+    def add(self, frame_number, timestamp, detections, image):
+        """caixas deste frame que pertencem a passagem (DetectionBatch ja filtrado)"""
+        self.end = timestamp
+        self.last_frame = frame_number
+        self.frames += 1
+        self.max_boxes = max(self.max_boxes, len(detections))
+        for name in set(detections.class_names()):
+            self.class_frames[name] = self.class_frames.get(name, 0) + 1
+
+        top = int(detections.conf.argmax())
+        self.last_box = detections.xyxy[top]
+        self.last_cls = int(detections.cls[top])
+
+        conf = float(detections.conf[top])
+        if conf > self.peak_conf or self.best_frame is None:
+            # so o melhor frame e guardado: uma copia por novo pico, nao por frame
+            self.peak_conf = conf
+            self.best_frame = frame_number
+            self.best_time = timestamp
+            self.best_detections = detections
+            self.best_image = image.copy() if image is not None else None
+
+    def record(self):
+        """registro da passagem encerrada (sem a imagem); ts e o inicio"""
+        return {
+            "ts": self.start,
+            "id": self.id,
+            "end": self.end.isoformat(timespec="milliseconds"),
+            "duration_s": round((self.end - self.start).total_seconds(), 2),
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "frames": self.frames,
+            "class": self.main_class,
+            "class_frames": dict(self.class_frames),
+            "max_boxes": self.max_boxes,
+            "peak_conf": round(self.peak_conf, 4),
+            "best_frame": self.best_frame,
+            "best_time": self.best_time.isoformat(timespec="milliseconds"),
+            "best_box": [round(float(v), 1) for v in self.best_detections.xyxy[int(self.best_detections.conf.argmax())]],
+            "clip": self.clip,
+        }
+
+
+class PassageAggregator:
+    """
+    agrupa deteccoes por frame em passagens de animais
+
+    uma caixa continua uma passagem aberta quando sobrepoe a ultima caixa dela
+    (iou >= iou_threshold) com a mesma classe, ou com qualquer classe se a
+    sobreposicao for alta; sem continuacao vira uma passagem nova. a passagem
+    fecha depois de gap_s segundos sem nenhuma caixa.
+
+    update() devolve (abertas neste frame, encerradas); flush() encerra todas
+    """
+
+    def __init__(self, gap_s=DEFAULT_GAP_S, iou_threshold=DEFAULT_PASSAGE_IOU):
+        self.gap_s = gap_s
+        self.iou_threshold = iou_threshold
+        self.open = []
+        self._ids = itertools.count(1)
+
+        self.passages_closed = 0
+        self.frames_grouped = 0
+
+    def update(self, frame_number, timestamp, detections, image=None):
+        closed = self._close_stale(timestamp)
+        opened = []
+        if not detections:
+            return opened, closed
+
+        self.frames_grouped += 1
+        assignment = self._assign(detections)
+
+        for index in sorted(set(assignment.tolist())):
+            members = detections.select(assignment == index)
+            if index < len(self.open):
+                self.open[index].add(frame_number, timestamp, members, image)
+            else:
+                passage = Passage(next(self._ids), frame_number, timestamp)
+                passage.add(frame_number, timestamp, members, image)
+                opened.append(passage)
+        self.open.extend(opened)
+        return opened, closed
+
+    def _assign(self, detections):
+        """indice da passagem aberta de cada caixa; caixas novas recebem indices a partir de len(open)"""
+        assignment = np.full(len(detections), -1)
+        if self.open:
+            last_boxes = np.stack([p.last_box for p in self.open])
+            last_cls = np.array([p.last_cls for p in self.open])
+            iou = box_iou_matrix(detections.xyxy, last_boxes)
+            same_class = detections.cls[:, None] == last_cls[None, :]
+            allowed = ((iou >= self.iou_threshold) & same_class) | (iou >= CLASS_FLIP_IOU)
+            score = np.where(allowed, iou, -1.0)
+            best = score.argmax(axis=1)
+            matched = score[np.arange(len(detections)), best] >= 0
+            assignment[matched] = best[matched]
+
+        # caixas sem passagem: as que se sobrepoem entre si (mesma classe) formam uma passagem so
+        new_index = len(self.open)
+        unmatched = np.flatnonzero(assignment < 0)
+        for i in unmatched:
+            if assignment[i] >= 0:
+                continue
+            assignment[i] = new_index
+            rest = unmatched[unmatched > i]
+            if len(rest):
+                iou = box_iou_matrix(detections.xyxy[i:i + 1], detections.xyxy[rest])[0]
+                group = rest[(iou >= self.iou_threshold) & (detections.cls[rest] == detections.cls[i])]
+                assignment[group[assignment[group] < 0]] = new_index
+            new_index += 1
+        return assignment
+
+    def _close_stale(self, timestamp):
+        closed = [p for p in self.open if (timestamp - p.end).total_seconds() > self.gap_s]
+        if closed:
+            self.open = [p for p in self.open if p not in closed]
+            self.passages_closed += len(closed)
+        return closed
+
+    def flush(self):
+        closed, self.open = self.open, []
+        self.passages_closed += len(closed)
+        return closed
+
+    def summary(self):
+        return (
+            f"Passagens: {self.passages_closed} encerradas, {len(self.open)} abertas | "
+            f"{self.frames_grouped} frames com detecção agrupados"
+        )
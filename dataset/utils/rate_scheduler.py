@@ -0,0 +1,96 @@
+import math
+import time
+from collections import deque
+
+
+# o que fazer quando um ciclo passa do prazo:
+# "skip" pula os horarios perdidos e volta para a grade original (taxa media preservada, sem rajada)
+# "late" comeca o proximo ciclo na hora e reancora a grade a partir dali
+OVERRUN_POLICIES = ["skip", "late"]
+# ciclos usados para medir a taxa alcancada
+RATE_WINDOW = 20
+
+
+class FixedRateScheduler:
+    """
+    agenda ciclos em taxa fixa com prazos no relogio monotonic (sem acumular desvio)
+
+    uso:
+        scheduler.begin_tick()
+        ... captura / inferencia ...
+        delay = scheduler.end_tick()   # segundos ate o proximo prazo (0 se atrasou)
+        cv2.waitKey(...) / time.sleep(delay)
+        scheduler.wait_remaining()     # completa a espera se o waitKey voltou antes
+    """
+
+    def __init__(self, interval_s, policy="skip"):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(f"politica invalida: {policy} (use {', '.join(OVERRUN_POLICIES)})")
+
+        self.interval_s = interval_s
+        self.policy = policy
+        self.next_deadline = None
+        self._tick_started = None
+        self._tick_times = deque(maxlen=RATE_WINDOW)
+
+        self.ticks = 0
+        self.missed_deadlines = 0  # ciclos que terminaram depois do prazo do proximo
+        self.skipped_ticks = 0  # horarios da grade pulados (politica "skip")
+        self.last_duration_s = 0.0
+        self.max_lateness_s = 0.0
+
+    def begin_tick(self):
+        now = time.monotonic()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        self.max_lateness_s = max(self.max_lateness_s, now - self.next_deadline)
+        self._tick_started = now
+        self._tick_times.append(now)
+        self.ticks += 1
+        return now
+
+    def end_tick(self):
+        """fecha o ciclo, calcula o proximo prazo e devolve quanto falta para ele"""
+        now = time.monotonic()
+        self.last_duration_s = now - self._tick_started
+        self.next_deadline += self.interval_s
+
+        if now > self.next_deadline:
+            self.missed_deadlines += 1
+            if self.policy == "skip":
+                missed = math.ceil((now - self.next_deadline) / self.interval_s)
+                self.skipped_ticks += missed
+                self.next_deadline += missed * self.interval_s
+            else:
+                self.next_deadline = now
+
+        return max(0.0, self.next_deadline - now)
+
+    def remaining(self):
+        if self.next_deadline is None:
+            return 0.0
+        return max(0.0, self.next_deadline - time.monotonic())
+
+    def wait_remaining(self):
+        remaining = self.remaining()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    @property
+    def target_rate(self):
+        return 1.0 / self.interval_s if self.interval_s > 0 else float("inf")
+
+    @property
+    def achieved_rate(self):
+        """ciclos por segundo nos ultimos RATE_WINDOW ciclos"""
+        if len(self._tick_times) < 2:
+            return 0.0
+        span = self._tick_times[-1] - self._tick_times[0]
+        return (len(self._tick_times) - 1) / span if span > 0 else 0.0
+
+    def summary(self):
+        return (
+            f"taxa {self.achieved_rate:.2f}/{self.target_rate:.2f} Hz | "
+            f"prazos perdidos: {self.missed_deadlines}/{self.ticks} | "
+            f"ciclos pulados: {self.skipped_ticks} | último ciclo {self.last_duration_s * 1000:.0f} ms"
+        )
@@ -0,0 +1,103 @@
+import time
+
+import cv2
+import mss
+import numpy as np
+
+
+class ScreenGrabber:
+    """
+    captura continua de uma regiao da tela
+
+    - um unico mss aberto enquanto a deteccao roda (criado na thread que captura:
+      no Windows e no X11 o contexto do mss pertence a thread que o abriu)
+    - os pixels BGRA do mss sao lidos sem copia e convertidos para BGR direto num
+      buffer preparado uma vez (cvtColor com dst=)
+    - grab() devolve sempre o mesmo array: quem precisa guardar o frame alem da
+      proxima captura (gravacao em disco, fila) deve copiar
+    """
+
+    def __init__(self, region):
+        self.region = dict(region)
+        self._sct = None
+        self._buffer = np.empty((self.region["height"], self.region["width"], 3), dtype=np.uint8)
+
+        self.captures = 0
+        self.last_latency_ms = 0.0
+        self.avg_latency_ms = None  # media movel
+
+    def grab(self):
+        if self._sct is None:
+            self._sct = mss.mss()
+
+        start = time.perf_counter()
+        shot = self._sct.grab(self.region)
+        height, width = shot.height, shot.width
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(height, width, 4)
+
+        if self._buffer.shape[:2] != (height, width):
+            # escala do monitor (hidpi) pode mudar o tamanho real da captura
+            self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._buffer)
+
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        self.avg_latency_ms = (
+            self.last_latency_ms if self.avg_latency_ms is None
+            else 0.9 * self.avg_latency_ms + 0.1 * self.last_latency_ms
+        )
+        self.captures += 1
+        return self._buffer
+
+    def buffer_bytes(self):
+        return self._buffer.nbytes
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def region_bounds(regions):
+    """menor retangulo (dict do mss) que contem todas as regioes"""
+    left = min(r["left"] for r in regions)
+    top = min(r["top"] for r in regions)
+    right = max(r["left"] + r["width"] for r in regions)
+    bottom = max(r["top"] + r["height"] for r in regions)
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+
+class MultiRegionGrabber(ScreenGrabber):
+    """
+    varias regioes nomeadas (feeds lado a lado no navegador) numa unica captura
+
+    grab() captura o retangulo que contem todas as regioes, como o ScreenGrabber;
+    slices() devolve cada regiao como view desse buffer (sem copia), valida ate a
+    proxima captura. regioes distantes entre si custam a area entre elas
+    """
+
+    def __init__(self, regions):
+        self.regions = {name: dict(region) for name, region in regions.items()}
+        super().__init__(region_bounds(self.regions.values()))
+
+        left, top = self.region["left"], self.region["top"]
+        self.offsets = {
+            name: (r["left"] - left, r["top"] - top, r["left"] - left + r["width"], r["top"] - top + r["height"])
+            for name, r in self.regions.items()
+        }
+
+    def slices(self, frame):
+        """[(nome, (x0, y0), view)] de cada regiao no frame capturado"""
+        return [(name, (x0, y0), frame[y0:y1, x0:x1]) for name, (x0, y0, x1, y1) in self.offsets.items()]
+
+    def region_at(self, x, y):
+        """nome da regiao que contem o ponto (coordenadas do frame capturado), ou None"""
+        for name, (x0, y0, x1, y1) in self.offsets.items():
+            if x0 <= x < x1 and y0 <= y < y1:
+                return name
+        return None
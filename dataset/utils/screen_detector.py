@@ -1,18 +1,32 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from onnx_backend import BACKENDS
+from rate_scheduler import OVERRUN_POLICIES
+from log_writer import BufferedLogWriter
+from log_compaction import EmptyFrameRun
+from detection_store import STORE_FORMATS, DEFAULT_STORE_DIR
+from memory_monitor import format_sample
+from screen_engine import ScreenDetectionEngine, MEMORY_SAMPLE_INTERVAL_S
+from passage_events import DEFAULT_GAP_S
+from clip_writer import DEFAULT_PRE_ROLL_S, DEFAULT_POST_ROLL_S
+from box_renderer import BoxRenderer
+from screen_capture import region_bounds
 from pathlib import Path
 import tkinter as tk
-from tkinter import filedialog, ttk, messagebox
+from tkinter import filedialog, ttk, messagebox, simpledialog
 import threading
 import time
 from datetime import datetime
 import mss
 import mss.tools
-import gc
 import os
 
 
+# log em texto: rotacao por tamanho e compressao dos segmentos rotacionados
+LOG_MAX_MB = 10
+LOG_COMPRESS_ROTATED = False
+
+
 class ScreenDetectorGUI:
     def __init__(self, root):
         self.root = root
@@ -20,22 +34,49 @@ class ScreenDetectorGUI:
         self.root.geometry("900x700")
         
         self.model_path = tk.StringVar(value="yolov8n-detector-gamba.pt")
+        self.backend = tk.StringVar(value="torch")  # torch ou onnx (onnxruntime na CPU)
         self.detection_interval = tk.DoubleVar(value=0.5)  # meio segundo
+        self.overrun_policy = tk.StringVar(value="skip")  # ciclo atrasado: pula horarios ou so atrasa
         self.confidence_threshold = tk.DoubleVar(value=0.50)
         self.log_file_path = tk.StringVar(value="screen_detections.txt")
+        self.text_log_enabled = tk.BooleanVar(value=True)  # log em texto e opcional; o registro estruturado sempre grava
+        self.compact_empty_frames = tk.BooleanVar(value=True)  # frames seguidos sem detecção viram uma linha só
+        self.store_folder = tk.StringVar(value=DEFAULT_STORE_DIR)  # registros por frame, particionados por dia
+        self.store_format = tk.StringVar(value="jsonl")
         self.save_folder = tk.StringVar(value="detections_images")  # Pasta para salvar imagens
+        self.motion_gate_enabled = tk.BooleanVar(value=True)  # pula inferência em cena parada
+        self.group_passages = tk.BooleanVar(value=True)  # um registro e um par de imagens por passagem de animal
+        self.passage_gap = tk.DoubleVar(value=DEFAULT_GAP_S)  # segundos sem o animal para encerrar a passagem
+        self.record_clips = tk.BooleanVar(value=False)  # clipe mp4 por evento no lugar dos pares de imagens
+        self.pre_roll = tk.DoubleVar(value=DEFAULT_PRE_ROLL_S)  # segundos antes da detecção no clipe
+        self.tiled_mode = tk.BooleanVar(value=False)  # tiles no tamanho nativo p/ animais pequenos
+        self.trace_allocations = tk.BooleanVar(value=False)  # tracemalloc: acha onde a memória cresce (deixa o python mais lento)
         
         self.is_running = False
         self.detection_thread = None
         self.total_detections = 0
         self.frames_processed = 0
-        self.frames_since_gc = 0  # Contador para garbage collection
+        self.engine = None  # captura, inferência e registros da sessão em andamento
+        self.log_writer = None  # arquivo de log aberto uma vez, escrito em thread própria
+        self.empty_run = EmptyFrameRun()
         
         # Coordenadas da região a capturar
         self.capture_region = None
+        # Várias regiões nomeadas (feeds lado a lado): uma captura e um lote de inferência por ciclo
+        self.capture_regions = {}
         self.selecting = False
         
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def on_close(self):
+        """Fecha a janela gravando o que ainda está no buffer do log"""
+        self.is_running = False
+        if self.log_writer is not None:
+            for when, message in self.empty_run.flush():
+                self.log_writer.write(message, when)
+            self.log_writer.close()
+        self.root.destroy()
     
     def setup_ui(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -63,7 +104,9 @@ class ScreenDetectorGUI:
         btn_frame.pack(fill=tk.X, pady=5)
         
         ttk.Button(btn_frame, text="🖱️ SELECIONAR REGIÃO", command=self.select_region, width=25).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="➕ Adicionar região", command=self.add_region, width=20).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="👁️ Visualizar", command=self.preview_region, width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="🗑️ Limpar", command=self.clear_regions, width=10).pack(side=tk.LEFT, padx=5)
         
         self.region_label = ttk.Label(
             region_frame,
@@ -81,6 +124,7 @@ class ScreenDetectorGUI:
         
         ttk.Entry(model_frame, textvariable=self.model_path, width=60).pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Button(model_frame, text="procurar", command=self.browse_model).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(model_frame, textvariable=self.backend, values=BACKENDS, state="readonly", width=7).pack(side=tk.LEFT, padx=5)
         
         # CONFIGURAÇÕES
         config_frame = ttk.LabelFrame(main_frame, text="⚙️ Configurações", padding="10")
@@ -101,6 +145,9 @@ class ScreenDetectorGUI:
         )
         interval_spin.pack(side=tk.LEFT, padx=5)
         ttk.Label(interval_frame, text="(0.5 = 2 capturas/seg)").pack(side=tk.LEFT, padx=5)
+        ttk.Label(interval_frame, text="Se atrasar:").pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(interval_frame, textvariable=self.overrun_policy, values=OVERRUN_POLICIES, state="readonly", width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(interval_frame, text="(skip = pula capturas perdidas, late = só atrasa)", foreground="gray").pack(side=tk.LEFT, padx=5)
         
         # Confiança
         conf_frame = ttk.Frame(config_frame)
@@ -124,6 +171,55 @@ class ScreenDetectorGUI:
         self.confidence_label = ttk.Label(conf_frame, text="50%", foreground="blue", font=("Arial", 9, "bold"))
         self.confidence_label.pack(side=tk.LEFT, padx=5)
         
+        # Filtro de movimento
+        motion_frame = ttk.Frame(config_frame)
+        motion_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Checkbutton(
+            motion_frame,
+            text="Pular inferência quando a cena não muda (filtro de movimento)",
+            variable=self.motion_gate_enabled
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # Passagens
+        passage_frame = ttk.Frame(config_frame)
+        passage_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Checkbutton(
+            passage_frame,
+            text="Agrupar detecções em passagens (1 registro + 1 par de imagens por animal)",
+            variable=self.group_passages
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Label(passage_frame, text="Encerrar após (s):").pack(side=tk.LEFT, padx=5)
+        ttk.Spinbox(passage_frame, from_=0.5, to=60, increment=0.5, textvariable=self.passage_gap, width=6).pack(side=tk.LEFT, padx=5)
+        
+        # Clipes de evento
+        clip_frame = ttk.Frame(config_frame)
+        clip_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Checkbutton(
+            clip_frame,
+            text="Gravar clipe do evento (antes + durante + depois) no lugar das imagens",
+            variable=self.record_clips
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Label(clip_frame, text="Antes da detecção (s):").pack(side=tk.LEFT, padx=5)
+        ttk.Spinbox(clip_frame, from_=0, to=60, increment=1, textvariable=self.pre_roll, width=6).pack(side=tk.LEFT, padx=5)
+        
+        # Modo fatiado
+        tiled_frame = ttk.Frame(config_frame)
+        tiled_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Checkbutton(
+            tiled_frame,
+            text="Modo fatiado: tiles sobrepostos para animais pequenos/distantes",
+            variable=self.tiled_mode
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(
+            tiled_frame,
+            text="Rastrear alocações (tracemalloc)",
+            variable=self.trace_allocations
+        ).pack(side=tk.LEFT, padx=5)
+        
         # Arquivo de log
         log_frame = ttk.Frame(config_frame)
         log_frame.pack(fill=tk.X, pady=5)
@@ -131,6 +227,17 @@ class ScreenDetectorGUI:
         ttk.Label(log_frame, text="Arquivo de log:").pack(side=tk.LEFT, padx=5)
         ttk.Entry(log_frame, textvariable=self.log_file_path, width=40).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         ttk.Button(log_frame, text="escolher", command=self.browse_log_file).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(log_frame, text="Log em texto", variable=self.text_log_enabled).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(log_frame, text="Compactar frames vazios", variable=self.compact_empty_frames).pack(side=tk.LEFT, padx=5)
+        
+        # Registro estruturado
+        store_frame = ttk.Frame(config_frame)
+        store_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(store_frame, text="Registros (por dia):").pack(side=tk.LEFT, padx=5)
+        ttk.Entry(store_frame, textvariable=self.store_folder, width=40).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Button(store_frame, text="escolher", command=self.browse_store_folder).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(store_frame, textvariable=self.store_format, values=STORE_FORMATS, state="readonly", width=8).pack(side=tk.LEFT, padx=5)
         
         # Pasta para salvar imagens
         save_frame = ttk.Frame(config_frame)
@@ -199,13 +306,79 @@ class ScreenDetectorGUI:
         if folder_path:
             self.save_folder.set(folder_path)
     
+    def browse_store_folder(self):
+        folder_path = filedialog.askdirectory(title="Escolher pasta dos registros de detecção")
+        if folder_path:
+            self.store_folder.set(folder_path)
+    
     def update_confidence_label(self, value):
         threshold = float(value)
         percentage = int(threshold * 100)
         self.confidence_label.config(text=f"{percentage}%")
     
     def select_region(self):
-        """Permite usuário selecionar região da tela"""
+        """Permite usuário selecionar região da tela (substitui as regiões anteriores)"""
+        region = self.pick_region()
+        if region is None:
+            return
+        
+        self.capture_region = region
+        self.capture_regions = {}
+        self.update_region_label()
+        self.log_message(f"✓ Região selecionada: {region['width']}x{region['height']} px")
+    
+    def add_region(self):
+        """Adiciona mais uma região nomeada (um feed); todas são capturadas juntas"""
+        region = self.pick_region()
+        if region is None:
+            return
+        
+        # a região única já selecionada vira a primeira da lista (só depois do nome ser aceito)
+        regions = dict(self.capture_regions)
+        if self.capture_region and not regions:
+            regions["regiao_1"] = self.capture_region
+        
+        name = simpledialog.askstring(
+            "Nome da região",
+            "Nome do feed (vai nos registros e no log):",
+            initialvalue=f"regiao_{len(regions) + 1}",
+            parent=self.root
+        )
+        if not name or not name.strip():
+            self.log_message("❌ Região sem nome, não adicionada")
+            return
+        name = name.strip().replace(" ", "_")
+        if name in regions:
+            messagebox.showwarning("Aviso", f"Já existe uma região chamada '{name}'")
+            return
+        
+        regions[name] = region
+        self.capture_regions = regions
+        self.capture_region = region_bounds(self.capture_regions.values())
+        self.update_region_label()
+        self.log_message(f"✓ Região '{name}' adicionada: {region['width']}x{region['height']} px ({len(self.capture_regions)} regiões)")
+    
+    def clear_regions(self):
+        self.capture_region = None
+        self.capture_regions = {}
+        self.update_region_label()
+        self.log_message("🗑️ Regiões removidas")
+    
+    def update_region_label(self):
+        if self.capture_regions:
+            names = ", ".join(f"{name} {r['width']}x{r['height']}" for name, r in self.capture_regions.items())
+            self.region_label.config(text=f"✓ {len(self.capture_regions)} regiões: {names}", foreground="green")
+        elif self.capture_region:
+            r = self.capture_region
+            self.region_label.config(
+                text=f"✓ Região: {r['width']}x{r['height']} px em ({r['left']}, {r['top']})",
+                foreground="green"
+            )
+        else:
+            self.region_label.config(text="Nenhuma região selecionada", foreground="red")
+    
+    def pick_region(self):
+        """Tela cheia para arrastar o mouse sobre a região; devolve o dict da região ou None"""
         # Minimizar janela
         self.root.iconify()
         time.sleep(0.5)
@@ -284,7 +457,7 @@ class ScreenDetectorGUI:
         # Se apertou ESC, cancelar
         if key == 27:
             self.log_message("❌ Seleção cancelada")
-            return
+            return None
         
         if start_point and end_point:
             # Normalizar coordenadas
@@ -300,23 +473,18 @@ class ScreenDetectorGUI:
             if width < 50 or height < 50:
                 messagebox.showwarning("Aviso", "Região muito pequena! Selecione uma área maior.")
                 self.log_message("❌ Região muito pequena")
-                return
+                return None
             
-            self.capture_region = {
+            return {
                 "left": x1,
                 "top": y1,
                 "width": width,
                 "height": height
             }
-            
-            self.region_label.config(
-                text=f"✓ Região: {width}x{height} px em ({x1}, {y1})",
-                foreground="green"
-            )
-            self.log_message(f"✓ Região selecionada: {width}x{height} px")
-        else:
-            messagebox.showwarning("Aviso", "Você precisa ARRASTAR o mouse para selecionar uma região!")
-            self.log_message("❌ Nenhuma região foi desenhada")
+        
+        messagebox.showwarning("Aviso", "Você precisa ARRASTAR o mouse para selecionar uma região!")
+        self.log_message("❌ Nenhuma região foi desenhada")
+        return None
     
     def preview_region(self):
         """Mostra preview da região selecionada"""
@@ -329,20 +497,18 @@ class ScreenDetectorGUI:
             img = np.array(screenshot)
             img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
         
+        self.draw_region_outlines(img)
         cv2.imshow("Preview da Região - Pressione qualquer tecla", img)
         cv2.waitKey(0)
         cv2.destroyAllWindows()
     
-    def capture_screen(self):
-        """Captura a região selecionada da tela"""
-        if not self.capture_region:
-            return None
-        
-        with mss.mss() as sct:
-            screenshot = sct.grab(self.capture_region)
-            img = np.array(screenshot)
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-        
+    def draw_region_outlines(self, img):
+        """Contorno e nome de cada região nomeada sobre a captura que contém todas"""
+        left, top = self.capture_region["left"], self.capture_region["top"]
+        for name, r in self.capture_regions.items():
+            x1, y1 = r["left"] - left, r["top"] - top
+            cv2.rectangle(img, (x1, y1), (x1 + r["width"] - 1, y1 + r["height"] - 1), (255, 200, 0), 1)
+            cv2.putText(img, name, (x1 + 5, y1 + r["height"] - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 200, 0), 2)
         return img
     
     def log_message(self, message):
@@ -360,64 +526,113 @@ class ScreenDetectorGUI:
             self.log_text.delete("1.0", "2.0")
     
     def log_to_file(self, message):
-        """Salva detecção no arquivo de log com rotação automática"""
-        try:
-            log_path = self.log_file_path.get()
-            
-            # Verificar tamanho do arquivo (rotacionar se > 10 MB)
-            if os.path.exists(log_path):
-                file_size = os.path.getsize(log_path) / (1024 * 1024)  # MB
-                if file_size > 10:
-                    # Criar backup com timestamp
-                    backup_name = log_path.replace('.txt', f'_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
-                    os.rename(log_path, backup_name)
-                    self.log_message(f"📦 Log rotacionado: {os.path.basename(backup_name)}")
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(f"[{timestamp}] {message}\n")
-        except Exception as e:
-            print(f"Erro ao salvar log: {e}")
+        """Salva detecção no arquivo de log (buffer em thread própria, com rotação automática)"""
+        if not self.text_log_enabled.get():
+            return
+        
+        # a sequencia de frames vazios em aberto vai antes, para manter a ordem do log
+        for when, pending_message in self.empty_run.flush():
+            self.write_log_line(pending_message, when)
+        self.write_log_line(message)
+    
+    def log_empty_frame(self, frame_number):
+        """Registra um frame sem detecção (compactado em sequências quando a opção está ativa)"""
+        if not self.text_log_enabled.get():
+            return
+        
+        if not self.compact_empty_frames.get():
+            self.log_to_file(f"Frame {frame_number}: Nenhuma detecção")
+            return
+        
+        for when, message in self.empty_run.add(frame_number, datetime.now()):
+            self.write_log_line(message, when)
+    
+    def write_log_line(self, message, timestamp=None):
+        """Envia uma linha ao escritor de log do arquivo configurado"""
+        log_path = self.log_file_path.get()
+        
+        # um escritor por arquivo: trocar o caminho na interface fecha o anterior
+        if self.log_writer is None or self.log_writer.path != log_path:
+            if self.log_writer is not None:
+                self.log_writer.close()
+            self.log_writer = BufferedLogWriter(
+                log_path,
+                max_mb=LOG_MAX_MB,
+                compress=LOG_COMPRESS_ROTATED,
+                on_rotate=lambda backup_name: self.log_message(f"📦 Log rotacionado: {os.path.basename(backup_name)}")
+            )
+        
+        self.log_writer.write(message, timestamp)
     
     def update_stats(self):
         """Atualiza estatísticas na interface"""
         status = "🟢 RODANDO" if self.is_running else "🔴 PARADO"
+        engine = self.engine
+        grabber = engine.grabber if engine else None
+        scheduler = engine.scheduler if engine else None
+        image_writer = engine.image_writer if engine else None
+        memory_sample = engine.last_memory_sample if engine else None
         self.stats_label.config(
             text=f"Frames processados: {self.frames_processed} | "
                  f"Detecções totais: {self.total_detections} | "
+                 f"Inferências evitadas: {engine.inferences_skipped if engine else 0} | "
+                 f"Captura: {(grabber.avg_latency_ms or 0) if grabber else 0:.0f} ms | "
+                 f"Taxa: {scheduler.achieved_rate if scheduler else 0:.2f}/{scheduler.target_rate if scheduler else 0:.2f} Hz | "
+                 f"Prazos perdidos: {scheduler.missed_deadlines if scheduler else 0} | "
+                 f"Memória: {memory_sample['rss_mb'] if memory_sample else 0:.0f} MB | "
+                 f"Gravações pendentes: {image_writer.pending if image_writer else 0} | "
+                 f"Falhas: {image_writer.failed + image_writer.dropped if image_writer else 0} | "
                  f"Status: {status}"
         )
     
-    def save_detection_frame(self, frame_original, frame_annotated, detections_info, frame_number):
-        """Salva frame com e sem detecção em arquivos separados"""
-        try:
-            # Criar pasta se não existir
-            save_folder = Path(self.save_folder.get())
-            save_folder.mkdir(parents=True, exist_ok=True)
-            
-            # Gerar nome do arquivo com formato: classe-DD/MM/YYYY HH:MM:SS
-            timestamp = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
-            
-            # Pegar primeira classe detectada
-            first_class = detections_info[0].split("(")[0].strip().replace(" ", "-") if detections_info else "unknown"
-            
-            # Nome base
-            base_name = f"{first_class}_{timestamp}"
-            
-            # Salvar ORIGINAL (sem detecção)
-            filename_original = f"{base_name}_original.jpg"
-            filepath_original = save_folder / filename_original
-            cv2.imwrite(str(filepath_original), frame_original)
-            
-            # Salvar ANOTADO (com detecção)
-            filename_annotated = f"{base_name}_detected.jpg"
-            filepath_annotated = save_folder / filename_annotated
-            cv2.imwrite(str(filepath_annotated), frame_annotated)
-            
-            return base_name
-        except Exception as e:
-            print(f"Erro ao salvar imagem: {e}")
-            return None
+    def sample_memory(self, force=False):
+        """Amostra de memória quando o intervalo vence: registro completo no armazenamento, resumo no log"""
+        record = self.engine.sample_memory(force)
+        if record is None:
+            return
+        
+        self.log_to_file(format_sample(record))
+        if record.get("top_growth"):
+            top = record["top_growth"][0]
+            self.log_message(f"🧠 RSS {record['rss_mb']:.0f} MB | maior crescimento: {os.path.basename(top['where'])} (+{top['size_diff_kb']:.0f} KB)")
+    
+    def log_passage(self, record):
+        """Uma linha por passagem encerrada (no lugar de uma linha e um par de imagens por frame)"""
+        start = record["ts"].strftime("%H:%M:%S")
+        end = record["end"][11:19]
+        classes = ", ".join(f"{name}={frames}" for name, frames in record["class_frames"].items())
+        text = (
+            f"Passagem {record['id']}: {record['class']} de {start} a {end} "
+            f"({record['duration_s']:.1f}s, {record['frames']} frames, até {record['max_boxes']} por frame) - "
+            f"pico {record['peak_conf'] * 100:.1f}% no frame {record['best_frame']} | classes: {classes}"
+        )
+        if record.get("region"):
+            text += f" | região: {record['region']}"
+        if record["image"]:
+            text += f" | Salvo: {record['image']}_original.jpg + {record['image']}_detected.jpg"
+        self.log_to_file(text)
+        
+        log_msg = f"🐾 Passagem {record['id']} encerrada: {record['class']}, {record['duration_s']:.1f}s, pico {record['peak_conf'] * 100:.1f}%"
+        if record["image"]:
+            log_msg += " | 💾 Melhor frame salvo"
+        self.log_message(log_msg)
+    
+    def log_clip(self, record):
+        """Uma linha por clipe de evento encerrado"""
+        self.log_to_file(
+            f"Clipe: {record['clip']} | {record['class']} detectado às {record['detected_at'][11:19]} | "
+            f"{record['duration_s']:.1f}s, {record['frames']} frames ({record['pre_roll_frames']} antes da detecção)"
+        )
+        self.log_message(f"🎬 Clipe salvo: {record['clip']} ({record['duration_s']:.1f}s)")
+    
+    def log_image_failures(self):
+        """Registra as imagens e clipes que os escritores não conseguiram gravar"""
+        for writer in (self.engine.image_writer, self.engine.clip_writer):
+            if writer is None:
+                continue
+            for failed_path, reason in writer.take_failures():
+                self.log_to_file(f"Erro ao salvar {failed_path}: {reason}")
+                self.log_message(f"❌ Não salvo: {os.path.basename(failed_path)} ({reason})")
     
     def start_detection(self):
         """Inicia o loop de detecção"""
@@ -431,6 +646,10 @@ class ScreenDetectorGUI:
             messagebox.showerror("Erro", "Selecione um modelo válido")
             return
         
+        if self.detection_thread is not None and self.detection_thread.is_alive():
+            self.log_message("⏳ Aguarde a sessão anterior terminar")
+            return
+        
         self.is_running = True
         self.frames_processed = 0
         self.total_detections = 0
@@ -445,11 +664,22 @@ class ScreenDetectorGUI:
         # Criar cabeçalho do log
         self.log_to_file("="*80)
         self.log_to_file(f"NOVA SESSÃO DE DETECÇÃO INICIADA")
-        self.log_to_file(f"Região: {self.capture_region['width']}x{self.capture_region['height']}")
+        if self.capture_regions:
+            names = ", ".join(f"{name} {r['width']}x{r['height']}" for name, r in self.capture_regions.items())
+            self.log_to_file(f"Regiões: {names} (uma captura, um lote por ciclo)")
+        else:
+            self.log_to_file(f"Região: {self.capture_region['width']}x{self.capture_region['height']}")
         self.log_to_file(f"Modelo: {model_path}")
-        self.log_to_file(f"Intervalo: {self.detection_interval.get()}s")
+        self.log_to_file(f"Backend: {self.backend.get()}")
+        self.log_to_file(f"Intervalo: {self.detection_interval.get()}s (atraso: {self.overrun_policy.get()})")
         self.log_to_file(f"Confiança: {self.confidence_threshold.get()}")
+        self.log_to_file(f"Filtro de movimento: {'ativo' if self.motion_gate_enabled.get() else 'desligado'}")
+        self.log_to_file(f"Passagens: {f'agrupadas (encerra após {self.passage_gap.get()}s sem o animal)' if self.group_passages.get() else 'desligado (log e imagens por frame)'}")
+        self.log_to_file(f"Clipes: {f'ativo ({self.pre_roll.get()}s antes, {DEFAULT_POST_ROLL_S}s depois)' if self.record_clips.get() else 'desligado'}")
+        self.log_to_file(f"Modo fatiado: {'ativo' if self.tiled_mode.get() else 'desligado'}")
+        self.log_to_file(f"Memória: amostra a cada {MEMORY_SAMPLE_INTERVAL_S}s, tracemalloc {'ativo' if self.trace_allocations.get() else 'desligado'}")
         self.log_to_file(f"Pasta de imagens: {save_folder.absolute()}")
+        self.log_to_file(f"Registros: {Path(self.store_folder.get()).absolute()} ({self.store_format.get()})")
         self.log_to_file("="*80)
         
         self.log_message("🚀 Detecção iniciada!")
@@ -463,66 +693,107 @@ class ScreenDetectorGUI:
         self.is_running = False
         self.start_button.config(state='normal')
         self.stop_button.config(state='disabled')
+        self.write_session_footer()
+    
+    def write_session_footer(self):
+        """Rodapé da sessão depois que a thread de detecção terminar (ela ainda grava passagens e o resumo)"""
+        if self.detection_thread is not None and self.detection_thread.is_alive():
+            # sem join: a thread de detecção também atualiza a interface
+            self.root.after(100, self.write_session_footer)
+            return
         
         self.log_to_file("="*80)
         self.log_to_file(f"SESSÃO ENCERRADA - Frames: {self.frames_processed}, Detecções: {self.total_detections}")
         self.log_to_file("="*80 + "\n")
+        if self.log_writer is not None:
+            self.log_writer.flush()
         
         self.log_message("⏹ Detecção parada!")
         self.update_stats()
     
     def detection_loop(self):
-        """Loop principal de detecção"""
+        """Loop principal de detecção (captura, inferência e registros ficam no ScreenDetectionEngine)"""
         try:
-            # Carregar modelo
-            model = YOLO(self.model_path.get())
-            interval = self.detection_interval.get()
-            threshold = self.confidence_threshold.get()
+            self.engine = ScreenDetectionEngine(
+                self.capture_region,
+                self.model_path.get(),
+                interval=self.detection_interval.get(),
+                threshold=self.confidence_threshold.get(),
+                backend=self.backend.get(),
+                motion_gate=self.motion_gate_enabled.get(),
+                tiled=self.tiled_mode.get(),
+                overrun_policy=self.overrun_policy.get(),
+                store_folder=self.store_folder.get(),
+                store_format=self.store_format.get(),
+                save_folder=self.save_folder.get(),
+                trace_allocations=self.trace_allocations.get(),
+                memory_interval_s=MEMORY_SAMPLE_INTERVAL_S,
+                group_passages=self.group_passages.get(),
+                passage_gap_s=self.passage_gap.get(),
+                record_clips=self.record_clips.get(),
+                pre_roll_s=self.pre_roll.get(),
+                post_roll_s=DEFAULT_POST_ROLL_S,
+                regions=self.capture_regions or None,
+            )
+            engine = self.engine
+            engine.start()
+            renderer = BoxRenderer(engine.model.names)
+            engine.memory_monitor.register("log_tela", lambda: len(self.log_text.get("1.0", tk.END).encode("utf-8")))
             
             self.log_message("✓ Modelo YOLO carregado")
+            self.log_message(f"📐 {engine.input_policy.report()}")
             
             window_name = 'Screen Detector - Pressione Q para fechar janela'
             cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
             cv2.resizeWindow(window_name, 1280, 720)
             
             while self.is_running:
-                start_time = time.time()
-                
-                # Capturar tela
-                frame = self.capture_screen()
+                # Capturar tela e processar com YOLO (ou reaproveitar se a cena nao mudou)
+                step = engine.step()
                 
-                if frame is None:
+                if step is None:
                     self.log_message("❌ Erro ao capturar tela")
-                    time.sleep(interval)
+                    time.sleep(engine.scheduler.end_tick())
                     continue
                 
-                # Processar com YOLO
-                results = model(frame, imgsz=1920, verbose=False, conf=threshold)
+                frame = step["frame"]
+                detections = step["detections"]
+                reused = step["reused"]
+                frame_number = step["frame_number"]
+                saved_basename = None
                 
                 # Contador de detecções neste frame
-                detections_in_frame = len(results[0].boxes)
+                detections_in_frame = step["count"]
                 
-                # Mostrar frame com detecções
-                annotated_frame = results[0].plot()
+                # agrupando em passagens, as imagens e o log saem por passagem (o melhor frame já foi copiado no step)
+                grouping = engine.passages is not None
                 
-                if detections_in_frame > 0:
-                    self.total_detections += detections_in_frame
-                    
-                    # Logar cada detecção
-                    detection_summary = []
-                    for box in results[0].boxes:
-                        class_id = int(box.cls[0])
-                        confidence = float(box.conf[0])
-                        class_name = results[0].names[class_id]
-                        
-                        detection_info = f"{class_name} ({confidence*100:.1f}%)"
-                        detection_summary.append(detection_info)
+                # o frame capturado é o buffer do grabber: o original só é copiado quando vai ser salvo
+                will_save = detections_in_frame > 0 and not reused and not grouping and engine.image_writer is not None
+                frame_original = frame.copy() if will_save else None
+                
+                # Mostrar frame com detecções (desenhadas direto no buffer, sobrescrito na próxima captura)
+                annotated_frame = renderer.draw(frame, detections)
+                
+                if detections_in_frame > 0 and grouping:
+                    for passage in step["opened"]:
+                        self.log_message(f"🐾 Passagem {passage.id} iniciada: {passage.main_class} ({passage.peak_conf * 100:.1f}%)")
+                elif detections_in_frame > 0:
+                    # Logar cada detecção (com várias regiões, o nome do feed de cada uma)
+                    if step["regions"]:
+                        detection_summary = [f"[{r['name']}] {label}" for r in step["regions"] for label in r["detections"].labels()]
+                    else:
+                        detection_summary = detections.labels()
                     
-                    # Salvar AMBAS versões: original e anotada
-                    saved_basename = self.save_detection_frame(frame, annotated_frame, detection_summary, self.frames_processed)
+                    # Salvar AMBAS versões: original e anotada (cena parada ja foi salva)
+                    if will_save:
+                        # a cópia anotada vai para a fila: o texto de status abaixo não entra na imagem salva
+                        saved_basename = engine.save_frames(frame_original, annotated_frame.copy(), detection_summary)
                     
                     # Log no arquivo
-                    summary_text = f"Frame {self.frames_processed}: {detections_in_frame} detecção(ões) - {', '.join(detection_summary)}"
+                    summary_text = f"Frame {frame_number}: {detections_in_frame} detecção(ões) - {', '.join(detection_summary)}"
+                    if reused:
+                        summary_text += " | sem movimento"
                     if saved_basename:
                         summary_text += f" | Salvo: {saved_basename}_original.jpg + {saved_basename}_detected.jpg"
                     self.log_to_file(summary_text)
@@ -533,40 +804,63 @@ class ScreenDetectorGUI:
                         log_msg += f" | 💾 Salvo (2 versões)"
                     self.log_message(log_msg)
                 else:
-                    self.log_to_file(f"Frame {self.frames_processed}: Nenhuma detecção")
+                    self.log_empty_frame(frame_number)
+                
+                for record in step["closed"]:
+                    self.log_passage(record)
+                
+                if step["clip_started"]:
+                    self.log_message(f"🎬 Clipe iniciado: {step['clip_started']}")
+                if step["clip_finished"]:
+                    self.log_clip(step["clip_finished"])
+                
+                self.log_image_failures()
+                
+                self.frames_processed = engine.frames_processed
+                self.total_detections = engine.total_detections
                 
                 # Adicionar info no frame
-                info_text = f"Frame: {self.frames_processed} | Deteccoes: {detections_in_frame} | Total: {self.total_detections}"
+                info_text = f"Frame: {frame_number} | Deteccoes: {detections_in_frame} | Total: {self.total_detections}"
                 cv2.putText(annotated_frame, info_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                if self.capture_regions:
+                    self.draw_region_outlines(annotated_frame)
                 
                 cv2.imshow(window_name, annotated_frame)
                 
-                self.frames_processed += 1
-                self.frames_since_gc += 1
+                self.sample_memory()
                 self.update_stats()
                 
-                # Limpeza de memória a cada 100 frames (~50 segundos em 0.5s/frame)
-                if self.frames_since_gc >= 100:
-                    gc.collect()  # Garbage collection manual
-                    cv2.destroyWindow(window_name)  # Recriar janela para limpar cache
-                    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-                    cv2.resizeWindow(window_name, 1280, 720)
-                    self.frames_since_gc = 0
-                    self.log_message("🧹 Limpeza de memória executada")
-                
-                # Aguardar intervalo
-                elapsed = time.time() - start_time
-                wait_time = max(int((interval - elapsed) * 1000), 1)
+                # Aguardar o próximo prazo (waitKey pode voltar antes: completa com sleep)
+                wait_time = max(int(engine.scheduler.end_tick() * 1000), 1)
                 
                 if cv2.waitKey(wait_time) & 0xFF == ord('q'):
                     self.is_running = False
                     break
+                engine.scheduler.wait_remaining()
             
             cv2.destroyAllWindows()
             
-            # Limpeza final de memória
-            gc.collect()
-            self.log_message("🧹 Limpeza final de memória executada")
+            # passagens ainda abertas no fim da sessão
+            for record in engine.flush_passages():
+                self.log_passage(record)
+            record = engine.finish_clip()
+            if record:
+                self.log_clip(record)
+            
+            # amostra final: crescimento total da sessão
+            self.sample_memory(force=True)
+            self.log_message(
+                f"🧠 Memória: pico {engine.memory_monitor.peak_rss / 1024 / 1024:.0f} MB, "
+                f"sessão {(engine.memory_monitor.last_rss - engine.memory_monitor.start_rss) / 1024 / 1024:+.0f} MB"
+            )
+            
+            # espera as imagens que ainda estão na fila e fecha captura e registros
+            engine.close()
+            self.log_image_failures()
+            
+            for line in engine.summary_lines():
+                self.log_to_file(line)
+                self.log_message(f"📋 {line}")
             
         except Exception as e:
             error_msg = f"❌ Erro no loop de detecção: {str(e)}"
@@ -576,10 +870,11 @@ class ScreenDetectorGUI:
         
         finally:
             self.is_running = False
+            if self.engine is not None:
+                self.engine.close()
             self.start_button.config(state='normal')
             self.stop_button.config(state='disabled')
             cv2.destroyAllWindows()
-            gc.collect()  # Garantir limpeza
 
 
 def main():
@@ -0,0 +1,451 @@
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from model_registry import get_model
+from input_size import InputSizePolicy, model_train_size
+from motion_gate import MotionGate
+from tiled_inference import predict_tiled
+from image_writer import AsyncImageWriter
+from screen_capture import ScreenGrabber, MultiRegionGrabber, region_bounds
+from rate_scheduler import FixedRateScheduler
+from detection_store import DetectionStore, DEFAULT_STORE_DIR
+from memory_monitor import MemoryMonitor, results_bytes
+from detection_batch import DetectionBatch
+from passage_events import PassageAggregator, DEFAULT_GAP_S
+from box_renderer import BoxRenderer
+from clip_writer import ClipWriter, EventClipRecorder, DEFAULT_PRE_ROLL_S, DEFAULT_POST_ROLL_S
+
+
+# fracao do intervalo entre capturas que a inferencia pode usar
+LATENCY_BUDGET_FRACTION = 0.8
+# gravacao das imagens em segundo plano: "block" segura a captura se o disco nao acompanhar,
+# "drop_oldest" descarta as imagens mais antigas da fila
+IMAGE_WRITER_THREADS = 2
+IMAGE_WRITER_MAX_PENDING = 32
+IMAGE_WRITER_POLICY = "block"
+# amostras de memoria da sessao (rss, componentes, crescimento por linha com tracemalloc)
+MEMORY_SAMPLE_INTERVAL_S = 60
+MEMORY_STORE_SUBDIR = "memoria"
+# uma linha por passagem de animal (inicio, fim, pico de confianca, melhor frame, classes)
+PASSAGE_STORE_SUBDIR = "passagens"
+# um registro por clipe de evento (arquivo, inicio com pre-roll, deteccao, fim, frames)
+CLIP_STORE_SUBDIR = "clipes"
+
+
+class ScreenDetectionEngine:
+    """
+    loop de deteccao de uma regiao da tela, sem interface
+
+    captura, filtro de movimento, inferencia, registro estruturado, gravacao das
+    imagens e amostras de memoria. quem usa (a interface Tk ou o modo servico)
+    chama start() na thread do loop, step() a cada ciclo, espera
+    scheduler.end_tick() do jeito que preferir e close() no fim.
+    nada e desenhado aqui: quem exibe desenha as caixas (BoxRenderer) no frame devolvido.
+
+    com group_passages, frames seguidos com o mesmo animal viram uma passagem: ao
+    encerrar, um registro em <pasta de registros>/passagens e um par de imagens do
+    melhor frame (unico desenho feito aqui), em vez de um par por frame
+
+    com record_clips (e save_folder), cada evento vira um clipe mp4 na pasta de
+    imagens: pre-roll dos frames guardados no anel, o evento e o post-roll,
+    codificados em segundo plano; os pares de jpeg deixam de ser gravados
+
+    com regions ({nome: regiao}), uma unica captura cobre todas as regioes, cada
+    uma e uma view do frame (sem copia), com filtro de movimento proprio, e as que
+    mudaram vao ao modelo num unico lote por ciclo. o registro por frame sai por
+    regiao (fonte "tela:<nome>"); o frame e as caixas do step cobrem a captura inteira
+    """
+
+    def __init__(
+        self,
+        region,
+        model_path,
+        interval=0.5,
+        threshold=0.5,
+        backend="torch",
+        motion_gate=True,
+        tiled=False,
+        overrun_policy="skip",
+        store_folder=DEFAULT_STORE_DIR,
+        store_format="jsonl",
+        save_folder=None,
+        trace_allocations=False,
+        memory_interval_s=MEMORY_SAMPLE_INTERVAL_S,
+        group_passages=True,
+        passage_gap_s=DEFAULT_GAP_S,
+        record_clips=False,
+        pre_roll_s=DEFAULT_PRE_ROLL_S,
+        post_roll_s=DEFAULT_POST_ROLL_S,
+        regions=None,
+    ):
+        self.regions = {name: dict(r) for name, r in regions.items()} if regions else None
+        if self.regions:
+            region = region_bounds(self.regions.values())
+        self.region = dict(region)
+        self.model_path = model_path
+        self.interval = interval
+        self.threshold = threshold
+        self.backend = backend
+        self.motion_gate_enabled = motion_gate
+        # fatiado e por frame: com varias regioes o lote ja e o das regioes
+        self.tiled = tiled and not self.regions
+        self.overrun_policy = overrun_policy
+        self.store_folder = store_folder
+        self.store_format = store_format
+        self.save_folder = Path(save_folder) if save_folder else None
+        self.trace_allocations = trace_allocations
+        self.memory_interval_s = memory_interval_s
+        self.group_passages = group_passages
+        self.passage_gap_s = passage_gap_s
+        self.record_clips = record_clips and self.save_folder is not None
+        self.pre_roll_s = pre_roll_s
+        self.post_roll_s = post_roll_s
+
+        self.model = None
+        self.input_policy = None
+        self.motion_gate = None
+        self.grabber = None
+        self.scheduler = None
+        self.image_writer = None
+        self.detection_store = None
+        self.memory_monitor = None
+        self.memory_store = None
+        self.passages = None
+        self.passage_store = None
+        self.renderer = None
+        self.clip_writer = None
+        self.clips = None
+        self.clip_store = None
+        self.region_gates = {}
+        self.region_detections = {}  # ultimo resultado de cada regiao (coordenadas da regiao)
+        self.store_source = f"tela:{self.region['width']}x{self.region['height']}+{self.region['left']}+{self.region['top']}"
+        self.region_sources = {name: f"tela:{name}" for name in self.regions or {}}
+        self.store_model = Path(model_path).name
+
+        self.last_results = None
+        self.last_memory_sample = None
+        self.frames_processed = 0
+        self.total_detections = 0
+        self.region_batches = 0
+        self.region_images_inferred = 0
+
+    @property
+    def inferences_skipped(self):
+        if self.region_gates:
+            return sum(gate.skipped for gate in self.region_gates.values())
+        return self.motion_gate.skipped if self.motion_gate is not None else 0
+
+    def _source_size(self):
+        """(largura, altura) que vai ao modelo: a regiao, ou a maior das regioes (o lote usa um imgsz so)"""
+        if self.regions:
+            return max(r["width"] for r in self.regions.values()), max(r["height"] for r in self.regions.values())
+        return self.region["width"], self.region["height"]
+
+    def start(self):
+        """carrega o modelo e abre captura, registros e gravacao (chamar na thread do loop)"""
+        self.model = get_model(self.model_path, backend=self.backend)
+
+        # resolucao de entrada derivada da regiao capturada e do intervalo
+        self.input_policy = InputSizePolicy(
+            self.model,
+            latency_budget_ms=self.interval * 1000 * LATENCY_BUDGET_FRACTION,
+            # fatiado: os tiles pegam os animais pequenos, o frame inteiro roda no tamanho de treino
+            max_imgsz=model_train_size(self.model) if self.tiled else None
+        )
+        self.input_policy.choose(*self._source_size())
+
+        # filtro de movimento: cena parada reaproveita o ultimo resultado (um por regiao com varias)
+        self.motion_gate = MotionGate() if self.motion_gate_enabled and not self.regions else None
+        if self.regions and self.motion_gate_enabled:
+            self.region_gates = {name: MotionGate() for name in self.regions}
+
+        # um registro tipado por frame processado (timestamp, frame, fonte, modelo, caixas)
+        self.detection_store = DetectionStore(self.store_folder, fmt=self.store_format)
+
+        # um unico grabber aberto nesta thread, com o buffer BGR preparado uma vez
+        self.grabber = MultiRegionGrabber(self.regions) if self.regions else ScreenGrabber(self.region)
+
+        # prazos no relogio monotonic: atraso de um ciclo nao empurra os seguintes
+        self.scheduler = FixedRateScheduler(self.interval, policy=self.overrun_policy)
+
+        if self.record_clips:
+            # clipes no lugar dos jpeg: anel de pre-roll (slots fixos) + codificador em segundo plano
+            self.save_folder.mkdir(parents=True, exist_ok=True)
+            self.clip_writer = ClipWriter()
+            self.clips = EventClipRecorder(
+                self.clip_writer, self.save_folder, self.interval,
+                pre_roll_s=self.pre_roll_s, post_roll_s=self.post_roll_s
+            )
+            self.clip_store = DetectionStore(Path(self.store_folder) / CLIP_STORE_SUBDIR, fmt="jsonl", flush_rows=1)
+        elif self.save_folder is not None:
+            self.save_folder.mkdir(parents=True, exist_ok=True)
+            self.image_writer = AsyncImageWriter(
+                threads=IMAGE_WRITER_THREADS,
+                max_pending=IMAGE_WRITER_MAX_PENDING,
+                policy=IMAGE_WRITER_POLICY
+            )
+
+        # amostras de memoria no registro estruturado (<pasta de registros>/memoria/date=.../*.jsonl)
+        self.memory_monitor = MemoryMonitor(self.memory_interval_s, trace_allocations=self.trace_allocations)
+        self.memory_monitor.register("captura", self.grabber.buffer_bytes)
+        self.memory_monitor.register("resultados", lambda: results_bytes(self.last_results))
+        if self.clips is not None:
+            self.memory_monitor.register("pre-roll", lambda: self.clips.ring.nbytes)
+            self.memory_monitor.register("clipes", self.clip_writer.buffer_bytes)
+        self.memory_store = DetectionStore(Path(self.store_folder) / MEMORY_STORE_SUBDIR, fmt="jsonl", flush_rows=1)
+
+        if self.group_passages:
+            self.passages = PassageAggregator(gap_s=self.passage_gap_s)
+            self.passage_store = DetectionStore(Path(self.store_folder) / PASSAGE_STORE_SUBDIR, fmt="jsonl", flush_rows=1)
+            self.renderer = BoxRenderer(self.model.names)
+
+    def step(self):
+        """
+        um ciclo: abre o prazo, captura, infere (ou reaproveita) e registra
+        devolve None se a captura falhou; senao um dict com frame_number, frame (buffer do
+        grabber, reaproveitado na proxima captura), results, detections (DetectionBatch),
+        count, reused, as passagens abertas (opened) e encerradas (closed) neste ciclo e,
+        gravando clipes, o clipe aberto (clip_started, nome) e o encerrado (clip_finished, registro).
+        o ciclo so fecha em scheduler.end_tick(), chamado por quem espera
+        """
+        self.scheduler.begin_tick()
+
+        frame = self.grabber.grab()
+        if frame is None:
+            return None
+
+        reused = False
+        region_steps = []
+        if self.regions:
+            results, detections, region_steps = self._infer_regions(frame)
+            reused = all(r["reused"] for r in region_steps)
+        elif self.motion_gate is None or self.motion_gate.should_infer(frame) or self.last_results is None:
+            imgsz = self.input_policy.choose(self.region["width"], self.region["height"])
+            inference_start = time.perf_counter()
+            if self.tiled:
+                results = predict_tiled(self.model, frame, full_frame_imgsz=imgsz, conf=self.threshold)
+            else:
+                results = self.model(frame, imgsz=imgsz, verbose=False, conf=self.threshold)
+            # fatiado: o ciclo inteiro (tiles + frame inteiro) conta no orcamento
+            self.input_policy.record(time.perf_counter() - inference_start)
+            self.last_results = results
+        else:
+            results = self.last_results
+            reused = True
+
+        if self.regions:
+            for region_step in region_steps:
+                self.detection_store.add_frame(
+                    self.frames_processed, region_step["detections"].data(), self.model.names,
+                    source=region_step["source"], model=self.store_model
+                )
+        else:
+            # caixas convertidas uma vez: registro, log, desenho e contagem usam os mesmos arrays
+            detections = DetectionBatch.from_result(results[0])
+            self.detection_store.add_frame(
+                self.frames_processed, detections.data(), results[0].names,
+                source=self.store_source, model=self.store_model
+            )
+        count = len(detections)
+
+        step = {
+            "frame_number": self.frames_processed,
+            "frame": frame,
+            "results": results,
+            "detections": detections,
+            "count": count,
+            "reused": reused,
+            "opened": [],
+            "closed": [],
+            "clip_started": None,
+            "clip_finished": None,
+            "regions": region_steps,
+        }
+        now = datetime.now()
+        if self.clips is not None:
+            best = detections.best()
+            step["clip_started"], finished = self.clips.update(frame, now, best[0] if best else None)
+            step["clip_finished"] = self._store_clip(finished)
+        if self.passages is not None:
+            # gravando clipes nao ha par de jpeg: a passagem nao guarda copia do melhor frame
+            best_image = frame if self.image_writer is not None else None
+            step["opened"], closed = self.passages.update(self.frames_processed, now, detections, best_image)
+            step["closed"] = [self._finish_passage(passage) for passage in closed]
+            if self.clips is not None:
+                for passage in step["opened"]:
+                    passage.clip = self.clips.current_name
+        self.total_detections += count
+        self.frames_processed += 1
+        return step
+
+    def _infer_regions(self, frame):
+        """
+        regioes que mudaram num unico lote; as paradas reaproveitam o ultimo resultado
+        devolve (results do lote ou o anterior, caixas de todas as regioes nas coordenadas
+        do frame, [{name, source, detections, count, reused}] por regiao)
+        """
+        views = self.grabber.slices(frame)
+        pending = []
+        for name, _, view in views:
+            gate = self.region_gates.get(name)
+            if gate is None or gate.should_infer(view) or name not in self.region_detections:
+                pending.append((name, view))
+
+        results = self.last_results
+        if pending:
+            imgsz = self.input_policy.choose(
+                max(view.shape[1] for _, view in pending), max(view.shape[0] for _, view in pending)
+            )
+            inference_start = time.perf_counter()
+            # views do frame capturado, sem copia: o letterbox do ultralytics ja gera a entrada de cada uma
+            results = self.model([view for _, view in pending], imgsz=imgsz, verbose=False, conf=self.threshold)
+            # o lote inteiro ocupa o ciclo: o orcamento de latencia vale para ele, nao por imagem
+            self.input_policy.record(time.perf_counter() - inference_start)
+            for (name, _), result in zip(pending, results):
+                self.region_detections[name] = DetectionBatch.from_result(result)
+            self.last_results = results
+            self.region_batches += 1
+            self.region_images_inferred += len(pending)
+
+        inferred = {name for name, _ in pending}
+        region_steps = []
+        parts = []
+        for name, (x0, y0), _ in views:
+            region_detections = self.region_detections[name]
+            region_steps.append({
+                "name": name,
+                "source": self.region_sources[name],
+                "detections": region_detections,
+                "count": len(region_detections),
+                "reused": name not in inferred,
+            })
+            if region_detections:
+                data = region_detections.data()
+                data[:, [0, 2]] += x0
+                data[:, [1, 3]] += y0
+                parts.append(data)
+
+        merged = np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32)
+        return results, DetectionBatch.from_data(merged, self.model.names), region_steps
+
+    def save_frames(self, frame_original, frame_annotated, detections_info):
+        """
+        grava o frame original e, se houver, o anotado: <classe>_<data>_original.jpg / _detected.jpg
+        os arrays vao para o AsyncImageWriter e nao podem ser alterados depois
+        """
+        if self.image_writer is None:
+            return None
+
+        timestamp = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        # com varias regioes o rotulo comeca pelo feed: "[feed_a] capivara (87.0%)"
+        first_class = detections_info[0].split("(")[0].split("] ")[-1].strip().replace(" ", "-") if detections_info else "unknown"
+        base_name = f"{first_class}_{timestamp}"
+
+        self.image_writer.submit(self.save_folder / f"{base_name}_original.jpg", frame_original)
+        if frame_annotated is not None:
+            self.image_writer.submit(self.save_folder / f"{base_name}_detected.jpg", frame_annotated)
+        return base_name
+
+    def _finish_passage(self, passage):
+        """grava o registro e as imagens do melhor frame de uma passagem encerrada; devolve o registro"""
+        record = passage.record()
+        record["source"] = self.store_source
+        record["model"] = self.store_model
+        record["image"] = None
+        if self.regions:
+            x1, y1, x2, y2 = record["best_box"]
+            record["region"] = self.grabber.region_at((x1 + x2) / 2, (y1 + y2) / 2)
+
+        if passage.best_image is not None and self.image_writer is not None:
+            annotated = self.renderer.draw(passage.best_image.copy(), passage.best_detections)
+            # id no nome: varias passagens podem encerrar no mesmo segundo (fim da sessao)
+            label = f"{record['class']} passagem {record['id']} ({record['peak_conf'] * 100:.1f}%)"
+            record["image"] = self.save_frames(passage.best_image, annotated, [label])
+        passage.best_image = None
+
+        self.passage_store.append(record)
+        return record
+
+    def _store_clip(self, record):
+        if record is None:
+            return None
+        record["source"] = self.store_source
+        record["model"] = self.store_model
+        self.clip_store.append(record)
+        return record
+
+    def finish_clip(self):
+        """encerra o clipe aberto (fim da sessao) e devolve o registro, ou None"""
+        if self.clips is None:
+            return None
+        return self._store_clip(self.clips.finish())
+
+    def flush_passages(self):
+        """encerra as passagens abertas (fim da sessao) e devolve os registros"""
+        if self.passages is None:
+            return []
+        return [self._finish_passage(passage) for passage in self.passages.flush()]
+
+    def sample_memory(self, force=False):
+        """amostra de memoria quando o intervalo vence (gravada no registro); senao None"""
+        record = self.memory_monitor.sample() if force else self.memory_monitor.maybe_sample()
+        if record is not None:
+            self.last_memory_sample = record
+            self.memory_store.append(record)
+        return record
+
+    def summary_lines(self):
+        """resumo da sessao, uma linha por componente"""
+        lines = []
+        if self.image_writer is not None:
+            lines.append(f"Imagens: {self.image_writer.stats()}")
+        if self.clip_writer is not None:
+            lines.append(
+                f"Clipes: {self.clip_writer.stats()} | pre-roll: {self.clips.ring.capacity} frames "
+                f"({self.clips.ring.nbytes / 1024 / 1024:.1f} MB)"
+            )
+        if self.scheduler is not None:
+            lines.append(f"Agendamento: {self.scheduler.summary()}")
+        if self.input_policy is not None:
+            lines.append(f"Resolução de entrada: {self.input_policy.report()}")
+        if self.motion_gate is not None:
+            lines.append(self.motion_gate.summary())
+        if self.regions:
+            per_batch = self.region_images_inferred / self.region_batches if self.region_batches else 0
+            lines.append(
+                f"Regiões: {len(self.regions)} numa captura {self.region['width']}x{self.region['height']} | "
+                f"{self.region_batches} inferências em lote, média {per_batch:.1f} regiões por lote"
+            )
+            for name, gate in self.region_gates.items():
+                lines.append(f"{name}: {gate.summary()}")
+        if self.passages is not None:
+            lines.append(self.passages.summary())
+        return lines
+
+    def close(self):
+        """espera as imagens na fila e fecha captura e registros (pode ser chamado mais de uma vez)"""
+        if self.passages is not None and self.passage_store is not None:
+            self.flush_passages()
+        if self.clip_store is not None:
+            self.finish_clip()
+        if self.image_writer is not None:
+            self.image_writer.close()
+        if self.clip_writer is not None:
+            self.clip_writer.close()
+        if self.grabber is not None:
+            self.grabber.close()
+        if self.detection_store is not None:
+            self.detection_store.close()
+        if self.memory_monitor is not None:
+            self.memory_monitor.close()
+        if self.memory_store is not None:
+            self.memory_store.close()
+        if self.passage_store is not None:
+            self.passage_store.close()
+        if self.clip_store is not None:
+            self.clip_store.close()
+        self.last_results = None
+        self.region_detections = {}
@@ -0,0 +1,255 @@
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+import yaml
+
+from detection_store import DEFAULT_STORE_DIR
+from memory_monitor import format_sample
+from screen_engine import ScreenDetectionEngine, MEMORY_SAMPLE_INTERVAL_S
+from passage_events import DEFAULT_GAP_S
+from clip_writer import DEFAULT_PRE_ROLL_S, DEFAULT_POST_ROLL_S
+
+
+# configuracao padrao do modo servico; o yaml so precisa trazer region (ou regions) e model
+DEFAULT_CONFIG = {
+    "region": None,  # {left, top, width, height} ou {monitor: 1} para o monitor inteiro
+    "regions": None,  # {nome: {left, top, width, height}, ...}: varios feeds, uma captura e um lote por ciclo
+    "model": None,
+    "interval": 0.5,
+    "threshold": 0.5,
+    "backend": "torch",
+    "motion_gate": True,
+    "tiled": False,
+    "overrun_policy": "skip",
+    "store_folder": DEFAULT_STORE_DIR,
+    "store_format": "jsonl",
+    "save_folder": None,  # pasta para as imagens (melhor frame de cada passagem, ou cada frame com deteccao)
+    "group_passages": True,  # um registro e um par de imagens por passagem de animal, nao por frame
+    "passage_gap_s": DEFAULT_GAP_S,  # segundos sem o animal para encerrar a passagem
+    "record_clips": False,  # um clipe mp4 por evento na save_folder, no lugar das imagens
+    "pre_roll_s": DEFAULT_PRE_ROLL_S,  # segundos antes da deteccao incluidos no clipe
+    "post_roll_s": DEFAULT_POST_ROLL_S,  # segundos sem deteccao ate fechar o clipe
+    "trace_allocations": False,
+    "memory_interval_s": MEMORY_SAMPLE_INTERVAL_S,
+    "status_interval_s": 600,  # resumo no console a cada tanto tempo
+}
+# erros seguidos de captura/inferencia antes de desistir (tela bloqueada, driver reiniciando...)
+MAX_CONSECUTIVE_ERRORS = 20
+
+EXAMPLE_CONFIG = """\
+region: {left: 0, top: 0, width: 1280, height: 720}   # ou region: {monitor: 1}
+# varios feeds na mesma tela (no lugar de region):
+# regions: {comedouro: {left: 0, top: 0, width: 640, height: 360}, trilha: {left: 640, top: 0, width: 640, height: 360}}
+model: yolov8n-detector-gamba.pt
+interval: 0.5
+threshold: 0.5
+store_folder: detections_store
+save_folder: detections_images   # opcional
+"""
+
+
+def log(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+def load_config(path):
+    with open(path, encoding="utf-8") as f:
+        loaded = yaml.safe_load(f) or {}
+
+    unknown = set(loaded) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"chaves desconhecidas na configuracao: {', '.join(sorted(unknown))}")
+
+    config = dict(DEFAULT_CONFIG, **loaded)
+    if not config["model"]:
+        raise ValueError("configuracao sem 'model'")
+    if config["regions"]:
+        config["regions"] = {str(name): resolve_region(region) for name, region in config["regions"].items()}
+    else:
+        config["region"] = resolve_region(config["region"])
+    return config
+
+
+def resolve_region(region):
+    """region do yaml -> dict do mss; {monitor: N} vira a area inteira desse monitor"""
+    if not region:
+        raise ValueError("configuracao sem 'region' (ou 'regions')")
+    if "monitor" in region:
+        import mss
+        with mss.mss() as sct:
+            monitor = sct.monitors[int(region["monitor"])]
+        return {key: monitor[key] for key in ("left", "top", "width", "height")}
+
+    missing = [key for key in ("left", "top", "width", "height") if key not in region]
+    if missing:
+        raise ValueError(f"region sem {', '.join(missing)}")
+    return {key: int(region[key]) for key in ("left", "top", "width", "height")}
+
+
+class ScreenDetectionService:
+    """
+    deteccao continua de uma regiao da tela sem interface (roda semanas sem ninguem olhando)
+
+    mesmo loop da interface (ScreenDetectionEngine), sem plot, putText ou janela:
+    cada frame vai para o registro estruturado, as amostras de memoria tambem.
+    stop() (chamado pelo SIGTERM/SIGINT) termina o ciclo atual e fecha tudo
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._stop = threading.Event()
+        self.engine = ScreenDetectionEngine(
+            config["region"],
+            config["model"],
+            interval=config["interval"],
+            threshold=config["threshold"],
+            backend=config["backend"],
+            motion_gate=config["motion_gate"],
+            tiled=config["tiled"],
+            overrun_policy=config["overrun_policy"],
+            store_folder=config["store_folder"],
+            store_format=config["store_format"],
+            save_folder=config["save_folder"],
+            trace_allocations=config["trace_allocations"],
+            memory_interval_s=config["memory_interval_s"],
+            group_passages=config["group_passages"],
+            passage_gap_s=config["passage_gap_s"],
+            record_clips=config["record_clips"],
+            pre_roll_s=config["pre_roll_s"],
+            post_roll_s=config["post_roll_s"],
+            regions=config["regions"],
+        )
+
+    def stop(self, signum=None, frame=None):
+        if signum is not None:
+            log(f"sinal {signal.Signals(signum).name} recebido, encerrando")
+        self._stop.set()
+
+    def run(self):
+        """roda ate stop(); devolve o codigo de saida do processo"""
+        engine = self.engine
+        exit_code = 0
+        try:
+            engine.start()
+            log(f"modelo {engine.store_model} | fonte {engine.store_source} | {engine.input_policy.report()}")
+
+            consecutive_errors = 0
+            last_status = time.monotonic()
+            while not self._stop.is_set():
+                try:
+                    self.process_step(engine.step())
+                    consecutive_errors = 0
+                except Exception as e:
+                    consecutive_errors += 1
+                    log(f"erro no ciclo ({consecutive_errors}/{MAX_CONSECUTIVE_ERRORS}): {e}")
+                    # o mss e reaberto na proxima captura
+                    engine.grabber.close()
+                    if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                        exit_code = 1
+                        break
+
+                record = engine.sample_memory()
+                if record is not None:
+                    log(format_sample(record))
+                if time.monotonic() - last_status >= self.config["status_interval_s"]:
+                    last_status = time.monotonic()
+                    log(self.status())
+
+                # Event.wait em vez de sleep: o SIGTERM nao espera o intervalo inteiro
+                self._stop.wait(engine.scheduler.end_tick())
+        finally:
+            for record in engine.flush_passages():
+                log(format_passage(record))
+            record = engine.finish_clip()
+            if record is not None:
+                log(format_clip(record))
+            engine.close()
+            for line in engine.summary_lines():
+                log(line)
+            log(self.status())
+        return exit_code
+
+    def process_step(self, step):
+        if step is None:
+            log("erro ao capturar tela")
+            return
+
+        if step["clip_started"]:
+            log(f"clipe iniciado no frame {step['frame_number']}: {step['clip_started']}")
+        if step["clip_finished"]:
+            log(format_clip(step["clip_finished"]))
+
+        if self.engine.passages is not None:
+            for passage in step["opened"]:
+                log(f"passagem {passage.id} iniciada no frame {step['frame_number']}: {passage.main_class}")
+            for record in step["closed"]:
+                log(format_passage(record))
+            return
+
+        if step["count"] == 0 or step["reused"]:
+            return
+
+        if step["regions"]:
+            detections = [f"[{r['name']}] {label}" for r in step["regions"] for label in r["detections"].labels()]
+        else:
+            detections = step["detections"].labels()
+        # o frame e o buffer do grabber: copia antes de ir para a fila de gravacao
+        saved = self.engine.save_frames(step["frame"].copy(), None, detections)
+        message = f"frame {step['frame_number']}: {', '.join(detections)}"
+        if saved:
+            message += f" | salvo: {saved}_original.jpg"
+        log(message)
+
+    def status(self):
+        engine = self.engine
+        return (
+            f"frames: {engine.frames_processed} | deteccoes: {engine.total_detections} | "
+            f"inferencias evitadas: {engine.inferences_skipped}"
+            + (f" | {engine.scheduler.summary()}" if engine.scheduler else "")
+        )
+
+
+def format_passage(record):
+    message = (
+        f"passagem {record['id']} encerrada: {record['class']}, {record['duration_s']:.1f}s, "
+        f"{record['frames']} frames, pico {record['peak_conf'] * 100:.1f}% no frame {record['best_frame']}"
+    )
+    if record["image"]:
+        message += f" | salvo: {record['image']}_original.jpg + _detected.jpg"
+    return message
+
+
+def format_clip(record):
+    return (
+        f"clipe encerrado: {record['clip']} | {record['duration_s']:.1f}s, {record['frames']} frames "
+        f"({record['pre_roll_frames']} de pre-roll)"
+    )
+
+
+def install_signal_handlers(service):
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    if hasattr(signal, "SIGBREAK"):
+        signal.signal(signal.SIGBREAK, service.stop)  # ctrl+break / fechar o console no Windows
+
+
+if __name__ == "__main__":
+    # uso: python screen_service.py <config.yaml>
+    if len(sys.argv) < 2:
+        print("uso: python screen_service.py <config.yaml>")
+        print("exemplo de configuracao:")
+        print(EXAMPLE_CONFIG)
+        sys.exit(1)
+
+    try:
+        config = load_config(sys.argv[1])
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"configuracao invalida: {e}")
+        sys.exit(2)
+
+    service = ScreenDetectionService(config)
+    install_signal_handlers(service)
+    sys.exit(service.run())
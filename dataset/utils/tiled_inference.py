@@ -0,0 +1,224 @@
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from ultralytics import YOLO
+from ultralytics.engine.results import Results
+
+from input_size import model_train_size
+
+
+DEFAULT_TILE_OVERLAP = 0.2
+# iou acima do qual duas caixas da mesma classe sao a mesma deteccao
+DEFAULT_MERGE_IOU = 0.5
+# fracao da caixa menor dentro da maior: pedaco de animal cortado na borda de um tile
+DEFAULT_MERGE_IOS = 0.8
+
+
+def tile_grid(width, height, tile_size, overlap=DEFAULT_TILE_OVERLAP):
+    """lista de tiles (x0, y0, x1, y1) cobrindo a imagem, com sobreposicao; o ultimo encosta na borda"""
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        step = max(1, int(tile_size * (1 - overlap)))
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    tiles = []
+    for y0 in starts(height):
+        for x0 in starts(width):
+            tiles.append((x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height)))
+    return tiles
+
+
+def merge_boxes(data, iou_threshold=DEFAULT_MERGE_IOU, ios_threshold=DEFAULT_MERGE_IOS):
+    """
+    nms guloso por classe em coordenadas globais
+    data: array (N, 6) com x1, y1, x2, y2, conf, cls
+    alem do iou, descarta caixas quase inteiras dentro de outra mais confiante (pedacos cortados pelo tile)
+    """
+    if len(data) == 0:
+        return data
+
+    order = np.argsort(-data[:, 4])
+    data = data[order]
+    areas = np.prod(np.clip(data[:, 2:4] - data[:, :2], 0, None), axis=1)
+    suppressed = np.zeros(len(data), dtype=bool)
+    keep = []
+
+    for i in range(len(data)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+
+        rest = np.arange(i + 1, len(data))
+        rest = rest[~suppressed[rest] & (data[rest, 5] == data[i, 5])]
+        if len(rest) == 0:
+            continue
+
+        tl = np.maximum(data[i, :2], data[rest, :2])
+        br = np.minimum(data[i, 2:4], data[rest, 2:4])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        ios = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        suppressed[rest[(iou >= iou_threshold) | (ios >= ios_threshold)]] = True
+
+    return data[keep]
+
+
+def predict_tiled(
+    model,
+    frame,
+    tile_size=None,
+    overlap=DEFAULT_TILE_OVERLAP,
+    full_frame_imgsz=None,
+    conf=0.25,
+    iou_threshold=DEFAULT_MERGE_IOU,
+):
+    """
+    inferencia fatiada: tiles sobrepostos no tamanho nativo do modelo, todos num unico lote,
+    mais uma passada no frame inteiro em full_frame_imgsz (pega animais grandes que cruzam tiles).
+    devolve [Results] como model(frame), entao o codigo que le results[0].boxes nao muda
+    """
+    tile_size = tile_size or model_train_size(model)
+    height, width = frame.shape[:2]
+    tiles = tile_grid(width, height, tile_size, overlap)
+
+    # recortes sao views do frame, sem copia
+    crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+    tile_results = model(crops, imgsz=tile_size, conf=conf, verbose=False)
+
+    parts = []
+    for (x0, y0, _, _), result in zip(tiles, tile_results):
+        data = result.boxes.data.cpu().numpy()
+        if len(data):
+            data = data.copy()
+            data[:, [0, 2]] += x0
+            data[:, [1, 3]] += y0
+            parts.append(data)
+
+    if full_frame_imgsz:
+        full = model(frame, imgsz=full_frame_imgsz, conf=conf, verbose=False)[0]
+        if len(full.boxes):
+            parts.append(full.boxes.data.cpu().numpy())
+
+    merged = merge_boxes(np.concatenate(parts), iou_threshold) if parts else np.zeros((0, 6), dtype=np.float32)
+
+    return [Results(orig_img=frame, path="", names=model.names, boxes=torch.from_numpy(merged.astype(np.float32)))]
+
+
+def _load_labels(image_path, width, height):
+    """caixas ground truth no formato yolo (labels/<nome>.txt ou <nome>.txt ao lado da imagem)"""
+    image_path = Path(image_path)
+    candidates = [
+        image_path.with_suffix(".txt"),
+        image_path.parent.parent / "labels" / f"{image_path.stem}.txt",
+    ]
+    for label_path in candidates:
+        if label_path.exists():
+            boxes = []
+            for line in label_path.read_text().splitlines():
+                parts = line.split()
+                if len(parts) != 5:
+                    continue
+                cls, cx, cy, w, h = int(parts[0]), *map(float, parts[1:])
+                boxes.append([(cx - w / 2) * width, (cy - h / 2) * height,
+                              (cx + w / 2) * width, (cy + h / 2) * height, 1.0, cls])
+            return np.array(boxes, dtype=np.float32).reshape(-1, 6)
+    return None
+
+
+def _recall(found, reference, iou_threshold=0.5):
+    """fracao das caixas de referencia encontradas (mesma classe, iou >= limiar)"""
+    if len(reference) == 0:
+        return None
+    hits = 0
+    for ref in reference:
+        same = found[found[:, 5] == ref[5]]
+        if len(same) == 0:
+            continue
+        tl = np.maximum(ref[:2], same[:, :2])
+        br = np.minimum(ref[2:4], same[:, 2:4])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        union = np.prod(ref[2:4] - ref[:2]) + np.prod(same[:, 2:4] - same[:, :2], axis=1) - inter
+        if np.max(inter / (union + 1e-9)) >= iou_threshold:
+            hits += 1
+    return hits / len(reference)
+
+
+def benchmark(weights_path, image_paths, base_imgsz=640, reference_imgsz=1920, conf=0.25):
+    """
+    compara recall e latencia: frame inteiro em imgsz=1920 x fatiado com base_imgsz
+    usa os labels yolo quando existem; senao mede o recall em relacao ao resultado de 1920
+    """
+    model = YOLO(str(weights_path))
+    rows = []
+
+    for image_path in image_paths:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+
+        start = time.perf_counter()
+        full = model(image, imgsz=reference_imgsz, conf=conf, verbose=False)[0].boxes.data.cpu().numpy()
+        full_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        tiled = predict_tiled(model, image, full_frame_imgsz=base_imgsz, conf=conf)[0].boxes.data.cpu().numpy()
+        tiled_ms = (time.perf_counter() - start) * 1000
+
+        labels = _load_labels(image_path, width, height)
+        reference = labels if labels is not None else full
+        rows.append({
+            "image": Path(image_path).name,
+            "full_ms": full_ms,
+            "tiled_ms": tiled_ms,
+            "full_recall": _recall(full, reference) if labels is not None else 1.0,
+            "tiled_recall": _recall(tiled, reference),
+            "ground_truth": labels is not None,
+        })
+
+    if not rows:
+        print("nenhuma imagem valida")
+        return rows
+
+    def mean(key):
+        values = [r[key] for r in rows if r[key] is not None]
+        return sum(values) / len(values) if values else float("nan")
+
+    print(f"\n{'='*60}")
+    print(f"imagens: {len(rows)} ({sum(r['ground_truth'] for r in rows)} com labels)")
+    print(f"frame inteiro imgsz={reference_imgsz}: {mean('full_ms'):.0f}ms | recall {mean('full_recall'):.2f}")
+    print(f"fatiado (base {base_imgsz}):      {mean('tiled_ms'):.0f}ms | recall {mean('tiled_recall'):.2f}")
+    print("(sem labels, o recall e medido contra o resultado do frame inteiro)")
+    print(f"{'='*60}\n")
+    return rows
+
+
+if __name__ == "__main__":
+    # uso: python tiled_inference.py modelo.pt pasta_ou_imagens... [--base 640]
+    args = sys.argv[1:]
+    base = 640
+    if "--base" in args:
+        i = args.index("--base")
+        base = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) < 2:
+        print("uso: python tiled_inference.py <modelo.pt> <imagens ou pasta> [--base 640]")
+        sys.exit(1)
+
+    images = []
+    for arg in args[1:]:
+        path = Path(arg)
+        if path.is_dir():
+            images.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png")))
+        else:
+            images.append(path)
+
+    benchmark(args[0], images, base_imgsz=base)
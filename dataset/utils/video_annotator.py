@@ -1,9 +1,25 @@
-from ultralytics import YOLO
+from model_registry import get_model
+from onnx_backend import BACKENDS
 import cv2
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import threading
+import time
+from batch_inference import BatchSizeTuner, run_batch
+from frame_sampler import FrameSampler
+from input_size import InputSizePolicy
+from motion_gate import MotionGate
+from detection_cache import DetectionCache, CACHE_CONF_FLOOR, results_from_data
+from box_tracker import BoxTracker
+from box_renderer import BoxRenderer
+from detection_batch import DetectionBatch
+from detection_store import DetectionStore, DEFAULT_STORE_DIR
+
+
+# com rastreamento: frames seguintes guardados esperando o lote ser inferido; passando
+# disso o lote (ate a ultima amostra) e inferido na hora (~190 MB em 1080p)
+MAX_PENDING_FOLLOWERS = 30
 
 
 class VideoAnnotatorGUI:
@@ -13,9 +29,17 @@ class VideoAnnotatorGUI:
         self.root.geometry("700x600")
         
         self.model_path = tk.StringVar(value="yolov8n-detector-gamba.pt")
+        self.backend = tk.StringVar(value="torch")  # torch ou onnx (onnxruntime na CPU)
         self.video_path = tk.StringVar()
         self.output_folder = tk.StringVar()
         self.confidence_threshold = tk.DoubleVar(value=0.50)
+        self.batch_size = tk.IntVar(value=0)  # 0 = automatico
+        self.motion_gate_enabled = tk.BooleanVar(value=True)  # pula inferência em cena parada
+        self.use_cache = tk.BooleanVar(value=True)  # reaproveita detecções de passadas anteriores
+        self.tracking_enabled = tk.BooleanVar(value=False)  # caixas rastreadas nos frames entre amostras
+        self.store_enabled = tk.BooleanVar(value=True)  # registros por frame analisado na pasta de destino
+        
+        self.detection_cache = DetectionCache()
         
         self.is_processing = False
         
@@ -33,6 +57,7 @@ class VideoAnnotatorGUI:
         
         ttk.Entry(model_frame, textvariable=self.model_path, width=55).pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Button(model_frame, text="procurar", command=self.browse_model).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(model_frame, textvariable=self.backend, values=BACKENDS, state="readonly", width=7).pack(side=tk.LEFT, padx=5)
         
         # VIDEO DE ENTRADA
         ttk.Label(main_frame, text="video de entrada:", font=("Arial", 9, "bold")).grid(row=2, column=0, sticky=tk.W, pady=(15, 5))
@@ -90,9 +115,44 @@ class VideoAnnotatorGUI:
             foreground="gray"
         ).pack()
         
+        # DESEMPENHO
+        performance_frame = ttk.LabelFrame(main_frame, text="⚡ desempenho", padding="10")
+        performance_frame.grid(row=7, column=0, sticky=(tk.W, tk.E), pady=(15, 5))
+        
+        batch_frame = ttk.Frame(performance_frame)
+        batch_frame.pack(fill=tk.X, pady=2)
+        
+        ttk.Label(batch_frame, text="frames por lote:", font=("Arial", 9)).pack(side=tk.LEFT, padx=5)
+        ttk.Spinbox(batch_frame, from_=0, to=32, increment=1, textvariable=self.batch_size, width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(batch_frame, text="(0 = ajuste automático)", font=("Arial", 8), foreground="gray").pack(side=tk.LEFT, padx=5)
+        
+        ttk.Checkbutton(
+            performance_frame,
+            text="pular inferência quando a cena não muda (filtro de movimento)",
+            variable=self.motion_gate_enabled
+        ).pack(anchor=tk.W, padx=5, pady=2)
+        
+        ttk.Checkbutton(
+            performance_frame,
+            text="usar cache de detecções (reprocessar só muda o limiar sem rodar o modelo)",
+            variable=self.use_cache
+        ).pack(anchor=tk.W, padx=5, pady=2)
+        
+        ttk.Checkbutton(
+            performance_frame,
+            text="vídeo fluido: rastrear as caixas entre os frames analisados (decodifica todos os frames)",
+            variable=self.tracking_enabled
+        ).pack(anchor=tk.W, padx=5, pady=2)
+        
+        ttk.Checkbutton(
+            performance_frame,
+            text=f"salvar registros por frame analisado (<destino>/{DEFAULT_STORE_DIR}, jsonl por dia)",
+            variable=self.store_enabled
+        ).pack(anchor=tk.W, padx=5, pady=2)
+        
         # INFORMAÇÕES
         info_frame = ttk.LabelFrame(main_frame, text="ℹ️ informações", padding="10")
-        info_frame.grid(row=7, column=0, sticky=(tk.W, tk.E), pady=15)
+        info_frame.grid(row=8, column=0, sticky=(tk.W, tk.E), pady=15)
         
         ttk.Label(info_frame, text="• processa 2 frames por segundo (mais rápido)", font=("Arial", 8)).pack(anchor=tk.W)
         ttk.Label(info_frame, text="• as detecções do YOLO serão desenhadas nos frames processados", font=("Arial", 8)).pack(anchor=tk.W)
@@ -106,11 +166,11 @@ class VideoAnnotatorGUI:
             command=self.start_processing,
             style='Accent.TButton'
         )
-        self.process_button.grid(row=8, column=0, pady=20)
+        self.process_button.grid(row=9, column=0, pady=20)
         
         # BARRA DE PROGRESSO
         self.progress_bar = ttk.Progressbar(main_frame, mode='determinate', length=600)
-        self.progress_bar.grid(row=9, column=0, sticky=(tk.W, tk.E), pady=5)
+        self.progress_bar.grid(row=10, column=0, sticky=(tk.W, tk.E), pady=5)
         
         # STATUS
         self.status_label = ttk.Label(
@@ -119,7 +179,7 @@ class VideoAnnotatorGUI:
             foreground="blue",
             font=("Arial", 9)
         )
-        self.status_label.grid(row=10, column=0, sticky=tk.W, pady=5)
+        self.status_label.grid(row=11, column=0, sticky=tk.W, pady=5)
         
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -196,6 +256,10 @@ class VideoAnnotatorGUI:
             video_path = self.video_path.get()
             output_folder = self.output_folder.get()
             threshold = self.confidence_threshold.get()
+            tuner = BatchSizeTuner(fixed_size=self.batch_size.get())
+            motion_gate = MotionGate() if self.motion_gate_enabled.get() else None
+            tracker = BoxTracker() if self.tracking_enabled.get() else None
+            store = DetectionStore(Path(output_folder) / DEFAULT_STORE_DIR) if self.store_enabled.get() else None
             
             self.update_progress(0, "carregando modelo...")
             print(f"\n{'='*70}")
@@ -207,7 +271,8 @@ class VideoAnnotatorGUI:
             print(f"{'='*70}\n")
             
             # CARREGA MODELO
-            model = YOLO(model_path)
+            model = get_model(model_path, backend=self.backend.get())
+            renderer = BoxRenderer(model.names)
             
             # ABRE VIDEO DE ENTRADA
             self.update_progress(5, "abrindo vídeo...")
@@ -229,12 +294,25 @@ class VideoAnnotatorGUI:
             print(f"  • total de frames: {total_frames}")
             print(f"  • duração: {total_frames/fps:.2f}s")
             
+            # RESOLUÇÃO DE ENTRADA (derivada da resolução do vídeo)
+            input_policy = InputSizePolicy(model)
+            imgsz = input_policy.choose(width, height)
+            print(f"  • {input_policy.report()}")
+            
+            # CACHE DE DETECÇÕES (guardadas com confiança >= CACHE_CONF_FLOOR, filtradas pelo limiar)
+            detections = None
+            if self.use_cache.get():
+                detections = self.detection_cache.open(
+                    video_path, model_path, imgsz=imgsz, backend=self.backend.get()
+                )
+            
             # CALCULA FRAME SKIP (2 FRAMES POR SEGUNDO)
             process_fps = 2  # processar 2 frames por segundo
-            frame_skip = int(fps / process_fps)
+            frame_skip = max(1, int(fps / process_fps))
             expected_processed = int(total_frames / frame_skip)
             print(f"  • frame skip: 1 a cada {frame_skip} frames")
-            print(f"  • frames que serão processados: ~{expected_processed}\n")
+            print(f"  • frames que serão processados: ~{expected_processed}")
+            print(f"  • frames por lote: {tuner.fixed_size if tuner.fixed_size > 0 else 'automático'}\n")
             
             # NOME DO ARQUIVO DE SAIDA
             video_name = Path(video_path).stem
@@ -258,39 +336,114 @@ class VideoAnnotatorGUI:
             frame_count = 0
             processed_count = 0
             detection_count = 0
-            last_annotated_frame = None
             
-            while cap.isOpened():
-                ret, frame = cap.read()
+            # LOTE PENDENTE: [frame amostrado, indice do frame, quantas vezes escrever, frames seguintes]
+            # cada frame amostrado cobre ele mesmo + os frames pulados ate a proxima amostra,
+            # por isso a contagem so fica conhecida quando a amostra seguinte chega.
+            # com rastreamento, os frames seguintes decodificados ficam guardados ate o lote
+            # ser inferido, no maximo MAX_PENDING_FOLLOWERS (cena parada no filtro de movimento
+            # pode passar 10 s sem nova amostra)
+            pending = []
+            
+            def flush_batch(batch, partial=False):
+                nonlocal detection_count
                 
-                if not ret:
-                    break
+                # frames ja inferidos em passadas anteriores saem do cache
+                results = [None] * len(batch)
+                if detections is not None:
+                    for i, (frame, sampled_index, _, _) in enumerate(batch):
+                        data = detections.get(sampled_index)
+                        if data is not None:
+                            results[i] = results_from_data(frame, data, model.names, threshold)
                 
-                # PROCESSA APENAS A CADA frame_skip FRAMES (2 POR SEGUNDO)
-                if frame_count % frame_skip == 0:
-                    # PROCESSA FRAME COM YOLO
-                    results = model(frame, imgsz=1920, verbose=False, conf=threshold)
+                missing = [i for i, result in enumerate(results) if result is None]
+                if missing:
+                    batch_start = time.perf_counter()
+                    inferred = run_batch(
+                        model, [batch[i][0] for i in missing], tuner, partial=partial,
+                        imgsz=imgsz, verbose=False,
+                        conf=CACHE_CONF_FLOOR if detections is not None else threshold
+                    )
+                    input_policy.record((time.perf_counter() - batch_start) / len(missing))
                     
-                    # DESENHA ANOTAÇÕES
-                    last_annotated_frame = results[0].plot()
-                    processed_count += 1
+                    for i, result in zip(missing, inferred):
+                        if detections is not None:
+                            data = result.boxes.data.cpu().numpy()
+                            detections.put(batch[i][1], data)
+                            result = results_from_data(batch[i][0], data, model.names, threshold)
+                        results[i] = result
+                
+                # resultados voltam na mesma ordem dos frames do lote
+                for (frame, sampled_index, repeat, followers), result in zip(batch, results):
+                    # caixas convertidas uma vez para arrays (desenho, registro, contagem e rastreador)
+                    detections_in_frame = DetectionBatch.from_result(result)
+                    
+                    # DESENHA ANOTAÇÕES (no próprio frame: o original não é mais usado)
+                    annotated_frame = renderer.draw(frame, detections_in_frame)
+                    
+                    if store is not None:
+                        store.add_frame(
+                            sampled_index, detections_in_frame.data(), result.names,
+                            source=video_path, model=Path(model_path).name
+                        )
                     
                     # CONTA DETECÇÕES
-                    if len(results[0].boxes) > 0:
+                    if detections_in_frame:
                         detection_count += 1
-                        for box in results[0].boxes:
-                            class_id = int(box.cls[0])
-                            confidence = float(box.conf[0])
-                            class_name = results[0].names[class_id]
-                            print(f"frame {frame_count}: 🎯 {class_name} - {confidence*100:.1f}%")
+                        for class_name, confidence in detections_in_frame.rows():
+                            print(f"frame {sampled_index}: 🎯 {class_name} - {confidence*100:.1f}%")
+                    
+                    if tracker is None:
+                        # SALVA FRAME ANOTADO (repete até a próxima amostra)
+                        for _ in range(repeat):
+                            out.write(annotated_frame)
+                        continue
+                    
+                    # RASTREAMENTO: caixas previstas desenhadas nos frames reais até a próxima amostra
+                    tracker.predict()
+                    tracker.update(detections_in_frame.data())
+                    out.write(annotated_frame)
+                    for follower in followers:
+                        out.write(renderer.draw(follower, tracker.predict()[:, :6]))
+            
+            def add_follower(frame):
+                if not pending:
+                    # ultima amostra ja inferida: o rastreador ja sabe onde desenhar
+                    out.write(renderer.draw(frame, tracker.predict()[:, :6]))
+                    return
                 
-                # SALVA FRAME ANOTADO (usa último frame processado se não processou este)
-                if last_annotated_frame is not None:
-                    out.write(last_annotated_frame)
-                else:
-                    out.write(frame)
+                pending[-1][3].append(frame)
+                if sum(len(entry[3]) for entry in pending) >= MAX_PENDING_FOLLOWERS:
+                    # infere o lote inteiro agora; os proximos frames saem direto
+                    # (lote curto: o ajuste do tamanho de lote conta o custo por frame)
+                    flush_batch(pending, partial=True)
+                    pending.clear()
+            
+            # frames pulados avancam com grab(), so os analisados sao decodificados
+            # (com rastreamento todos sao decodificados, as caixas sao desenhadas em cada um)
+            sampler = FrameSampler(cap, 1 if tracker is not None else frame_skip)
+            
+            for frame_index, frame in sampler:
+                frame_count = sampler.position
                 
-                frame_count += 1
+                if frame_index % frame_skip != 0:
+                    add_follower(frame)
+                    continue
+                
+                # cena parada: a amostra anterior continua valendo para estes frames
+                if motion_gate is None or motion_gate.should_infer(frame, frame_index / fps):
+                    if pending:
+                        pending[-1][2] = frame_index - pending[-1][1]
+                    
+                    pending.append([frame, frame_index, 1, []])
+                    processed_count += 1
+                    
+                    # lote completo (o ultimo da lista espera a proxima amostra)
+                    if len(pending) > tuner.batch_size:
+                        flush_batch(pending[:-1])
+                        del pending[:-1]
+                elif tracker is not None:
+                    add_follower(frame)
                 
                 # ATUALIZA PROGRESSO
                 progress = 10 + (frame_count / total_frames * 85)
@@ -299,9 +452,19 @@ class VideoAnnotatorGUI:
                     f"processando: {processed_count}/{expected_processed} frames analisados ({progress:.1f}%)"
                 )
             
+            # ESVAZIA O ÚLTIMO LOTE (a última amostra cobre até o fim do vídeo)
+            frame_count = sampler.position
+            if pending:
+                pending[-1][2] = frame_count - pending[-1][1]
+                flush_batch(pending)
+            
             # LIBERA RECURSOS
             cap.release()
             out.release()
+            if detections is not None:
+                self.detection_cache.close(detections)
+            if store is not None:
+                store.close()
             
             self.update_progress(100, "✅ concluído!")
             
@@ -311,6 +474,12 @@ class VideoAnnotatorGUI:
             print(f"frames totais do vídeo: {frame_count}")
             print(f"frames analisados pelo YOLO: {processed_count}")
             print(f"frames com detecções: {detection_count}")
+            print(f"tamanho de lote usado: {tuner.batch_size}")
+            print(f"resolução de entrada: {input_policy.report()}")
+            if motion_gate is not None:
+                print(motion_gate.summary())
+            if detections is not None:
+                print(detections.summary())
             print(f"vídeo salvo em: {output_path}")
             print(f"{'='*70}\n")
             
@@ -1,4 +1,5 @@
-from ultralytics import YOLO
+from model_registry import get_model
+from onnx_backend import BACKENDS
 import cv2
 from pathlib import Path
 import tkinter as tk
@@ -6,6 +7,12 @@ from tkinter import filedialog, ttk, messagebox
 import threading
 import random
 import string
+import time
+from frame_sampler import FrameSampler
+from input_size import InputSizePolicy
+from detection_cache import DetectionCache, CACHE_CONF_FLOOR, results_from_data
+from box_renderer import BoxRenderer
+from detection_batch import DetectionBatch
 
 
 class VideoDetectorGUI:
@@ -16,6 +23,7 @@ class VideoDetectorGUI:
         
         self.folder_path = tk.StringVar()
         self.model_path = tk.StringVar(value="yolov8n-detector-gamba.pt")
+        self.backend = tk.StringVar(value="torch")  # torch ou onnx (onnxruntime na CPU)
         
         self.video_files = []
         self.current_video_index = 0
@@ -26,6 +34,9 @@ class VideoDetectorGUI:
         self.current_frame = 0
         self.fps = 30
         self.confidence_threshold = tk.DoubleVar(value=0.50)  # Limiar de confiança padrão 50%
+        self.use_cache = tk.BooleanVar(value=True)  # rever um video nao roda o modelo de novo
+        
+        self.detection_cache = DetectionCache()
         
         self.setup_ui()
     
@@ -40,6 +51,7 @@ class VideoDetectorGUI:
         
         ttk.Entry(model_frame, textvariable=self.model_path, width=50).pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Button(model_frame, text="procurar modelo", command=self.browse_model).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(model_frame, textvariable=self.backend, values=BACKENDS, state="readonly", width=7).pack(side=tk.LEFT, padx=5)
         
         ttk.Label(main_frame, text="pasta de videos:").grid(row=2, column=0, sticky=tk.W, pady=5)
         
@@ -119,6 +131,8 @@ class VideoDetectorGUI:
         )
         self.confidence_label.pack(pady=2)
         
+        ttk.Checkbutton(confidence_frame, text="usar cache de deteccoes", variable=self.use_cache).pack(anchor=tk.W)
+        
         # RENOMEAR (DIREITA)
         rename_frame = ttk.LabelFrame(bottom_frame, text="renomear video", padding="5")
         rename_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0))
@@ -331,55 +345,93 @@ class VideoDetectorGUI:
     
     def play_video(self):
         try:
-            model = YOLO(self.model_path.get())
+            model = get_model(self.model_path.get(), backend=self.backend.get())
+            renderer = BoxRenderer(model.names)
             
             window_name = 'detector - pressione q para sair'
             cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
             cv2.resizeWindow(window_name, 1280, 720)
             
             process_interval = 0.5
-            frame_skip = int(self.fps * process_interval)
+            frame_skip = max(1, int(self.fps * process_interval))
             
-            last_annotated_frame = None
+            # resolucao de entrada: fonte do video + orcamento de meio segundo por frame analisado
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            input_policy = InputSizePolicy(model, latency_budget_ms=process_interval * 1000)
+            input_policy.choose(width, height)
+            print(f"\n{input_policy.report()}")
             
-            while self.is_playing and self.cap.isOpened():
-                if not self.is_paused:
-                    ret, frame = self.cap.read()
-                    
-                    if not ret:
-                        self.stop_playback()
-                        break
-                    
-                    if self.current_frame % frame_skip == 0:
-                        # Usa o threshold diretamente no YOLO para filtrar
-                        threshold = self.confidence_threshold.get()
-                        results = model(frame, imgsz=1920, verbose=False, conf=threshold)
-                        
-                        # Deixa o YOLO fazer o plot com as cores certas por classe
-                        last_annotated_frame = results[0].plot()
-                        
-                        # Mostra detecções no console
-                        if len(results[0].boxes) > 0:
-                            print(f"\nFrame {self.current_frame}:")
-                            for box in results[0].boxes:
-                                class_id = int(box.cls[0])
-                                confidence = float(box.conf[0])
-                                class_name = results[0].names[class_id]
-                                print(f"  🎯 {class_name}: {confidence*100:.1f}%")
-                    
-                    if last_annotated_frame is not None:
-                        cv2.imshow(window_name, last_annotated_frame)
-                    
-                    self.current_frame += 1
-                    self.timeline_scale.set(self.current_frame)
-                    
-                    current_time = self.current_frame / self.fps if self.fps > 0 else 0
-                    duration = self.total_frames / self.fps if self.fps > 0 else 0
-                    self.time_label.config(text=f"{self.format_time(current_time)} / {self.format_time(duration)}")
+            # frames pulados avancam com grab(), so os analisados sao decodificados
+            sampler = FrameSampler(self.cap, frame_skip, start_frame=self.current_frame)
+            
+            video_path = self.video_files[self.current_video_index]
+            detections = None
+            
+            for frame_index, frame in sampler:
+                threshold = self.confidence_threshold.get()
+                imgsz = input_policy.choose(width, height)
+                
+                # Cache: deteccoes guardadas com confianca >= CACHE_CONF_FLOOR e filtradas pelo threshold
+                if self.use_cache.get():
+                    if detections is None:
+                        # aberto uma vez: o imgsz entra na chave do cache, entao fica fixo na sessao
+                        # (imgsz adaptativo espalharia as entradas em varios arquivos e o replay erraria)
+                        detections = self.detection_cache.open(
+                            video_path, self.model_path.get(), imgsz=imgsz, backend=self.backend.get()
+                        )
+                        cache_imgsz = imgsz
+                    imgsz = cache_imgsz
+                    data = detections.get(frame_index)
+                    if data is None:
+                        inference_start = time.perf_counter()
+                        data = model(frame, imgsz=imgsz, verbose=False, conf=CACHE_CONF_FLOOR)[0].boxes.data.cpu().numpy()
+                        input_policy.record(time.perf_counter() - inference_start)
+                        detections.put(frame_index, data)
+                    results = [results_from_data(frame, data, model.names, threshold)]
+                else:
+                    # Usa o threshold diretamente no YOLO para filtrar
+                    inference_start = time.perf_counter()
+                    results = model(frame, imgsz=imgsz, verbose=False, conf=threshold)
+                    input_policy.record(time.perf_counter() - inference_start)
+                
+                # caixas desenhadas no próprio frame (mesmas cores por classe do plot, sem cópia)
+                frame_detections = DetectionBatch.from_result(results[0])
+                annotated_frame = renderer.draw(frame, frame_detections)
+                
+                # Mostra detecções no console
+                if frame_detections:
+                    print(f"\nFrame {frame_index}:")
+                    for class_name, confidence in frame_detections.rows():
+                        print(f"  🎯 {class_name}: {confidence*100:.1f}%")
+                
+                cv2.imshow(window_name, annotated_frame)
+                
+                self.current_frame = sampler.position
+                self.timeline_scale.set(self.current_frame)
+                
+                current_time = self.current_frame / self.fps if self.fps > 0 else 0
+                duration = self.total_frames / self.fps if self.fps > 0 else 0
+                self.time_label.config(text=f"{self.format_time(current_time)} / {self.format_time(duration)}")
                 
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     self.stop_playback()
                     break
+                
+                # Pausado: segura o frame atual na tela
+                while self.is_paused and self.is_playing:
+                    if cv2.waitKey(100) & 0xFF == ord('q'):
+                        self.stop_playback()
+                
+                if not self.is_playing:
+                    break
+            else:
+                # Fim do video
+                self.stop_playback()
+            
+            print(f"\n{input_policy.report()}")
+            if detections is not None:
+                print(detections.summary())
             
             cv2.destroyAllWindows()
             
@@ -387,6 +439,8 @@ class VideoDetectorGUI:
             messagebox.showerror("erro", f"erro: {str(e)}")
             cv2.destroyAllWindows()
             self.stop_playback()
+        finally:
+            self.detection_cache.close()
 
 
 def main():
@@ -1,4 +1,5 @@
-from ultralytics import YOLO
+from model_registry import get_model, DEFAULT_CONF
+from onnx_backend import BACKENDS
 import cv2
 from pathlib import Path
 import tkinter as tk
@@ -6,6 +7,14 @@ from tkinter import filedialog, ttk, messagebox
 import threading
 import random
 import string
+from video_pipeline import DetectionPipeline
+from box_renderer import BoxRenderer
+from detection_batch import DetectionBatch
+from input_size import InputSizePolicy
+
+
+# tamanho das filas entre decodificacao, inferencia e exibicao
+PIPELINE_QUEUE_SIZE = 4
 
 
 class VideoDetectorRealtimeGUI:
@@ -16,12 +25,14 @@ class VideoDetectorRealtimeGUI:
         
         self.folder_path = tk.StringVar()
         self.model_path = tk.StringVar(value="yolo11n-v1.pt")
+        self.backend = tk.StringVar(value="torch")  # torch ou onnx (onnxruntime na CPU)
         
         self.video_files = []
         self.current_video_index = 0
         self.cap = None
         self.is_playing = False
         self.is_paused = False
+        self.play_thread = None
         self.total_frames = 0
         self.current_frame = 0
         self.fps = 30
@@ -55,6 +66,7 @@ class VideoDetectorRealtimeGUI:
         
         ttk.Entry(model_frame, textvariable=self.model_path, width=50).pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Button(model_frame, text="procurar modelo", command=self.browse_model).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(model_frame, textvariable=self.backend, values=BACKENDS, state="readonly", width=7).pack(side=tk.LEFT, padx=5)
         
         ttk.Label(main_frame, text="pasta de videos:").grid(row=2, column=0, sticky=tk.W, pady=5)
         
@@ -184,7 +196,7 @@ class VideoDetectorRealtimeGUI:
             self.current_video_index = selection[0]
             if self.is_playing:
                 self.stop_playback()
-            self.load_current_video()
+            self.after_playback(self.load_current_video)
     
     def previous_video(self):
         if not self.video_files:
@@ -195,7 +207,7 @@ class VideoDetectorRealtimeGUI:
         self.video_listbox.see(self.current_video_index)
         if self.is_playing:
             self.stop_playback()
-        self.load_current_video()
+        self.after_playback(self.load_current_video)
     
     def next_video(self):
         if not self.video_files:
@@ -206,7 +218,14 @@ class VideoDetectorRealtimeGUI:
         self.video_listbox.see(self.current_video_index)
         if self.is_playing:
             self.stop_playback()
-        self.load_current_video()
+        self.after_playback(self.load_current_video)
+    
+    def after_playback(self, callback):
+        """chama callback quando a thread de reprodução terminar (ela ainda pode estar lendo o self.cap)"""
+        if self.play_thread is not None and self.play_thread.is_alive():
+            self.root.after(50, lambda: self.after_playback(callback))
+            return
+        callback()
     
     def load_current_video(self):
         if not self.video_files or self.current_video_index >= len(self.video_files):
@@ -241,10 +260,13 @@ class VideoDetectorRealtimeGUI:
             return
         
         if not self.is_playing:
+            if self.play_thread is not None and self.play_thread.is_alive():
+                return  # a reprodução anterior ainda está parando
             self.is_playing = True
             self.is_paused = False
             self.play_pause_button.config(text="⏸ pausar")
-            threading.Thread(target=self.play_video_realtime, daemon=True).start()
+            self.play_thread = threading.Thread(target=self.play_video_realtime, daemon=True)
+            self.play_thread.start()
         else:
             if self.is_paused:
                 self.is_paused = False
@@ -281,7 +303,7 @@ class VideoDetectorRealtimeGUI:
             messagebox.showwarning("aviso", "nenhum video selecionado")
             return
         
-        if self.is_playing:
+        if self.is_playing or (self.play_thread is not None and self.play_thread.is_alive()):
             messagebox.showwarning("aviso", "pause o video antes de renomear")
             return
         
@@ -326,7 +348,8 @@ class VideoDetectorRealtimeGUI:
         import time
         
         try:
-            model = YOLO(self.model_path.get())
+            model = get_model(self.model_path.get(), backend=self.backend.get())
+            renderer = BoxRenderer(model.names)
             
             window_name = 'detector tempo real - pressione q para sair'
             cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
@@ -341,36 +364,49 @@ class VideoDetectorRealtimeGUI:
             print(f"FPS do video: {self.fps:.2f}")
             print(f"Delay por frame: {frame_delay}ms")
             print(f"Processando TODOS os frames")
+            print(f"Pipeline: decodificacao -> inferencia -> exibicao (threads separadas)")
             print(f"{'='*60}\n")
             
+            # resolucao de entrada: fonte do video + orcamento de um frame por intervalo do video
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            # a thread de inferencia reescolhe o imgsz a cada frame com o tempo medido
+            input_policy = InputSizePolicy(model, latency_budget_ms=frame_delay)
+            input_policy.choose(width, height)
+            print(input_policy.report())
+            
             frame_count = 0
             detection_count = 0
             start_time = time.time()
+            last_report_time = start_time
+            
+            # decodificacao e inferencia rodam em paralelo, esta thread so exibe
+            pipeline = DetectionPipeline(
+                self.cap, model,
+                start_frame=self.current_frame,
+                queue_size=PIPELINE_QUEUE_SIZE,
+                input_policy=input_policy, conf=DEFAULT_CONF, verbose=False
+            )
+            pipeline.start()
             
-            while self.is_playing and self.cap.isOpened():
-                if not self.is_paused:
-                    ret, frame = self.cap.read()
+            try:
+                for frame_index, frame, results in pipeline.frames():
+                    display_start = time.time()
                     
-                    if not ret:
-                        self.stop_playback()
-                        break
+                    detections = DetectionBatch.from_result(results[0])
                     
-                    # Processa TODOS os frames (sem skipping)
-                    results = model(frame, imgsz=1920, verbose=False)
-                    annotated_frame = results[0].plot()
+                    # o frame só é exibido: as caixas vão direto nele
+                    annotated_frame = renderer.draw(frame, detections)
                     
                     # Conta detecções
-                    if len(results[0].boxes) > 0:
+                    if detections:
                         detection_count += 1
-                        for box in results[0].boxes:
-                            class_id = int(box.cls[0])
-                            confidence = float(box.conf[0])
-                            class_name = results[0].names[class_id]
-                            print(f"Frame {self.current_frame}: 🎯 {class_name} - {confidence*100:.1f}%")
+                        for class_name, confidence in detections.rows():
+                            print(f"Frame {frame_index}: 🎯 {class_name} - {confidence*100:.1f}%")
                     
                     cv2.imshow(window_name, annotated_frame)
                     
-                    self.current_frame += 1
+                    self.current_frame = frame_index + 1
                     frame_count += 1
                     
                     # Atualiza timeline
@@ -381,22 +417,43 @@ class VideoDetectorRealtimeGUI:
                     duration = self.total_frames / self.fps if self.fps > 0 else 0
                     self.time_label.config(text=f"{self.format_time(current_time)} / {self.format_time(duration)}")
                     
-                    # Calcula FPS real de processamento
+                    # Calcula FPS real de processamento + estagio gargalo
                     elapsed = time.time() - start_time
                     if elapsed > 0:
                         real_fps = frame_count / elapsed
-                        self.fps_label.config(text=f"FPS: {real_fps:.1f} | Detecções: {detection_count}")
+                        self.fps_label.config(
+                            text=f"FPS: {real_fps:.1f} | Detecções: {detection_count} | gargalo: {pipeline.bottleneck()}"
+                        )
                     
-                    # Usa waitKey com delay calculado para manter velocidade real
-                    key = cv2.waitKey(frame_delay)
-                    if key & 0xFF == ord('q'):
-                        self.stop_playback()
+                    # fim da exibicao: o waitKey abaixo so segura a velocidade real
+                    pipeline.displayed()
+                    
+                    if time.time() - last_report_time >= 5:
+                        print(f"[pipeline] {pipeline.format_report()}")
+                        last_report_time = time.time()
+                    
+                    # Quando pausado, apenas mostra o frame atual (filas enchem e as threads esperam)
+                    while self.is_paused and self.is_playing:
+                        if cv2.waitKey(100) & 0xFF == ord('q'):
+                            self.stop_playback()
+                    
+                    if not self.is_playing:
                         break
-                else:
-                    # Quando pausado, apenas mostra o frame atual
-                    if cv2.waitKey(100) & 0xFF == ord('q'):
+                    
+                    # Usa waitKey descontando o tempo de exibicao para manter velocidade real
+                    spent_ms = int((time.time() - display_start) * 1000)
+                    key = cv2.waitKey(max(frame_delay - spent_ms, 1))
+                    if key & 0xFF == ord('q'):
                         self.stop_playback()
                         break
+            finally:
+                pipeline.stop()
+                # o decodificador leu à frente da exibição: volta a captura para o próximo frame a mostrar
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
+            
+            # Fim do video
+            if self.is_playing:
+                self.stop_playback()
             
             cv2.destroyAllWindows()
             
@@ -409,6 +466,9 @@ class VideoDetectorRealtimeGUI:
             print(f"Frames com detecções: {detection_count}")
             print(f"Tempo total: {elapsed_total:.1f}s")
             print(f"FPS médio: {frame_count/elapsed_total:.1f}")
+            print(f"Estágios: {pipeline.format_report()}")
+            print(f"Gargalo: {pipeline.bottleneck()}")
+            print(f"Resolução de entrada: {input_policy.report()}")
             print(f"{'='*60}\n")
             
         except Exception as e:
@@ -416,7 +476,6 @@ class VideoDetectorRealtimeGUI:
             cv2.destroyAllWindows()
             self.stop_playback()
 
-
 def main():
     root = tk.Tk()
     app = VideoDetectorRealtimeGUI(root)
@@ -1,10 +1,268 @@
-from ultralytics import YOLO
+from model_registry import get_model, DEFAULT_CONF
+from onnx_backend import BACKENDS
 import cv2
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import random
 import string
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from frame_sampler import FrameSampler
+from input_size import InputSizePolicy, model_train_size
+from motion_gate import MotionGate
+from tiled_inference import predict_tiled
+from detection_store import DetectionStore, DEFAULT_STORE_DIR
+from box_renderer import BoxRenderer
+from detection_batch import DetectionBatch
+
+
+VIDEO_EXTENSIONS = ['*.mp4', '*.avi', '*.mov', '*.mkv', '*.MP4', '*.AVI', '*.MOV', '*.MKV']
+
+# quantas vezes um video e reenviado depois de derrubar o processo do worker
+MAX_VIDEO_ATTEMPTS = 3
+
+
+def generate_hash(length=4):
+    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
+
+
+def extract_video(model, video_file, output_folder, classification, threshold,
+                  tiled=False, motion_gate_enabled=True, store_enabled=True, report=None):
+    """
+    processa um video e salva os frames com deteccao
+    report(tipo, **dados) recebe progresso e arquivos salvos; devolve um resumo do video
+    com store_enabled, cada frame verificado vira um registro em <saida>/detections_store
+    ("output" avisa cada arquivo do store aberto, para limpar a saida se o processo cair)
+    """
+    report = report or (lambda kind, **data: None)
+    video_file = Path(video_file)
+    output_path = Path(output_folder)
+    
+    print(f"\n{'='*60}")
+    print(f"processando: {video_file.name}")
+    print(f"{'='*60}")
+    
+    cap = cv2.VideoCapture(str(video_file))
+    if not cap.isOpened():
+        raise RuntimeError(f"nao foi possivel abrir o video: {video_file.name}")
+    
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    duration_seconds = total_frames / fps if fps > 0 else 0
+    
+    process_interval = 1
+    frame_skip = max(1, int(fps * process_interval))
+    expected_checks = int(duration_seconds / process_interval)
+    
+    print(f"fps: {fps:.2f}")
+    print(f"duracao: {duration_seconds:.2f}s")
+    print(f"verificacoes esperadas: ~{expected_checks}")
+    print(f"processando 1 frame a cada {frame_skip} frames (a cada {process_interval}s)")
+    
+    # resolucao de entrada derivada da resolucao de cada video
+    # fatiado: os tiles pegam os animais pequenos, o frame inteiro roda no tamanho de treino
+    input_policy = InputSizePolicy(model, max_imgsz=model_train_size(model) if tiled else None)
+    imgsz = input_policy.choose(
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    )
+    print(input_policy.report())
+    
+    checks_made = 0
+    saved_files = []
+    motion_gate = MotionGate() if motion_gate_enabled else None
+    store = DetectionStore(
+        output_path / DEFAULT_STORE_DIR,
+        on_open=lambda path: report("output", video=video_file.name, files=[str(path)])
+    ) if store_enabled else None
+    model_name = Path(model.ckpt_path or "modelo").name
+    renderer = BoxRenderer(model.names)
+    
+    try:
+        # frames pulados avancam com grab(), so os verificados sao decodificados
+        for frame_count, frame in FrameSampler(cap, frame_skip):
+            checks_made += 1
+            if checks_made % 30 == 0:
+                report("progress", video=video_file.name, checks=checks_made, expected=expected_checks)
+            
+            # cena parada: nada novo para salvar
+            # fps lido como 0: cada verificacao vale process_interval segundos
+            video_time = frame_count / fps if fps > 0 else checks_made * process_interval
+            if motion_gate is not None and not motion_gate.should_infer(frame, video_time):
+                continue
+            
+            if tiled:
+                results = predict_tiled(model, frame, full_frame_imgsz=imgsz)
+            else:
+                # conf explicito: o modelo do registro e compartilhado e nao pode herdar o de outro chamador
+                results = model(frame, imgsz=imgsz, conf=DEFAULT_CONF, verbose=False)
+            
+            detections = DetectionBatch.from_result(results[0])
+            confident = detections.above(threshold)
+            if store is not None:
+                store.add_frame(frame_count, confident.data(), results[0].names,
+                                source=video_file, model=model_name)
+            
+            # frame anotado desenhado uma vez por frame, no buffer do renderer (o original continua limpo)
+            annotated_frame = None
+            for class_name, confidence in confident.rows():
+                frame_hash = generate_hash(4)
+                
+                frame_normal_name = f"{classification}_{frame_hash}_foto_normal.jpg"
+                frame_modelo_name = f"{classification}_{frame_hash}_foto_modelo.jpg"
+                
+                frame_normal_path = output_path / frame_normal_name
+                frame_modelo_path = output_path / frame_modelo_name
+                
+                cv2.imwrite(str(frame_normal_path), frame)
+                
+                if annotated_frame is None:
+                    annotated_frame = renderer.render(frame, detections)
+                cv2.imwrite(str(frame_modelo_path), annotated_frame)
+                
+                saved_files.extend([frame_normal_name, frame_modelo_name])
+                report("saved", video=video_file.name, frame=frame_count,
+                       files=[frame_normal_name, frame_modelo_name])
+                
+                print(f"  ✓ frame {frame_count}: {class_name} ({confidence*100:.1f}%) - salvos:")
+                print(f"    • {frame_normal_name}")
+                print(f"    • {frame_modelo_name}")
+    finally:
+        cap.release()
+        if store is not None:
+            store.close()
+    
+    print(f"video processado: {checks_made} verificacoes feitas em {duration_seconds:.1f}s")
+    if motion_gate is not None:
+        print(motion_gate.summary())
+    
+    return {
+        "video": video_file.name,
+        "checks": checks_made,
+        "saved": saved_files,
+        "skipped": motion_gate.skipped if motion_gate is not None else 0,
+    }
+
+
+# estado de cada processo do pool (um modelo por worker)
+_worker_model = None
+_worker_queue = None
+_worker_running = None  # dict do Manager: video -> pid, enquanto o video roda
+_worker_outputs = None  # dict do Manager: video -> arquivos gravados, enquanto o video roda
+
+
+def _init_worker(model_path, backend, torch_threads, progress_queue, running, outputs):
+    global _worker_model, _worker_queue, _worker_running, _worker_outputs
+    import torch
+    torch.set_num_threads(torch_threads)
+    # onnxruntime tem pool de threads proprio: sem o limite cada worker usaria todos os nucleos
+    _worker_model = get_model(model_path, backend=backend, intra_op_threads=torch_threads)
+    _worker_queue = progress_queue
+    _worker_running = running
+    _worker_outputs = outputs
+
+
+def _extract_worker(video_file, options):
+    def report(kind, **data):
+        if kind in ("saved", "output"):
+            # o proxy do Manager so ve a lista nova se ela for reatribuida
+            files = [str(Path(options["output_folder"]) / name) for name in data["files"]]
+            _worker_outputs[video_file] = _worker_outputs.get(video_file, []) + files
+        if kind != "output":
+            _worker_queue.put((kind, data))
+    
+    # se o processo cair, as entradas ficam: o pool sabe quais videos estavam rodando
+    # e o que eles ja tinham gravado
+    _worker_running[video_file] = os.getpid()
+    report("start", video=Path(video_file).name)
+    try:
+        summary = extract_video(_worker_model, video_file, report=report, **options)
+    except Exception as e:
+        # erro em um video nao derruba o lote
+        report("error", video=Path(video_file).name, message=str(e))
+        return None
+    finally:
+        _worker_running.pop(video_file, None)
+        _worker_outputs.pop(video_file, None)
+    
+    report("done", **summary)
+    return summary
+
+
+def run_extraction_pool(video_files, model_path, backend, workers, progress_queue, options):
+    """
+    divide os videos entre processos, cada um com seu modelo e threads do torch limitadas
+
+    se um processo cair, o pool e recriado: os videos que nem tinham comecado voltam
+    para a fila sem contar tentativa; os que estavam rodando (o culpado e os vizinhos
+    derrubados junto) viram suspeitos e rodam um por vez, sozinhos no pool. so uma
+    queda com o video sozinho conta tentativa, entao um video ruim nao leva os outros.
+    a saida parcial de um video que caiu (imagens e arquivo do store) e apagada antes
+    de ele rodar de novo
+    """
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    context = multiprocessing.get_context("spawn")
+    pending = list(video_files)
+    suspects = []
+    attempts = {}
+    summaries = []
+    
+    with context.Manager() as manager:
+        running = manager.dict()
+        outputs = manager.dict()
+        
+        def discard_partial(video):
+            files = outputs.pop(str(video), [])
+            for path in files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            images = sum(1 for path in files if path.endswith(".jpg"))
+            if images:
+                progress_queue.put(("discarded", {"video": Path(video).name, "count": images}))
+        
+        while pending or suspects:
+            alone = bool(suspects)
+            if alone:
+                batch = [suspects.pop(0)]
+            else:
+                batch, pending = pending, []
+            running.clear()
+            outputs.clear()
+            
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(batch)),
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(model_path, backend, torch_threads, progress_queue, running, outputs)
+            ) as pool:
+                futures = {pool.submit(_extract_worker, str(video), options): video for video in batch}
+                
+                for future in as_completed(futures):
+                    video = futures[future]
+                    try:
+                        summary = future.result()
+                        if summary:
+                            summaries.append(summary)
+                    except BrokenProcessPool:
+                        discard_partial(video)
+                        if not alone:
+                            # rodando na queda: suspeito; ainda na fila: inocente
+                            (suspects if str(video) in running else pending).append(video)
+                            continue
+                        attempts[video] = attempts.get(video, 0) + 1
+                        if attempts[video] < MAX_VIDEO_ATTEMPTS:
+                            suspects.append(video)
+                        else:
+                            progress_queue.put(("error", {"video": Path(video).name, "message": "o processo caiu ao processar este video"}))
+    
+    return summaries
 
 
 class VideoFrameExtractorGUI:
@@ -16,8 +274,17 @@ class VideoFrameExtractorGUI:
         self.video_folder = tk.StringVar()
         self.output_folder = tk.StringVar()
         self.model_path = tk.StringVar(value="yolo11n-v1.pt")
+        self.backend = tk.StringVar(value="torch")  # torch ou onnx (onnxruntime na CPU)
         self.confidence_threshold = tk.DoubleVar(value=0.40)
         self.classification_var = tk.StringVar()
+        self.motion_gate_enabled = tk.BooleanVar(value=True)  # pula inferencia em cena parada
+        self.tiled_mode = tk.BooleanVar(value=False)  # tiles no tamanho nativo p/ animais pequenos
+        self.store_enabled = tk.BooleanVar(value=True)  # registros por frame em <saida>/detections_store
+        self.workers = tk.IntVar(value=1)  # processos em paralelo (1 = um modelo, em thread)
+        
+        self.progress_queue = None
+        self.manager = None  # Manager da fila de progresso entre processos
+        self.is_processing = False
         
         self.setup_ui()
     
@@ -30,6 +297,7 @@ class VideoFrameExtractorGUI:
         model_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=5)
         ttk.Entry(model_frame, textvariable=self.model_path, width=50).pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Button(model_frame, text="procurar", command=self.browse_model).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(model_frame, textvariable=self.backend, values=BACKENDS, state="readonly", width=7).pack(side=tk.LEFT, padx=5)
         
         ttk.Label(main_frame, text="pasta de videos:").grid(row=2, column=0, sticky=tk.W, pady=5)
         video_frame = ttk.Frame(main_frame)
@@ -70,18 +338,38 @@ class VideoFrameExtractorGUI:
         classification_combo.grid(row=9, column=0, sticky=(tk.W, tk.E), pady=5)
         classification_combo.current(0)
         
+        ttk.Checkbutton(
+            main_frame,
+            text="pular inferencia quando a cena nao muda (filtro de movimento)",
+            variable=self.motion_gate_enabled
+        ).grid(row=10, column=0, sticky=tk.W, pady=5)
+        
+        ttk.Checkbutton(
+            main_frame,
+            text="modo fatiado: tiles sobrepostos para animais pequenos/distantes",
+            variable=self.tiled_mode
+        ).grid(row=11, column=0, sticky=tk.W, pady=5)
+        
+        workers_frame = ttk.Frame(main_frame)
+        workers_frame.grid(row=12, column=0, sticky=tk.W, pady=5)
+        ttk.Label(workers_frame, text="processos em paralelo:").pack(side=tk.LEFT)
+        ttk.Spinbox(workers_frame, from_=1, to=os.cpu_count() or 1, textvariable=self.workers, width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(workers_frame, text="(cada processo carrega seu proprio modelo)", foreground="gray").pack(side=tk.LEFT)
+        ttk.Checkbutton(workers_frame, text=f"salvar registros ({DEFAULT_STORE_DIR})", variable=self.store_enabled).pack(side=tk.LEFT, padx=10)
+        
         info_frame = ttk.LabelFrame(main_frame, text="informacao", padding="10")
-        info_frame.grid(row=10, column=0, sticky=(tk.W, tk.E), pady=10)
+        info_frame.grid(row=13, column=0, sticky=(tk.W, tk.E), pady=10)
         ttk.Label(info_frame, text="• processa todos os videos da pasta").pack(anchor=tk.W)
         ttk.Label(info_frame, text="• salva 2 versoes de cada frame com deteccao:").pack(anchor=tk.W)
         ttk.Label(info_frame, text="  - {classificacao}_{hash}_foto_normal.jpg (sem caixa)").pack(anchor=tk.W)
         ttk.Label(info_frame, text="  - {classificacao}_{hash}_foto_modelo.jpg (com caixa)").pack(anchor=tk.W)
         ttk.Label(info_frame, text="• apenas frames com confianca >= threshold sao salvos").pack(anchor=tk.W)
         
-        ttk.Button(main_frame, text="🚀 extrair frames", command=self.start_extraction).grid(row=11, column=0, pady=15)
+        self.extract_button = ttk.Button(main_frame, text="🚀 extrair frames", command=self.start_extraction)
+        self.extract_button.grid(row=14, column=0, pady=15)
         
         self.status_label = ttk.Label(main_frame, text="configure as opcoes acima", foreground="blue")
-        self.status_label.grid(row=12, column=0, sticky=tk.W, pady=5)
+        self.status_label.grid(row=15, column=0, sticky=tk.W, pady=5)
         
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -109,9 +397,13 @@ class VideoFrameExtractorGUI:
             self.output_folder.set(folder)
     
     def generate_hash(self, length=4):
-        return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
+        return generate_hash(length)
     
     def start_extraction(self):
+        if self.is_processing:
+            messagebox.showwarning("aviso", "ja existe uma extracao em andamento")
+            return
+        
         model_path = self.model_path.get()
         video_folder = self.video_folder.get()
         output_folder = self.output_folder.get()
@@ -133,117 +425,147 @@ class VideoFrameExtractorGUI:
             messagebox.showerror("erro", "selecione uma classificacao")
             return
         
-        self.status_label.config(text="processando videos...", foreground="orange")
-        self.root.update()
+        video_path = Path(video_folder)
+        video_files = []
+        for ext in VIDEO_EXTENSIONS:
+            video_files.extend(list(video_path.glob(ext)))
+        
+        if not video_files:
+            messagebox.showwarning("aviso", "nenhum video encontrado na pasta")
+            self.status_label.config(text="nenhum video encontrado", foreground="red")
+            return
+        
+        options = {
+            "output_folder": output_folder,
+            "classification": classification,
+            "threshold": self.confidence_threshold.get(),
+            "tiled": self.tiled_mode.get(),
+            "motion_gate_enabled": self.motion_gate_enabled.get(),
+            "store_enabled": self.store_enabled.get(),
+        }
+        workers = max(1, min(self.workers.get(), len(video_files)))
         
+        self.is_processing = True
+        self.extract_button.config(state='disabled')
+        self.status_label.config(text=f"processando {len(video_files)} videos ({workers} processo(s))...", foreground="orange")
+        
+        # progresso chega por fila e e lido pelo tk em poll_progress
+        self.progress_state = {
+            "total": len(video_files), "done": 0, "saved": 0, "skipped": 0,
+            "errors": [], "finished": False, "fatal": None, "current": ""
+        }
+        if workers > 1:
+            # fechado em poll_progress, depois da mensagem "finished"
+            self.manager = multiprocessing.Manager()
+            self.progress_queue = self.manager.Queue()
+        else:
+            self.progress_queue = queue.Queue()
+        
+        threading.Thread(
+            target=self.run_extraction,
+            args=(video_files, model_path, self.backend.get(), workers, options),
+            daemon=True
+        ).start()
+        self.root.after(100, self.poll_progress)
+    
+    def run_extraction(self, video_files, model_path, backend, workers, options):
+        """roda fora da thread do tk: em processos (workers > 1) ou em serie com o modelo compartilhado"""
         try:
-            model = YOLO(model_path)
-            output_path = Path(output_folder)
-            video_path = Path(video_folder)
-            
-            video_files = []
-            for ext in ['*.mp4', '*.avi', '*.mov', '*.mkv', '*.MP4', '*.AVI', '*.MOV', '*.MKV']:
-                video_files.extend(list(video_path.glob(ext)))
-            
-            if not video_files:
-                messagebox.showwarning("aviso", "nenhum video encontrado na pasta")
-                self.status_label.config(text="nenhum video encontrado", foreground="red")
-                return
-            
-            total_frames_saved = 0
-            threshold = self.confidence_threshold.get()
-            
-            for video_idx, video_file in enumerate(video_files):
-                self.status_label.config(
-                    text=f"processando video {video_idx + 1}/{len(video_files)}: {video_file.name}",
-                    foreground="blue"
-                )
-                self.root.update()
-                
-                print(f"\n{'='*60}")
-                print(f"processando: {video_file.name}")
-                print(f"{'='*60}")
-                
-                cap = cv2.VideoCapture(str(video_file))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration_seconds = total_frames / fps if fps > 0 else 0
-                
-                process_interval = 1
-                frame_skip = int(fps * process_interval)
-                expected_checks = int(duration_seconds / process_interval)
-                
-                print(f"fps: {fps:.2f}")
-                print(f"duracao: {duration_seconds:.2f}s")
-                print(f"verificacoes esperadas: ~{expected_checks}")
-                print(f"processando 1 frame a cada {frame_skip} frames (a cada {process_interval}s)")
+            if workers > 1:
+                run_extraction_pool(video_files, model_path, backend, workers, self.progress_queue, options)
+            else:
+                model = get_model(model_path, backend=backend)
                 
-                frame_count = 0
-                checks_made = 0
+                def report(kind, **data):
+                    self.progress_queue.put((kind, data))
                 
-                while cap.isOpened():
-                    ret, frame = cap.read()
-                    
-                    if not ret:
-                        break
-                    
-                    if frame_count % frame_skip == 0:
-                        checks_made += 1
-                        results = model(frame, imgsz=1920, verbose=False)
-                        
-                        for box in results[0].boxes:
-                            confidence = float(box.conf[0])
-                            
-                            if confidence >= threshold:
-                                class_id = int(box.cls[0])
-                                class_name = results[0].names[class_id]
-                                frame_hash = self.generate_hash(4)
-                                
-                                frame_normal_name = f"{classification}_{frame_hash}_foto_normal.jpg"
-                                frame_modelo_name = f"{classification}_{frame_hash}_foto_modelo.jpg"
-                                
-                                frame_normal_path = output_path / frame_normal_name
-                                frame_modelo_path = output_path / frame_modelo_name
-                                
-                                cv2.imwrite(str(frame_normal_path), frame)
-                                
-                                annotated_frame = results[0].plot()
-                                cv2.imwrite(str(frame_modelo_path), annotated_frame)
-                                
-                                total_frames_saved += 2
-                                
-                                print(f"  ✓ frame {frame_count}: {class_name} ({confidence*100:.1f}%) - salvos:")
-                                print(f"    • {frame_normal_name}")
-                                print(f"    • {frame_modelo_name}")
-                    
-                    frame_count += 1
-                
-                print(f"video processado: {checks_made} verificacoes feitas em {duration_seconds:.1f}s")
-                cap.release()
-            
-            print(f"\n{'='*60}")
-            print(f"✅ concluido!")
-            print(f"total de arquivos salvos: {total_frames_saved}")
-            print(f"pasta de saida: {output_folder}")
-            print(f"{'='*60}\n")
+                for video_file in video_files:
+                    report("start", video=video_file.name)
+                    try:
+                        summary = extract_video(model, video_file, report=report, **options)
+                        report("done", **summary)
+                    except Exception as e:
+                        report("error", video=video_file.name, message=str(e))
+        except Exception as e:
+            self.progress_queue.put(("fatal", {"message": str(e)}))
+        finally:
+            self.progress_queue.put(("finished", {}))
+    
+    def poll_progress(self):
+        state = self.progress_state
+        
+        while True:
+            try:
+                kind, data = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
             
+            if kind == "start" or kind == "progress":
+                state["current"] = data["video"]
+            elif kind == "saved":
+                state["saved"] += len(data["files"])
+            elif kind == "discarded":
+                # saida parcial de um video que derrubou o processo (vai rodar de novo)
+                state["saved"] -= data["count"]
+            elif kind == "done":
+                state["done"] += 1
+                state["skipped"] += data["skipped"]
+            elif kind == "error":
+                state["done"] += 1
+                state["errors"].append(f"{data['video']}: {data['message']}")
+                print(f"❌ erro em {data['video']}: {data['message']}")
+            elif kind == "fatal":
+                state["fatal"] = data["message"]
+            elif kind == "finished":
+                state["finished"] = True
+                if self.manager is not None:
+                    self.manager.shutdown()
+                    self.manager = None
+                break
+        
+        if not state["finished"]:
             self.status_label.config(
-                text=f"✅ concluido! {total_frames_saved} arquivos salvos",
-                foreground="green"
+                text=f"videos {state['done']}/{state['total']} | arquivos salvos: {state['saved']} | "
+                     f"erros: {len(state['errors'])} | {state['current']}",
+                foreground="blue"
             )
-            
-            messagebox.showinfo(
-                "concluido",
-                f"extracao concluida!\n\n"
-                f"videos processados: {len(video_files)}\n"
-                f"arquivos salvos: {total_frames_saved}\n\n"
-                f"pasta de saida:\n{output_folder}"
-            )
-            
-        except Exception as e:
-            self.status_label.config(text=f"erro: {str(e)}", foreground="red")
-            messagebox.showerror("erro", f"erro durante processamento:\n{str(e)}")
-
+            self.root.after(200, self.poll_progress)
+            return
+        
+        self.is_processing = False
+        self.extract_button.config(state='normal')
+        
+        if state["fatal"]:
+            self.status_label.config(text=f"erro: {state['fatal']}", foreground="red")
+            messagebox.showerror("erro", f"erro durante processamento:\n{state['fatal']}")
+            return
+        
+        output_folder = self.output_folder.get()
+        print(f"\n{'='*60}")
+        print(f"✅ concluido!")
+        print(f"total de arquivos salvos: {state['saved']}")
+        print(f"inferencias evitadas pelo filtro de movimento: {state['skipped']}")
+        print(f"videos com erro: {len(state['errors'])}")
+        print(f"pasta de saida: {output_folder}")
+        print(f"{'='*60}\n")
+        
+        self.status_label.config(
+            text=f"✅ concluido! {state['saved']} arquivos salvos, {len(state['errors'])} erro(s)",
+            foreground="green" if not state["errors"] else "orange"
+        )
+        
+        errors_text = ""
+        if state["errors"]:
+            errors_text = "\n\nvideos com erro:\n" + "\n".join(state["errors"][:10])
+        
+        messagebox.showinfo(
+            "concluido",
+            f"extracao concluida!\n\n"
+            f"videos processados: {state['total'] - len(state['errors'])}/{state['total']}\n"
+            f"arquivos salvos: {state['saved']}\n\n"
+            f"pasta de saida:\n{output_folder}"
+            f"{errors_text}"
+        )
 
 def main():
     root = tk.Tk()
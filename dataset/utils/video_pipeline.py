@@ -0,0 +1,205 @@
+import queue
+import threading
+import time
+
+
+# marcador de fim de video que atravessa as filas
+_END = object()
+
+
+class StageStats:
+    """contadores de um estagio do pipeline (tempo ocupado e tempo esperando)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_s = 0.0
+        self.wait_in_s = 0.0   # esperando item da fila de entrada
+        self.wait_out_s = 0.0  # esperando vaga na fila de saida (fila cheia)
+        self._lock = threading.Lock()
+
+    def add(self, busy=0.0, wait_in=0.0, wait_out=0.0, items=0):
+        with self._lock:
+            self.busy_s += busy
+            self.wait_in_s += wait_in
+            self.wait_out_s += wait_out
+            self.items += items
+
+    def snapshot(self):
+        with self._lock:
+            n = max(self.items, 1)
+            return {
+                "items": self.items,
+                "busy_ms": self.busy_s / n * 1000,
+                "wait_in_ms": self.wait_in_s / n * 1000,
+                "wait_out_ms": self.wait_out_s / n * 1000,
+            }
+
+
+class DetectionPipeline:
+    """
+    pipeline decodificacao -> inferencia -> exibicao
+    decodificador e inferencia rodam em threads proprias ligadas por filas limitadas,
+    a exibicao roda na thread que chama frames() (dona da janela do opencv)
+    assim o fps fica limitado pelo estagio mais lento e nao pela soma dos estagios
+
+    com input_policy (InputSizePolicy), o imgsz e escolhido a cada frame na thread
+    de inferencia e o tempo medido volta para a politica: o orcamento de latencia
+    vale durante a sessao, nao so no fim
+    """
+
+    def __init__(self, cap, model, start_frame=0, queue_size=4, input_policy=None, **predict_kwargs):
+        self.cap = cap
+        self.model = model
+        self.start_frame = start_frame
+        self.input_policy = input_policy
+        self.predict_kwargs = predict_kwargs
+
+        self.decode_queue = queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+
+        self.stats = {
+            "decode": StageStats("decode"),
+            "infer": StageStats("infer"),
+            "display": StageStats("display"),
+        }
+        self._threads = []
+        self._display_start = None
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._decode_loop, daemon=True),
+            threading.Thread(target=self._infer_loop, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        """
+        para as threads e espera elas terminarem: depois disso ninguem mais le o cap
+        o decodificador pode ter lido ate duas filas a frente do que foi exibido,
+        quem continua do ultimo frame mostrado reposiciona o cap
+        """
+        self.stop_event.set()
+        for t in self._threads:
+            t.join()
+
+    def _put(self, q, item):
+        """put bloqueante que desiste quando o pipeline e parado; devolve tempo esperado"""
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        return time.perf_counter() - start
+
+    def _get(self, q):
+        """get bloqueante que desiste quando o pipeline e parado"""
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.1), time.perf_counter() - start
+            except queue.Empty:
+                continue
+        return _END, time.perf_counter() - start
+
+    def _decode_loop(self):
+        stats = self.stats["decode"]
+        frame_index = self.start_frame
+
+        try:
+            while not self.stop_event.is_set():
+                t0 = time.perf_counter()
+                ret, frame = self.cap.read()
+                busy = time.perf_counter() - t0
+
+                if not ret:
+                    break
+
+                waited = self._put(self.decode_queue, (frame_index, frame))
+                stats.add(busy=busy, wait_out=waited, items=1)
+                frame_index += 1
+        finally:
+            self._put(self.decode_queue, _END)
+
+    def _infer_loop(self):
+        stats = self.stats["infer"]
+
+        try:
+            while not self.stop_event.is_set():
+                item, wait_in = self._get(self.decode_queue)
+                if item is _END:
+                    break
+
+                frame_index, frame = item
+                kwargs = self.predict_kwargs
+                if self.input_policy is not None:
+                    kwargs = dict(kwargs, imgsz=self.input_policy.choose(frame.shape[1], frame.shape[0]))
+                t0 = time.perf_counter()
+                results = self.model(frame, **kwargs)
+                busy = time.perf_counter() - t0
+                if self.input_policy is not None:
+                    self.input_policy.record(busy)
+
+                waited = self._put(self.result_queue, (frame_index, frame, results))
+                stats.add(busy=busy, wait_in=wait_in, wait_out=waited, items=1)
+        except Exception as e:
+            # erro de inferencia chega na thread de exibicao
+            self._put(self.result_queue, e)
+        finally:
+            self._put(self.result_queue, _END)
+
+    def frames(self):
+        """
+        gera (indice, frame, results) na ordem do video para o estagio de exibicao
+        quem exibe chama displayed() logo depois do desenho + imshow: a espera do
+        waitKey (velocidade real) e a pausa nao contam como exibicao. sem displayed(),
+        conta o tempo ate pedir o proximo item
+        """
+        stats = self.stats["display"]
+
+        while True:
+            if self._display_start is not None:
+                stats.add(busy=time.perf_counter() - self._display_start, items=1)
+                self._display_start = None
+
+            item, wait_in = self._get(self.result_queue)
+            stats.add(wait_in=wait_in)
+
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+
+            self._display_start = time.perf_counter()
+            yield item
+
+    def displayed(self):
+        """fim do trabalho de exibicao do item atual (desenho, imshow)"""
+        if self._display_start is not None:
+            self.stats["display"].add(busy=time.perf_counter() - self._display_start, items=1)
+            self._display_start = None
+
+    def report(self):
+        """profundidade das filas e tempos medios por estagio"""
+        snapshot = {name: s.snapshot() for name, s in self.stats.items()}
+        snapshot["decode"]["queue"] = self.decode_queue.qsize()
+        snapshot["infer"]["queue"] = self.result_queue.qsize()
+        snapshot["display"]["queue"] = 0
+        return snapshot
+
+    def bottleneck(self):
+        """estagio com maior tempo ocupado por frame"""
+        snapshot = self.report()
+        return max(snapshot, key=lambda name: snapshot[name]["busy_ms"])
+
+    def format_report(self):
+        parts = []
+        for name, s in self.report().items():
+            parts.append(
+                f"{name}: fila {s['queue']} | ocupado {s['busy_ms']:.0f}ms | espera {s['wait_in_ms']:.0f}ms"
+            )
+        return " || ".join(parts)
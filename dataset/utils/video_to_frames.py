@@ -4,6 +4,7 @@ from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import threading
+from frame_sampler import FrameSampler
 
 
 CLASSES = [
@@ -44,30 +45,22 @@ def extract_frames_from_video(video_path, animal_class, fps, output_base_dir, pr
     video_fps = video.get(cv2.CAP_PROP_FPS)
     total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
     
-    frame_interval = int(video_fps / fps)
+    frame_interval = max(1, int(video_fps / fps))
     
     video_name = Path(video_path).stem
     hash_code = generate_hash(video_name)
-    frame_count = 0
     saved_count = 0
     
-    while True:
-        ret, frame = video.read()
+    # frames pulados avancam com grab(), so os salvos sao decodificados
+    for frame_count, frame in FrameSampler(video, frame_interval):
+        filename = f"{hash_code}.{saved_count:04d}.jpg"
+        output_path = output_dir / filename
         
-        if not ret:
-            break
+        cv2.imwrite(str(output_path), frame)
+        saved_count += 1
         
-        if frame_count % frame_interval == 0:
-            filename = f"{hash_code}.{saved_count:04d}.jpg"
-            output_path = output_dir / filename
-            
-            cv2.imwrite(str(output_path), frame)
-            saved_count += 1
-            
-            if progress_callback:
-                progress_callback(saved_count)
-        
-        frame_count += 1
+        if progress_callback:
+            progress_callback(saved_count)
     
     video.release()
     return True, f"Extraidos {saved_count} frames em {output_dir}"
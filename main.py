@@ -1,5 +1,5 @@
-from ultralytics import YOLO
 import os
+import sys
 
 #garantindo commit 3
 
@@ -7,11 +7,19 @@ import os
 script_dir = os.path.dirname(os.path.abspath(__file__))
 os.chdir(script_dir)
 
+# utilitarios compartilhados (registro de modelos etc) ficam em dataset/utils
+sys.path.insert(0, os.path.join(script_dir, "dataset", "utils"))
+from model_registry import get_model
+from detection_batch import DetectionBatch
+
 #garantindo o commit dnovo, po to na ccxp vei
 # model = YOLO('yolov8x-seg.pt') # modelo de segmentacao
 # model = YOLO('yolov8x-cls.pt') # modelo de classificao
 
-model = YOLO('yolo11n-v1.pt') # modelo de deteccao com meu dataset proprio
+# backend de inferencia: 'torch' ou 'onnx' (onnxruntime na CPU, exporta o .pt uma vez)
+BACKEND = 'torch'
+
+model = get_model('yolo11n-v1.pt', backend=BACKEND) # modelo de deteccao com meu dataset proprio
 
 # predizer uma pasta inteira (imagens)
 # vid_stride=15 = processar 1 frame a cada 15 frames em videos
@@ -26,14 +34,11 @@ print("="*60)
 for i, result in enumerate(results):
     print(f"\nimagem {i+1}: {result.path}")
     
-    if len(result.boxes) == 0:
+    detections = DetectionBatch.from_result(result)
+    if not detections:
         print("   nenhum objeto detectado")
     else:
-        for j, box in enumerate(result.boxes):
-            class_id = int(box.cls[0])
-            confidence = float(box.conf[0])
-            class_name = result.names[class_id]
-            
+        for j, (class_name, confidence) in enumerate(detections.rows()):
             print(f"   caixa {j+1}: {class_name} - {confidence*100:.2f}% de confiança")
 
 print("\n" + "="*60)